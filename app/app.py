@@ -1,7 +1,8 @@
+import time
+_import_start = time.perf_counter()
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
 import os
 import sys
 import json
@@ -9,19 +10,30 @@ import json
 # Add parent directory to path for imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 from src.features.build_features import engineer_features
-from src.data_preprocessing.preprocess import clean_data, encode_hierarchical_categories
+from src.data_preprocessing.preprocess import clean_data, encode_hierarchical_categories, load_input_defaults, fill_input_defaults
+from src.features.schema import build_feature_schema, encode_with_schema
+from src.serving.cache import PredictionCache
+from src.serving.predictor import build_what_if_grid
+from src.utils.versioning import file_version
+from src.models.forest_intervals import build_leaf_value_table, predict_with_intervals
+from src.models.compiled_forest import COMPILED_MODEL_FILE, load_compiled_model
+from src.serving.reload import ModelWatcher, SMOKE_RECORDS, check_smoke_predictions, model_signature
+# Seconds spent importing the app's dependencies on its first run (part of the startup time)
+IMPORT_SECONDS = time.perf_counter() - _import_start
 
-# Load the trained model
-@st.cache_resource
+# Load the trained model: the precompiled forest when it is up to date (no unpickling, no scikit-learn import)
 def load_model():
     model_path = "model/house_price_model.pkl"
     if not os.path.exists(model_path):
-        st.error("Trained model not found. Please train the model first.")
-        return None
+        raise FileNotFoundError("Trained model not found. Please train the model first.")
+    if os.path.exists(os.path.join("model", COMPILED_MODEL_FILE)):
+        model = load_compiled_model("model/")
+        if model.model_version == file_version(model_path):
+            return model
+    import joblib
     return joblib.load(model_path)
 
 # Load model metadata
-@st.cache_data
 def load_metadata():
     metadata_path = "model/model_metadata.json"
     if os.path.exists(metadata_path):
@@ -29,25 +41,84 @@ def load_metadata():
             return json.load(f)
     return None
 
-# Load model features from training set
-@st.cache_data
-def get_model_features():
-    df = pd.read_csv("datasets/processed/ames-train-featured.csv")
-    X = pd.get_dummies(df.drop(columns=["SalePrice"]))
-    return X.columns.tolist()
+# Load the model with everything derived from it, and check it on a few default houses.
+# The seconds of every stage are kept in the same form as HousePricePredictor.startup_timings
+# (startup_timings passes the stages measured before, e.g. the imports)
+def load_model_bundle(defaults, startup_timings=None):
+    timings = dict(startup_timings or {})
+
+    start = time.perf_counter()
+    model = load_model()
+    bundle = {
+        'model': model,
+        # Version (content hash) of the model, used to invalidate cached predictions
+        'version': getattr(model, "model_version", None) or file_version("model/house_price_model.pkl")
+    }
+    timings['model'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Feature schema stored inside the model (derived from its feature names for older models)
+    bundle['schema'] = getattr(model, "feature_schema_", None) or build_feature_schema(model.feature_names_in_)
+    # Node outputs of all trees of the model, used for per-house prediction intervals
+    bundle['leaf_values'] = build_leaf_value_table(model)
+    timings['schema'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bundle['metadata'] = load_metadata()
+    timings['defaults'] = timings.get('defaults', 0.0) + time.perf_counter() - start
+
+    start = time.perf_counter()
+    smoke_houses = fill_input_defaults(pd.DataFrame(SMOKE_RECORDS), defaults)
+    check_smoke_predictions(model.predict(prepare_input_for_prediction(smoke_houses, bundle['schema'])))
+    timings['warmup'] = time.perf_counter() - start
+
+    bundle['startup_timings'] = timings
+    return bundle
 
-# Get unique values for categorical features
+# Model in use (shared by all sessions); a background watcher swaps in newly trained models
+@st.cache_resource
+def get_model_slot():
+    slot = {'bundle': None}
+    start = time.perf_counter()
+    defaults = get_input_defaults()
+    timings = {'imports': IMPORT_SECONDS, 'defaults': time.perf_counter() - start}
+    signature = model_signature("model/")
+    try:
+        slot['bundle'] = load_model_bundle(defaults, timings)
+    except FileNotFoundError:
+        pass
+    slot['watcher'] = ModelWatcher("model/", lambda: load_model_bundle(defaults), lambda bundle: slot.update(bundle=bundle),
+                                   signature=signature).start()
+    return slot
+
+# Prediction cache shared by all sessions of this process
+@st.cache_resource
+def get_prediction_cache():
+    return PredictionCache(max_entries=10_000, ttl_seconds=24 * 3600)
+
+# Load defaults of the fields not shown in the UI (saved by the preprocessing pipeline)
+@st.cache_resource
+def get_input_defaults():
+    return load_input_defaults()
+
+# Defaults of a group of fields (garage, basement, ...) for a house with or without that part
+def conditional_defaults(defaults, group, has_part):
+    return defaults['conditional'][group]['present' if has_part else 'absent']
+
+# Get unique values for categorical features (from the model's one-hot vocabulary, without reading the training data)
 @st.cache_data
-def get_categorical_values():
-    df = pd.read_csv("datasets/ames-train.csv")
+def get_categorical_values(model_version, _schema):
+    neighborhoods = _schema['one_hot'].get('Neighborhood')
+    if not neighborhoods:
+        neighborhoods = pd.read_csv("datasets/ames-train.csv")['Neighborhood'].dropna().unique()
     return {
-        'Neighborhood': sorted(df['Neighborhood'].dropna().unique())
+        'Neighborhood': sorted(neighborhoods)
     }
 
-# Prepare user input for prediction
-def prepare_input_for_prediction(user_input, model_features):
+# Prepare user input for prediction (one house as a dict, or many houses as a DataFrame)
+def prepare_input_for_prediction(user_input, schema):
     # Create DataFrame from user input
-    df = pd.DataFrame([user_input])
+    df = user_input.copy() if isinstance(user_input, pd.DataFrame) else pd.DataFrame([user_input])
     
     # Add any missing columns with reasonable defaults
     # These are columns needed for feature engineering but not shown in UI
@@ -62,16 +133,9 @@ def prepare_input_for_prediction(user_input, model_features):
     # Engineer features (this adds our 10 new features)
     df = engineer_features(df, is_training=False)
     
-    # One-hot encode
+    # One-hot encode and align with model features (positions precomputed in the schema)
     df = encode_hierarchical_categories(df)
-    df = pd.get_dummies(df)
-    
-    # Align with model features
-    missing_cols = set(model_features) - set(df.columns)
-    for col in missing_cols:
-        df[col] = 0
-    
-    df = df[model_features]
+    df = encode_with_schema(df, schema)
     
     return df
 
@@ -80,10 +144,13 @@ st.set_page_config(page_title="House Price Predictor", page_icon="🏠", layout=
 
 st.title("🏠 House Price Prediction App")
 
-# Load model and metadata
-model = load_model()
-metadata = load_metadata()
-cat_values = get_categorical_values()
+# Model and metadata of this run; a model swapped in meanwhile is used from the next run on
+bundle = get_model_slot()['bundle']
+if bundle is None:
+    st.error("Trained model not found. Please train the model first.")
+model = bundle['model'] if bundle else None
+metadata = bundle['metadata'] if bundle else None
+cat_values = get_categorical_values(bundle['version'], bundle['schema']) if bundle else {'Neighborhood': []}
 
 if model and metadata:
     # Display model info in sidebar
@@ -98,6 +165,11 @@ if model and metadata:
     if 'top_features' in metadata:
         for i, feat in enumerate(metadata['top_features'][:5]):
             st.sidebar.text(f"{i+1}. {feat['feature']}: {feat['importance']:.3f}")
+    
+    model_kind = "compiled forest" if hasattr(model, "leaf_values_") else "pickled model"
+    timings = bundle['startup_timings']
+    st.sidebar.caption(f"Model {bundle['version']} loaded in {sum(timings.values()):.2f}s ({model_kind}): "
+                       + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
 
 # Main content
 st.write("Enter the house characteristics below to predict its sale price:")
@@ -176,120 +248,130 @@ with st.expander("🔧 See Calculated Features"):
         st.write(f"**Recently Remodeled:** {'Yes' if recent_remodel else 'No'}")
         st.write(f"**Lot Area (log):** {np.log1p(lot_area):.2f}")
 
+# Defaults of the fields not shown in the UI
+defaults = get_input_defaults()
+garage = conditional_defaults(defaults, 'garage', garage_cars > 0)
+basement = conditional_defaults(defaults, 'basement', total_bsmt_sf > 0)
+fireplace = conditional_defaults(defaults, 'fireplace', fireplaces > 0)
+
+# Input data - include all the fields needed for feature engineering
+input_data = {
+    # Size features
+    'TotalBsmtSF': total_bsmt_sf,
+    '1stFlrSF': first_flr_sf,
+    '2ndFlrSF': second_flr_sf,
+    'GrLivArea': gr_liv_area,
+    'LotArea': lot_area,
+    
+    # Quality features
+    'OverallQual': overall_qual,
+    'OverallCond': overall_cond,
+    
+    # Year features
+    'YearBuilt': year_built,
+    'YearRemodAdd': year_remod_add,
+    'YrSold': 2010,  # Default sale year
+    
+    # Bathroom features
+    'FullBath': full_bath,
+    'HalfBath': half_bath,
+    'BsmtFullBath': bsmt_full_bath,
+    'BsmtHalfBath': bsmt_half_bath,
+    
+    # Garage features
+    'GarageCars': garage_cars,
+    'GarageArea': garage_area,
+    
+    # Categorical features
+    'Neighborhood': neighborhood,
+    
+    # Additional features that might be needed
+    'BedroomAbvGr': bedroom_abvgr,
+    'Fireplaces': fireplaces,
+    'WoodDeckSF': wood_deck_sf,
+    'OpenPorchSF': open_porch_sf,
+    
+    # Default values for other common categorical features
+    'MSZoning': 'RL',
+    'Street': 'Pave',
+    'LotShape': 'Reg',
+    'LandContour': 'Lvl',
+    'LotConfig': 'Inside',
+    'LandSlope': 'Gtl',
+    'BldgType': '1Fam',
+    'HouseStyle': '1Story',
+    'RoofStyle': 'Gable',
+    'ExterQual': 'TA',
+    'ExterCond': 'TA',
+    'Foundation': 'PConc',
+    'BsmtQual': basement['BsmtQual'],
+    'BsmtCond': basement['BsmtCond'],
+    'BsmtExposure': basement['BsmtExposure'],
+    'BsmtFinType1': basement['BsmtFinType1'],
+    'Heating': 'GasA',
+    'HeatingQC': 'Ex',
+    'CentralAir': 'Y',
+    'Electrical': 'SBrkr',
+    'KitchenQual': 'TA',
+    'Functional': 'Typ',
+    'GarageType': garage['GarageType'],
+    'GarageFinish': garage['GarageFinish'],
+    'GarageQual': garage['GarageQual'],
+    'GarageCond': garage['GarageCond'],
+    'PavedDrive': 'Y',
+    'SaleType': 'WD',
+    'SaleCondition': 'Normal',
+    'MSSubClass': 20,  # Default to 1-story
+    'Utilities': 'AllPub',
+    'Condition1': 'Norm',
+    'Condition2': 'Norm',
+    'RoofMatl': 'CompShg',
+    'Exterior1st': 'VinylSd',
+    'Exterior2nd': 'VinylSd',
+    'MasVnrType': 'None',
+    'MasVnrArea': 0,
+    'BsmtFinSF1': 0,
+    'BsmtFinType2': basement['BsmtFinType2'],
+    'BsmtFinSF2': 0,
+    'BsmtUnfSF': total_bsmt_sf,
+    'LowQualFinSF': 0,
+    'KitchenAbvGr': 1,
+    'TotRmsAbvGrd': 7,
+    'GarageYrBlt': year_built,
+    'EnclosedPorch': 0,
+    '3SsnPorch': 0,
+    'ScreenPorch': 0,
+    'PoolArea': 0,
+    'PoolQC': conditional_defaults(defaults, 'pool', False)['PoolQC'],
+    'Fence': defaults['values']['Fence'],
+    'MiscFeature': defaults['values']['MiscFeature'],
+    'MiscVal': 0,
+    'MoSold': 6,  # Default to June
+    'Alley': defaults['values']['Alley'],
+    'LotFrontage': 65,  # Default value
+    'FireplaceQu': fireplace['FireplaceQu']
+}
+
 # Prediction button
 if st.button("🎯 Predict House Price", type="primary"):
     if model:
-        # Load dataset
-        dataset: pd.DataFrame = pd.read_csv("datasets/ames-train.csv")
-        import pdb
-
-        # Prepare input data - include all the fields needed for feature engineering
-        input_data = {
-            # Size features
-            'TotalBsmtSF': total_bsmt_sf,
-            '1stFlrSF': first_flr_sf,
-            '2ndFlrSF': second_flr_sf,
-            'GrLivArea': gr_liv_area,
-            'LotArea': lot_area,
-            
-            # Quality features
-            'OverallQual': overall_qual,
-            'OverallCond': overall_cond,
-            
-            # Year features
-            'YearBuilt': year_built,
-            'YearRemodAdd': year_remod_add,
-            'YrSold': 2010,  # Default sale year
-            
-            # Bathroom features
-            'FullBath': full_bath,
-            'HalfBath': half_bath,
-            'BsmtFullBath': bsmt_full_bath,
-            'BsmtHalfBath': bsmt_half_bath,
-            
-            # Garage features
-            'GarageCars': garage_cars,
-            'GarageArea': garage_area,
-            
-            # Categorical features
-            'Neighborhood': neighborhood,
-            
-            # Additional features that might be needed
-            'BedroomAbvGr': bedroom_abvgr,
-            'Fireplaces': fireplaces,
-            'WoodDeckSF': wood_deck_sf,
-            'OpenPorchSF': open_porch_sf,
-            
-            # Default values for other common categorical features
-            'MSZoning': 'RL',
-            'Street': 'Pave',
-            'LotShape': 'Reg',
-            'LandContour': 'Lvl',
-            'LotConfig': 'Inside',
-            'LandSlope': 'Gtl',
-            'BldgType': '1Fam',
-            'HouseStyle': '1Story',
-            'RoofStyle': 'Gable',
-            'ExterQual': 'TA',
-            'ExterCond': 'TA',
-            'Foundation': 'PConc',
-            'BsmtQual': 'TA' if total_bsmt_sf > 0 else dataset["BsmtQual"].mode()[0],
-            'BsmtCond': 'TA' if total_bsmt_sf > 0 else dataset["BsmtCond"].mode()[0],
-            'BsmtExposure': 'No' if total_bsmt_sf > 0 else dataset["BsmtExposure"].mode()[0],
-            'BsmtFinType1': 'Unf' if total_bsmt_sf > 0 else dataset["BsmtFinType1"].mode()[0],
-            'Heating': 'GasA',
-            'HeatingQC': 'Ex',
-            'CentralAir': 'Y',
-            'Electrical': 'SBrkr',
-            'KitchenQual': 'TA',
-            'Functional': 'Typ',
-            'GarageType': 'Attchd' if garage_cars > 0 else dataset["GarageType"].mode()[0],
-            'GarageFinish': 'Unf' if garage_cars > 0 else dataset["GarageFinish"].mode()[0],
-            'GarageQual': 'TA' if garage_cars > 0 else dataset["GarageQual"].mode()[0],
-            'GarageCond': 'TA' if garage_cars > 0 else dataset["GarageCond"].mode()[0],
-            'PavedDrive': 'Y',
-            'SaleType': 'WD',
-            'SaleCondition': 'Normal',
-            'MSSubClass': 20,  # Default to 1-story
-            'Utilities': 'AllPub',
-            'Condition1': 'Norm',
-            'Condition2': 'Norm',
-            'RoofMatl': 'CompShg',
-            'Exterior1st': 'VinylSd',
-            'Exterior2nd': 'VinylSd',
-            'MasVnrType': 'None',
-            'MasVnrArea': 0,
-            'BsmtFinSF1': 0,
-            'BsmtFinType2': 'Unf' if total_bsmt_sf > 0 else dataset["BsmtFinType2"].mode()[0],
-            'BsmtFinSF2': 0,
-            'BsmtUnfSF': total_bsmt_sf,
-            'LowQualFinSF': 0,
-            'KitchenAbvGr': 1,
-            'TotRmsAbvGrd': 7,
-            'GarageYrBlt': year_built,
-            'EnclosedPorch': 0,
-            '3SsnPorch': 0,
-            'ScreenPorch': 0,
-            'PoolArea': 0,
-            'PoolQC': dataset["PoolQC"].mode()[0],
-            'Fence': dataset["Fence"].mode()[0],
-            'MiscFeature': dataset["MiscFeature"].mode()[0],
-            'MiscVal': 0,
-            'MoSold': 6,  # Default to June
-            'Alley': dataset["Alley"].mode()[0],
-            'LotFrontage': 65,  # Default value
-            'FireplaceQu': 'Gd' if fireplaces > 0 else dataset["FireplaceQu"].mode()[0]
-        }
-        
-        # Get model features
-        model_features = get_model_features()
+        # Get model feature schema
+        schema = bundle['schema']
         
         # Prepare input
         with st.spinner('Calculating prediction...'):
-            prepared_input = prepare_input_for_prediction(input_data, model_features)
+            prepared_input = prepare_input_for_prediction(input_data, schema)
         
-        # Make prediction
-        prediction = model.predict(prepared_input)[0]
+        # Make prediction (identical inputs are served from the cache)
+        cache = get_prediction_cache()
+        cache.bind_model(bundle['version'])
+        key = cache.keys(prepared_input.to_numpy(), bundle['version'])
+        cached = cache.get_many(key)[0]
+        if cached is None:
+            predicted = predict_with_intervals(model, prepared_input, leaf_values=bundle['leaf_values'])
+            cached = tuple(values[0] for values in predicted)
+            cache.put_many(key, [cached])
+        prediction, lower_bound, upper_bound = cached
         
         # Display results
         st.success("✅ Prediction Complete!")
@@ -305,13 +387,43 @@ if st.button("🎯 Predict House Price", type="primary"):
             st.metric(label="📏 Price per Sq Ft", value=f"${price_per_sqft:.2f}")
         
         with res_col3:
-            # Confidence interval (rough estimate based on model RMSE)
-            if metadata:
-                rmse = metadata['metrics']['validation']['rmse']
-                lower_bound = max(0, prediction - rmse)
-                upper_bound = prediction + rmse
-                st.metric(label="📊 Confidence Range", 
-                         value=f"${lower_bound:,.0f} - ${upper_bound:,.0f}")
+            # Prediction interval of this house (5th-95th percentile of the trees' predictions)
+            st.metric(label="📊 Confidence Range", 
+                     value=f"${lower_bound:,.0f} - ${upper_bound:,.0f}")
+
+# What-if analysis: the whole grid is prepared and predicted as one batch
+st.markdown("---")
+with st.expander("📈 What-if: price curve"):
+    what_if_grids = {
+        'GrLivArea': range(300, 6001, 50),
+        'OverallQual': range(1, 11),
+        'YearBuilt': range(1870, 2026),
+        'Neighborhood': cat_values['Neighborhood']
+    }
+    wi_col1, wi_col2 = st.columns(2)
+    with wi_col1:
+        vary_feature = st.selectbox("Feature to vary", list(what_if_grids))
+    with wi_col2:
+        split_feature = st.selectbox("Compare across (optional)",
+                                     ["(none)"] + [f for f in ('OverallQual', 'Neighborhood') if f != vary_feature])
+
+    if st.button("Compute price curve") and model:
+        variations = {vary_feature: what_if_grids[vary_feature]}
+        if split_feature != "(none)":
+            variations[split_feature] = what_if_grids[split_feature]
+
+        grid = build_what_if_grid(input_data, variations)
+        with st.spinner(f'Predicting {len(grid):,} houses...'):
+            grid['SalePrice'] = model.predict(prepare_input_for_prediction(grid, bundle['schema']))
+
+        if split_feature == "(none)":
+            curve = grid.set_index(vary_feature)['SalePrice']
+        else:
+            curve = grid.pivot(index=vary_feature, columns=split_feature, values='SalePrice')
+        if vary_feature == 'Neighborhood':
+            st.bar_chart(curve)
+        else:
+            st.line_chart(curve)
 
 # Footer
 st.markdown("---")
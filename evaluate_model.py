@@ -1,9 +1,18 @@
 import pandas as pd
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 import seaborn as sns
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+from concurrent.futures import ProcessPoolExecutor
 import os
+import json
+import argparse
+import hashlib
+import inspect
+from src.evaluation.streaming_metrics import PRICE_BINS, PRICE_LABELS, accumulate_files
+from src.evaluation.bootstrap import BOOTSTRAP_RESAMPLES, bootstrap_metrics, format_intervals
 
 def load_validation_data():
     """Load the validation predictions and actual values."""
@@ -37,7 +46,7 @@ def load_validation_data():
     df['PercentError'] = (df['Error'] / df['Actual']) * 100
     df['AbsPercentError'] = np.abs(df['PercentError'])
     
-    return df
+    return add_price_range(df)
 
 def calculate_metrics(df):
     """Calculate evaluation metrics."""
@@ -57,27 +66,62 @@ def calculate_metrics(df):
     
     return metrics
 
-def create_visualizations(df, save_path="evaluation/plots"):
-    """Create and save evaluation plots."""
-    os.makedirs(save_path, exist_ok=True)
-    
-    # Set style
-    plt.style.use('default')
-    sns.set_palette("husl")
-    
-    # 1. Actual vs Predicted Scatter Plot
+# Figure resolution of the final plots and of the fast preview (--preview)
+FINAL_DPI = 300
+PREVIEW_DPI = 72
+
+# Above this many houses the scatter plots are drawn as a 2-D density (constant rendering time)
+SCATTER_MAX_POINTS = 50_000
+DENSITY_BINS = 200
+SCATTER_MODES = ('auto', 'scatter', 'density')
+# Quantiles drawn in the Q-Q plot of that many houses
+QQ_POINTS = 2_000
+
+
+def add_price_range(df):
+    """Add the PriceRange column (bins of the actual price) used by the plots and the report."""
+    df['PriceRange'] = pd.cut(df['Actual'], bins=PRICE_BINS, labels=PRICE_LABELS)
+    return df
+
+def use_density(n_points, scatter_mode='auto'):
+    """Whether a scatter plot of n_points is drawn as a density ('auto' switches above SCATTER_MAX_POINTS)."""
+    if scatter_mode not in SCATTER_MODES:
+        raise ValueError(f"Unknown scatter mode: {scatter_mode}")
+    return scatter_mode == 'density' or (scatter_mode == 'auto' and n_points > SCATTER_MAX_POINTS)
+
+def scatter_or_density(x, y, density):
+    """Draw points, or their counts on a DENSITY_BINS x DENSITY_BINS grid (np.histogram2d, log color scale)."""
+    if not density:
+        plt.scatter(x, y, alpha=0.6, edgecolors='k', linewidth=0.5)
+        return
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=DENSITY_BINS)
+    # Empty cells stay white
+    counts = np.ma.masked_equal(counts, 0)
+    mesh = plt.pcolormesh(x_edges, y_edges, counts.T, cmap='viridis', norm=LogNorm())
+    plt.colorbar(mesh, label='Houses')
+
+def linear_trend(x, y):
+    """Slope and intercept of the least squares line (same as np.polyfit(x, y, 1)) from means and covariance."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x_centered = x - x.mean()
+    slope = np.dot(x_centered, y - y.mean()) / np.dot(x_centered, x_centered)
+    return slope, y.mean() - slope * x.mean()
+
+def plot_actual_vs_predicted(df, path, dpi, scatter_mode='auto'):
+    """1. Actual vs Predicted Scatter Plot"""
     plt.figure(figsize=(10, 8))
-    plt.scatter(df['Actual'], df['Predicted'], alpha=0.6, edgecolors='k', linewidth=0.5)
+    scatter_or_density(df['Actual'], df['Predicted'], use_density(len(df), scatter_mode))
     
     # Add perfect prediction line
     min_price = min(df['Actual'].min(), df['Predicted'].min())
     max_price = max(df['Actual'].max(), df['Predicted'].max())
     plt.plot([min_price, max_price], [min_price, max_price], 'r--', lw=2, label='Perfect Prediction')
     
-    # Add trend line
-    z = np.polyfit(df['Actual'], df['Predicted'], 1)
-    p = np.poly1d(z)
-    plt.plot(df['Actual'], p(df['Actual']), "g-", alpha=0.8, label='Trend Line')
+    # Add trend line (a straight line: its two end points are enough)
+    slope, intercept = linear_trend(df['Actual'], df['Predicted'])
+    x_ends = np.array([df['Actual'].min(), df['Actual'].max()])
+    plt.plot(x_ends, slope * x_ends + intercept, "g-", alpha=0.8, label='Trend Line')
     
     plt.xlabel('Actual Price ($)', fontsize=12)
     plt.ylabel('Predicted Price ($)', fontsize=12)
@@ -91,12 +135,13 @@ def create_visualizations(df, save_path="evaluation/plots"):
              bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
     
     plt.tight_layout()
-    plt.savefig(f"{save_path}/actual_vs_predicted.png", dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
-    
-    # 2. Residual Plot
+
+def plot_residuals(df, path, dpi, scatter_mode='auto'):
+    """2. Residual Plot"""
     plt.figure(figsize=(10, 6))
-    plt.scatter(df['Predicted'], df['Error'], alpha=0.6, edgecolors='k', linewidth=0.5)
+    scatter_or_density(df['Predicted'], df['Error'], use_density(len(df), scatter_mode))
     plt.axhline(y=0, color='r', linestyle='--', linewidth=2)
     
     # Add ±1 standard deviation lines
@@ -111,10 +156,11 @@ def create_visualizations(df, save_path="evaluation/plots"):
     plt.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig(f"{save_path}/residual_plot.png", dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
-    
-    # 3. Distribution of Errors
+
+def plot_error_distributions(df, path, dpi):
+    """3. Distribution of Errors"""
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
     
     # Absolute errors
@@ -141,17 +187,13 @@ def create_visualizations(df, save_path="evaluation/plots"):
     ax2.grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig(f"{save_path}/error_distributions.png", dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
-    
-    # 4. Prediction Performance by Price Range
+
+def plot_performance_by_price_range(df, path, dpi):
+    """4. Prediction Performance by Price Range"""
     plt.figure(figsize=(12, 6))
     
-    # Create price bins
-    price_bins = [0, 100000, 150000, 200000, 250000, 300000, 1000000]
-    price_labels = ['<$100k', '$100-150k', '$150-200k', '$200-250k', '$250-300k', '>$300k']
-    df['PriceRange'] = pd.cut(df['Actual'], bins=price_bins, labels=price_labels)
-    
     # Calculate metrics for each price range
     range_stats = df.groupby('PriceRange', observed=False).agg({
         'AbsPercentError': 'mean',
@@ -171,28 +213,153 @@ def create_visualizations(df, save_path="evaluation/plots"):
         plt.text(i, v + 0.1, f'{v:.1f}%\n(n={count})', ha='center', va='bottom')
     
     plt.tight_layout()
-    plt.savefig(f"{save_path}/performance_by_price_range.png", dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
-    
-    # 5. Q-Q Plot for residuals
+
+def plot_qq(df, path, dpi, scatter_mode='auto'):
+    """5. Q-Q Plot for residuals"""
     plt.figure(figsize=(8, 8))
     from scipy import stats
-    stats.probplot(df['Error'], dist="norm", plot=plt)
+    if not use_density(len(df), scatter_mode):
+        stats.probplot(df['Error'], dist="norm", plot=plt)
+    else:
+        # Quantiles and fit from all residuals, but only QQ_POINTS of them drawn (the curve looks the same)
+        (theoretical, ordered), (slope, intercept, _) = stats.probplot(df['Error'], dist="norm")
+        shown = np.unique(np.linspace(0, len(ordered) - 1, QQ_POINTS).astype(int))
+        plt.plot(theoretical[shown], ordered[shown], 'bo')
+        plt.plot(theoretical[[0, -1]], slope * theoretical[[0, -1]] + intercept, 'r-')
+        plt.xlabel('Theoretical quantiles')
+        plt.ylabel('Ordered Values')
     plt.title('Q-Q Plot of Residuals', fontsize=14, fontweight='bold')
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
-    plt.savefig(f"{save_path}/qq_plot.png", dpi=300, bbox_inches='tight')
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
     plt.close()
-    
-    print(f"[OK] All plots saved to {save_path}/")
 
-def create_summary_report(df, metrics, save_path="evaluation"):
-    """Create a summary report of the evaluation."""
-    
-    # Calculate additional statistics
-    within_5_pct = len(df[df['AbsPercentError'] <= 5])
-    within_10_pct = len(df[df['AbsPercentError'] <= 10])
-    within_15_pct = len(df[df['AbsPercentError'] <= 15])
+# Every plot: file name -> (plotting function, columns of df it reads)
+PLOTS = {
+    'actual_vs_predicted': (plot_actual_vs_predicted, ['Actual', 'Predicted']),
+    'residual_plot': (plot_residuals, ['Predicted', 'Error']),
+    'error_distributions': (plot_error_distributions, ['AbsError', 'PercentError']),
+    'performance_by_price_range': (plot_performance_by_price_range, ['Id', 'PriceRange', 'AbsPercentError']),
+    'qq_plot': (plot_qq, ['Error'])
+}
+
+# Plots that switch to an aggregated rendering for many houses
+SCATTER_PLOTS = ('actual_vs_predicted', 'residual_plot', 'qq_plot')
+
+# Code and settings shared by the plotting functions (part of every plot hash)
+PLOT_HELPERS = (use_density, scatter_or_density, linear_trend)
+PLOT_SETTINGS = {'SCATTER_MAX_POINTS': SCATTER_MAX_POINTS, 'DENSITY_BINS': DENSITY_BINS, 'QQ_POINTS': QQ_POINTS}
+
+def _plot_options(name, scatter_mode):
+    return {'scatter_mode': scatter_mode} if name in SCATTER_PLOTS else {}
+
+def _plot_input_hash(name, data, dpi, options):
+    """
+    Hash of everything a plot depends on: its input columns, the resolution, the options (with the
+    resolved scatter or density rendering), the plotting code with its helpers and the plot settings.
+    """
+    plot_function = PLOTS[name][0]
+    if 'scatter_mode' in options:
+        options = {**options, 'density': use_density(len(data), options['scatter_mode'])}
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    digest.update(str(list(data.columns)).encode())
+    digest.update(f"{dpi} {sorted(options.items())} {sorted(PLOT_SETTINGS.items())}".encode())
+    for function in (plot_function, *PLOT_HELPERS):
+        digest.update(inspect.getsource(function).encode())
+    return digest.hexdigest()
+
+def _init_plot_worker():
+    # Render to files only, in every worker process
+    matplotlib.use("Agg")
+    plt.style.use('default')
+    sns.set_palette("husl")
+
+def _render_plot(name, data, path, dpi, options):
+    PLOTS[name][0](data, path, dpi, **options)
+    return name
+
+def create_visualizations(df, save_path="evaluation/plots", dpi=FINAL_DPI, n_workers=None, force=False, scatter_mode='auto'):
+    """
+    Create and save evaluation plots.
+
+    Figures whose inputs (columns, resolution and plotting code) did not change since they were last
+    rendered are skipped; the others are rendered in a process pool, one figure per worker.
+
+    Parameters:
+    df (pd.DataFrame): Output of load_validation_data
+    save_path (str): Directory of the PNG files
+    dpi (int): Resolution (FINAL_DPI, or PREVIEW_DPI for a fast preview)
+    n_workers (int): Worker processes (default: one per figure, at most os.cpu_count()). 1 renders in this process
+    force (bool): Render every figure even if it is up to date
+    scatter_mode (str): 'scatter' draws every house, 'density' a 2-D histogram, 'auto' switches to the
+    density above SCATTER_MAX_POINTS houses
+
+    Returns:
+    list: Names of the rendered figures
+    """
+    os.makedirs(save_path, exist_ok=True)
+    hashes_path = os.path.join(save_path, "plot_hashes.json")
+    hashes = {}
+    if os.path.exists(hashes_path):
+        with open(hashes_path) as f:
+            hashes = json.load(f)
+
+    jobs = []
+    for name, (_, columns) in PLOTS.items():
+        path = os.path.join(save_path, f"{name}.png")
+        data = df[columns]
+        options = _plot_options(name, scatter_mode)
+        input_hash = _plot_input_hash(name, data, dpi, options)
+        if not force and hashes.get(name) == input_hash and os.path.exists(path):
+            continue
+        jobs.append((name, data, path, dpi, options))
+        hashes[name] = input_hash
+
+    if not jobs:
+        print(f"[OK] All plots in {save_path}/ are up to date")
+        return []
+
+    n_workers = min(n_workers or os.cpu_count() or 1, len(jobs))
+    if n_workers == 1:
+        _init_plot_worker()
+        rendered = [_render_plot(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_plot_worker) as pool:
+            rendered = list(pool.map(_render_plot, *zip(*jobs)))
+
+    with open(hashes_path, 'w') as f:
+        json.dump(hashes, f, indent=4)
+    skipped = len(PLOTS) - len(rendered)
+    print(f"[OK] Rendered {len(rendered)} plot(s) at {dpi} dpi ({skipped} up to date) to {save_path}/")
+    return rendered
+
+def summarize_results(df):
+    """Numbers and tables of the report besides the metrics (as MetricsAccumulator.summary for --stream)."""
+    columns = ['Id', 'Actual', 'Predicted', 'AbsPercentError']
+    return {
+        'n': len(df),
+        'actual_min': df['Actual'].min(),
+        'actual_max': df['Actual'].max(),
+        'predicted_min': df['Predicted'].min(),
+        'predicted_max': df['Predicted'].max(),
+        'actual_mean': df['Actual'].mean(),
+        'predicted_mean': df['Predicted'].mean(),
+        'within': {threshold: len(df[df['AbsPercentError'] <= threshold]) for threshold in (5, 10, 15)},
+        'best': df.nsmallest(5, 'AbsPercentError')[columns],
+        'worst': df.nlargest(5, 'AbsPercentError')[columns],
+        'price_ranges': df.groupby('PriceRange', observed=False)['AbsPercentError'].agg(['mean', 'count'])
+    }
+
+def write_summary_report(summary, metrics, save_path="evaluation", intervals=None):
+    """Write evaluation_report.txt from the summary and the metrics (and bootstrap intervals); returns the report text."""
+    n = summary['n']
+    intervals_section = f"\n{intervals}\n" if intervals else ""
+    within_5_pct = summary['within'][5]
+    within_10_pct = summary['within'][10]
+    within_15_pct = summary['within'][15]
     
     report = f"""MODEL EVALUATION REPORT
 ======================
@@ -209,32 +376,32 @@ Mean Error (Bias):                  ${metrics['Mean_Error']:,.2f}
 Std Dev of Errors:                  ${metrics['Std_Error']:,.2f}
 Maximum Absolute Error:             ${metrics['Max_Error']:,.2f}
 Minimum Absolute Error:             ${metrics['Min_Error']:,.2f}
-
+{intervals_section}
 VALIDATION SET SUMMARY
 ----------------------
-Number of Houses:         {len(df)}
-Actual Price Range:       ${df['Actual'].min():,.0f} - ${df['Actual'].max():,.0f}
-Predicted Price Range:    ${df['Predicted'].min():,.0f} - ${df['Predicted'].max():,.0f}
-Mean Actual Price:        ${df['Actual'].mean():,.0f}
-Mean Predicted Price:     ${df['Predicted'].mean():,.0f}
+Number of Houses:         {n}
+Actual Price Range:       ${summary['actual_min']:,.0f} - ${summary['actual_max']:,.0f}
+Predicted Price Range:    ${summary['predicted_min']:,.0f} - ${summary['predicted_max']:,.0f}
+Mean Actual Price:        ${summary['actual_mean']:,.0f}
+Mean Predicted Price:     ${summary['predicted_mean']:,.0f}
 
 PREDICTION ACCURACY
 -------------------
-Houses within 5% error:   {within_5_pct} ({within_5_pct/len(df)*100:.1f}%)
-Houses within 10% error:  {within_10_pct} ({within_10_pct/len(df)*100:.1f}%)
-Houses within 15% error:  {within_15_pct} ({within_15_pct/len(df)*100:.1f}%)
+Houses within 5% error:   {within_5_pct} ({within_5_pct/n*100:.1f}%)
+Houses within 10% error:  {within_10_pct} ({within_10_pct/n*100:.1f}%)
+Houses within 15% error:  {within_15_pct} ({within_15_pct/n*100:.1f}%)
 
 TOP 5 BEST PREDICTIONS (Lowest % Error)
 ----------------------------------------
-{df.nsmallest(5, 'AbsPercentError')[['Id', 'Actual', 'Predicted', 'AbsPercentError']].to_string(index=False)}
+{summary['best'].to_string(index=False)}
 
 TOP 5 WORST PREDICTIONS (Highest % Error)
 ------------------------------------------
-{df.nlargest(5, 'AbsPercentError')[['Id', 'Actual', 'Predicted', 'AbsPercentError']].to_string(index=False)}
+{summary['worst'].to_string(index=False)}
 
 PRICE RANGE ANALYSIS
 --------------------
-{df.groupby('PriceRange', observed=False)['AbsPercentError'].agg(['mean', 'count']).to_string()}
+{summary['price_ranges'].to_string()}
 
 INTERPRETATION
 --------------
@@ -247,17 +414,60 @@ INTERPRETATION
     with open(f"{save_path}/evaluation_report.txt", 'w') as f:
         f.write(report)
     
+    return report
+
+def create_summary_report(df, metrics, save_path="evaluation", n_resamples=0):
+    """Create a summary report of the evaluation (with bootstrap confidence intervals if n_resamples > 0)."""
+    intervals = None
+    if n_resamples > 0:
+        bootstrap = bootstrap_metrics(df['Actual'], df['Predicted'], n_resamples)
+        with open(f"{save_path}/bootstrap_intervals.json", 'w') as f:
+            json.dump(bootstrap, f, indent=4)
+        intervals = format_intervals(bootstrap, n_resamples)
+    report = write_summary_report(summarize_results(df), metrics, save_path, intervals)
+    
     # Also save the full results for Excel analysis
     df.to_csv(f"{save_path}/full_evaluation_results.csv", index=False)
     
     print(report)
 
-def main():
+def stream_evaluation(chunk_size=500_000, n_workers=1, save_path="evaluation"):
+    """
+    Evaluate prediction files too large for memory chunk by chunk and write the same report.
+
+    The chunks are accumulated (in n_workers processes) into mergeable metric accumulators, so memory
+    stays bounded by the chunk size. The plots and full_evaluation_results.csv need every row and are skipped.
+    """
+    pred_path = "evaluation/validation_predictions.csv"
+    actual_path = "evaluation/validation_actual.csv"
+    for path in (pred_path, actual_path):
+        if not os.path.exists(path):
+            print(f"Error: {path} not found. Please run train_model.py first.")
+            return None
+    
+    print(f"\n1. Accumulating metrics in chunks of {chunk_size:,} rows ({n_workers} worker(s))...")
+    accumulator = accumulate_files(pred_path, actual_path, chunk_size, n_workers)
+    metrics = accumulator.metrics()
+    print(f"   [OK] Metrics of {accumulator.n:,} houses calculated")
+    for name, value in metrics.pop('Abs_Error_Percentiles').items():
+        print(f"   Absolute error {name}: ${value:,.0f}")
+    
+    print("\n2. Creating summary report...")
+    print(write_summary_report(accumulator.summary(), metrics, save_path))
+    print(f"   [OK] Report saved to {save_path}/evaluation_report.txt")
+    print("   [!] Plots and full_evaluation_results.csv are not created in --stream mode")
+    return metrics
+
+def main(preview=False, n_workers=None, force=False, scatter_mode='auto', stream=False, chunk_size=500_000, n_resamples=0):
     """Run the complete evaluation."""
     print("="*60)
     print("HOUSE PRICE MODEL EVALUATION")
     print("="*60)
     
+    if stream:
+        stream_evaluation(chunk_size, n_workers or 1)
+        return
+    
     # Load validation results
     print("\n1. Loading validation data...")
     df = load_validation_data()
@@ -272,12 +482,14 @@ def main():
     
     # Create visualizations
     print("\n3. Creating visualizations...")
-    create_visualizations(df)
+    create_visualizations(df, dpi=PREVIEW_DPI if preview else FINAL_DPI, n_workers=n_workers, force=force, scatter_mode=scatter_mode)
     
     # Create summary report
     print("\n4. Creating summary report...")
-    create_summary_report(df, metrics)
+    create_summary_report(df, metrics, n_resamples=n_resamples)
     print("   [OK] Report saved to evaluation/evaluation_report.txt")
+    if n_resamples > 0:
+        print("   [OK] Bootstrap intervals saved to evaluation/bootstrap_intervals.json")
     print("   [OK] Full results saved to evaluation/full_evaluation_results.csv")
     
     print("\n" + "="*60)
@@ -294,4 +506,17 @@ def main():
     print("  - qq_plot.png")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Evaluate the model on the validation predictions.")
+    parser.add_argument("--preview", action="store_true", help=f"Render the plots at {PREVIEW_DPI} dpi instead of {FINAL_DPI}")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes rendering the plots (default: one per plot) or accumulating chunks in --stream mode (default: 1)")
+    parser.add_argument("--force", action="store_true", help="Render all plots even if their inputs did not change")
+    parser.add_argument("--scatter-mode", choices=SCATTER_MODES, default='auto',
+                        help=f"Draw the scatter plots point by point or as a density (auto: density above {SCATTER_MAX_POINTS:,} houses)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Accumulate the metrics chunk by chunk in bounded memory (report only, no plots)")
+    parser.add_argument("--chunk-size", type=int, default=500_000, help="Rows per chunk in --stream mode")
+    parser.add_argument("--bootstrap", type=int, nargs='?', const=BOOTSTRAP_RESAMPLES, default=0, metavar="RESAMPLES",
+                        help=f"Add 95%% bootstrap confidence intervals to the report (default: {BOOTSTRAP_RESAMPLES} resamples)")
+    args = parser.parse_args()
+    main(args.preview, args.workers, args.force, args.scatter_mode, args.stream, args.chunk_size, args.bootstrap)
\ No newline at end of file
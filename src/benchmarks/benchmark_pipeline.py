@@ -0,0 +1,311 @@
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+import pandas as pd
+from src.data_generation.synthetic_ames import SyntheticAmesGenerator
+
+
+RAW_DATA_PATH = os.path.join(PROJECT_ROOT, "datasets", "ames-train.csv")
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+
+STAGES: tuple = ("preprocess", "train", "predict")
+DEFAULT_SCALES: tuple = (1, 10, 100, 1000)
+
+
+def default_core_counts() -> list:
+    """
+    Returns the core counts benchmarked by default: powers of two up to the machine's core count,
+    plus the core count itself.
+    """
+    available = os.cpu_count() or 1
+    counts = {available}
+    count = 1
+    while count < available:
+        counts.add(count)
+        count *= 2
+    return sorted(counts)
+
+
+def write_upsampled_dataset(raw: pd.DataFrame, factor: int, path: str, seed: int = 2137):
+    """
+    Write the raw dataset upsampled by the given factor to a CSV file.
+
+    At 1x the original rows are written unchanged; larger scales are streamed from
+    the synthetic Ames generator fitted on the original rows.
+
+    Parameters:
+    - raw (pd.DataFrame): Raw Ames dataset.
+    - factor (int): How many times more rows the result should have.
+    - path (str): Destination CSV file.
+    - seed (int): Seed of the generator, so that runs are comparable between commits.
+    """
+    if factor == 1:
+        raw.to_csv(path, index=False)
+        return
+
+    generator = SyntheticAmesGenerator().fit(raw)
+    generator.write_csv(path, len(raw) * factor, seed=seed)
+
+
+def _rusage_snapshot() -> dict:
+    """Return CPU time of this process and its children, and the peak RSS in MB so far."""
+    if resource is None:
+        return {"cpu_s": time.process_time(), "peak_rss_mb": None}
+
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_s = (
+        self_usage.ru_utime + self_usage.ru_stime +
+        children_usage.ru_utime + children_usage.ru_stime
+    )
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    peak_rss_mb = max(self_usage.ru_maxrss, children_usage.ru_maxrss) / divisor
+    return {"cpu_s": cpu_s, "peak_rss_mb": peak_rss_mb}
+
+
+def _limit_cores(cores: int):
+    """Restrict this (freshly started) worker process to the given number of cores."""
+    if hasattr(os, "sched_setaffinity"):
+        available = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, available[:cores])
+
+
+def run_worker(spec: dict):
+    """
+    Run a single benchmark stage and write its measurements to spec['result_path'].
+
+    Every stage runs in a fresh process, so that the peak RSS is attributable to that stage only
+    and the core limit applies to all thread and process pools started by scikit-learn.
+    """
+    _limit_cores(spec["cores"])
+    os.chdir(spec["workdir"])
+
+    stage = spec["stage"]
+    if stage == "preprocess":
+        from src.data_preprocessing.preprocess import preprocess_pipeline
+
+        before = _rusage_snapshot()
+        start = time.perf_counter()
+        df = preprocess_pipeline(spec["raw_path"], spec["featured_path"], is_training=True)
+        wall_s = time.perf_counter() - start
+        rows = len(df)
+
+    elif stage == "train":
+        import joblib
+        from src.models.train_model import train_model_with_tuning
+
+        dataset = pd.read_csv(spec["featured_path"]).dropna(subset=["SalePrice"])
+        os.makedirs("datasets/used", exist_ok=True)
+
+        before = _rusage_snapshot()
+        start = time.perf_counter()
+        model, _, _, _ = train_model_with_tuning(dataset, tune_hyperparameters=spec["tune"])
+        wall_s = time.perf_counter() - start
+        rows = len(dataset)
+
+        joblib.dump(model, spec["model_path"])
+
+    elif stage == "predict":
+        import joblib
+
+        model = joblib.load(spec["model_path"])
+        features = pd.read_csv(spec["featured_path"]).drop(columns=["SalePrice"])
+
+        before = _rusage_snapshot()
+        start = time.perf_counter()
+        model.predict(features)
+        wall_s = time.perf_counter() - start
+        rows = len(features)
+
+    else:
+        raise ValueError(f"Unknown benchmark stage: {stage}")
+
+    after = _rusage_snapshot()
+    result = {
+        "stage": stage,
+        "scale": spec["scale"],
+        "cores": spec["cores"],
+        "rows": rows,
+        "wall_s": wall_s,
+        "cpu_s": after["cpu_s"] - before["cpu_s"],
+        "peak_rss_mb": after["peak_rss_mb"],
+        "baseline_rss_mb": before["peak_rss_mb"]
+    }
+    with open(spec["result_path"], "w") as f:
+        json.dump(result, f)
+
+
+def _run_stage(spec: dict) -> dict:
+    """Start a worker process for one stage and return its measurements."""
+    env = os.environ.copy()
+    cores = str(spec["cores"])
+    # joblib/loky, OpenMP and BLAS all honour these when sizing their pools
+    env["LOKY_MAX_CPU_COUNT"] = cores
+    env["OMP_NUM_THREADS"] = cores
+    env["OPENBLAS_NUM_THREADS"] = cores
+    env["MKL_NUM_THREADS"] = cores
+
+    try:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(spec)],
+            check=True,
+            capture_output=True,
+            text=True,
+            env=env
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"Error during {spec['stage']} benchmark:")
+        print(f"Error message: {e.stderr}")
+        raise
+    with open(spec["result_path"]) as f:
+        return json.load(f)
+
+
+def _git_commit() -> str:
+    """Return the current git commit hash, or 'unknown' outside of a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return "unknown"
+
+
+def run_benchmarks(scales, core_counts, stages=STAGES, tune: bool = False, output_path: str = None) -> dict:
+    """
+    Benchmark preprocessing, training and prediction at several data scales and core counts.
+
+    Parameters:
+    - scales (iterable of int): Upsampling factors of datasets/ames-train.csv (1 = original 1,460 rows).
+    - core_counts (iterable of int): Numbers of cores each stage is allowed to use.
+    - stages (iterable of str): Subset of STAGES to run. 'predict' needs 'train', 'train' needs 'preprocess'.
+    - tune (bool): Whether training runs the full GridSearchCV (very slow at large scales).
+    - output_path (str): Where to write the JSON results. Defaults to benchmarks/results/benchmark_<commit>.json.
+
+    Returns:
+    dict: Benchmark results, as written to output_path.
+    """
+    raw = pd.read_csv(RAW_DATA_PATH)
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="house-price-bench-") as tmp:
+        for scale in scales:
+            raw_path = os.path.join(tmp, f"raw_{scale}x.csv")
+            write_upsampled_dataset(raw, scale, raw_path)
+
+            for cores in core_counts:
+                workdir = os.path.join(tmp, f"run_{scale}x_{cores}c")
+                os.makedirs(workdir, exist_ok=True)
+
+                for stage in stages:
+                    spec = {
+                        "stage": stage,
+                        "scale": scale,
+                        "cores": cores,
+                        "tune": tune,
+                        "workdir": workdir,
+                        "raw_path": raw_path,
+                        "featured_path": os.path.join(workdir, "featured.csv"),
+                        "model_path": os.path.join(workdir, "model.pkl"),
+                        "result_path": os.path.join(workdir, f"{stage}.json")
+                    }
+                    print(f"Running {stage} at {scale}x rows on {cores} core(s)...")
+                    result = _run_stage(spec)
+                    results.append(result)
+                    print(
+                        f"   [OK] wall {result['wall_s']:.2f}s, cpu {result['cpu_s']:.2f}s, "
+                        f"peak RSS {result['peak_rss_mb'] or float('nan'):.0f} MB"
+                    )
+
+    report = {
+        "commit": _git_commit(),
+        "created": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count()
+        },
+        "tune_hyperparameters": tune,
+        "results": results
+    }
+
+    if output_path is None:
+        output_path = os.path.join(RESULTS_DIR, f"benchmark_{report['commit']}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"\nBenchmark results saved to {output_path}")
+
+    return report
+
+
+def compare_results(baseline_path: str, current_path: str, threshold: float = 0.1) -> pd.DataFrame:
+    """
+    Compare two benchmark result files and flag regressions.
+
+    Parameters:
+    - baseline_path (str): Results of the reference commit.
+    - current_path (str): Results of the commit under test.
+    - threshold (float): Relative wall time increase treated as a regression. Defaults to 0.1 (10 %).
+
+    Returns:
+    pd.DataFrame: One row per (stage, scale, cores) measured in both files.
+    """
+    def _load(path):
+        with open(path) as f:
+            return pd.DataFrame(json.load(f)["results"])
+
+    keys = ["stage", "scale", "cores"]
+    columns = keys + ["wall_s", "cpu_s", "peak_rss_mb"]
+    merged = pd.merge(
+        _load(baseline_path)[columns], _load(current_path)[columns],
+        on=keys, suffixes=("_base", "_new")
+    )
+    merged["wall_ratio"] = merged["wall_s_new"] / merged["wall_s_base"]
+    merged["rss_ratio"] = merged["peak_rss_mb_new"] / merged["peak_rss_mb_base"]
+    merged["regression"] = merged["wall_ratio"] > 1.0 + threshold
+    return merged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the preprocessing, training and prediction stages.")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES),
+                        help="Upsampling factors of the raw dataset")
+    parser.add_argument("--cores", type=int, nargs="+", default=None,
+                        help="Core counts to benchmark (default: powers of two up to os.cpu_count())")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--tune", action="store_true", help="Run the full GridSearchCV during training")
+    parser.add_argument("--output", default=None, help="Path of the JSON results file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two results files instead of running benchmarks")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(json.loads(args.worker))
+    elif args.compare:
+        comparison = compare_results(*args.compare)
+        print(comparison.to_string(index=False))
+        if comparison["regression"].any():
+            print("\n[!] Wall time regressions detected")
+            sys.exit(1)
+    else:
+        run_benchmarks(args.scales, args.cores or default_core_counts(), args.stages, args.tune, args.output)
@@ -0,0 +1,363 @@
+import sys
+import os
+import json
+import time
+import queue
+import socket
+import argparse
+import platform
+import threading
+import subprocess
+import urllib.request
+import urllib.error
+from datetime import datetime
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+sys.path.append(PROJECT_ROOT)
+import numpy as np
+import pandas as pd
+from src.benchmarks.benchmark_pipeline import RAW_DATA_PATH, RESULTS_DIR, _git_commit
+
+
+SOURCES: tuple = ("ames", "synthetic")
+TARGETS: tuple = ("inprocess", "http")
+LATENCY_PERCENTILES: tuple = (50, 90, 99, 99.9)
+# Settings two reports must share to be compared (the duration may differ, the results are per second)
+COMPARED_CONFIG: tuple = ("target", "service_args", "source", "records", "concurrency", "rate", "batch_size", "fast_start")
+
+
+def load_records(source: str = "ames", n_records: int = 1000, seed: int = 2137) -> list:
+    """
+    Realistic raw house records to replay.
+
+    Parameters:
+    - source (str): 'ames' samples rows of datasets/ames-train.csv, 'synthetic' draws new rows from the
+      synthetic Ames generator fitted on them.
+    - n_records (int): Number of records.
+    - seed (int): Seed of the sampling, so that runs are comparable between commits.
+
+    Returns:
+    list: Dicts with the raw fields (without SalePrice); missing values are left out, as a client would.
+    """
+    raw = pd.read_csv(RAW_DATA_PATH)
+    if source == "ames":
+        houses = raw.sample(n_records, replace=n_records > len(raw), random_state=seed)
+    elif source == "synthetic":
+        from src.data_generation.synthetic_ames import SyntheticAmesGenerator
+        houses = SyntheticAmesGenerator().fit(raw).generate_chunk(n_records, seed=seed)
+    else:
+        raise ValueError(f"Unknown source: {source}")
+
+    houses = houses.drop(columns=["SalePrice"], errors="ignore")
+    # Round trip through JSON turns NumPy scalars into plain values and NaN into None
+    records = json.loads(houses.to_json(orient="records"))
+    return [{field: value for field, value in record.items() if value is not None} for record in records]
+
+
+class InProcessTarget:
+    """Predicts with a HousePricePredictor loaded in this process (no HTTP, no serialization)."""
+
+    def __init__(self, model_path: str = "model/", fast_start: bool = False):
+        from src.serving.predictor import HousePricePredictor
+        self.predictor = HousePricePredictor(model_path=model_path, fast_start=fast_start)
+
+    def __call__(self, records: list):
+        self.predictor.predict(records)
+
+
+class HttpTarget:
+    """Posts records to a running prediction service (/predict for one house, /predict/batch for more)."""
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def __call__(self, records: list):
+        if len(records) == 1:
+            url, body = f"{self.url}/predict", records[0]
+        else:
+            url, body = f"{self.url}/predict/batch", {'records': records}
+        request = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(model_path: str = "model/", extra_args: list = (), timeout: float = 60.0) -> tuple:
+    """
+    Start src/serving/service.py on a free local port and wait until /health answers.
+
+    Returns:
+    tuple: (subprocess.Popen, base URL). Terminate the process when done.
+    """
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_ROOT, "src", "serving", "service.py"),
+         "--port", str(port), "--model-path", model_path, *extra_args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Service exited during startup:\n{process.stderr.read()}")
+        try:
+            urllib.request.urlopen(f"{url}/health", timeout=1).read()
+            return process, url
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Service did not answer /health within {timeout}s")
+
+
+def run_load(
+    target,
+    records: list,
+    concurrency: int = 8,
+    rate: float = None,
+    duration_s: float = 10.0,
+    batch_size: int = 1,
+    warmup_requests: int = 20
+) -> dict:
+    """
+    Replay records against a target and measure throughput, latency and errors.
+
+    Without a rate the load is closed-loop: every worker sends its next request as soon as the previous
+    one is answered. With a rate the load is open-loop: requests are scheduled at exponentially
+    distributed intervals (Poisson arrivals) and their latency is counted from the scheduled time, so
+    time spent waiting for a free worker counts as well (no coordinated omission).
+
+    Parameters:
+    - target (callable): Predicts a list of records; raises on failure.
+    - records (list): Raw house records, replayed in a loop.
+    - concurrency (int): Worker threads (in-flight requests).
+    - rate (float): Requests per second (open-loop). None runs closed-loop.
+    - duration_s (float): Seconds of measured load.
+    - batch_size (int): Records per request.
+    - warmup_requests (int): Requests sent before measuring.
+
+    Returns:
+    dict: Requests, errors, throughput and latency percentiles (milliseconds).
+    """
+    batches = [records[i:i + batch_size] for i in range(0, len(records) - batch_size + 1, batch_size)]
+    if not batches:
+        raise ValueError("Fewer records than one batch")
+
+    for i in range(warmup_requests):
+        target(batches[i % len(batches)])
+
+    latencies, errors = [], {}
+    lock = threading.Lock()
+    counter = iter(range(10 ** 12))
+    schedule = queue.Queue()
+    start = time.perf_counter()
+    end = start + duration_s
+
+    def execute(scheduled: float):
+        batch = batches[next(counter) % len(batches)]
+        try:
+            target(batch)
+            latency = time.perf_counter() - scheduled
+            with lock:
+                latencies.append(latency)
+        except Exception as e:
+            kind = type(e).__name__
+            with lock:
+                errors[kind] = errors.get(kind, 0) + 1
+
+    def closed_loop_worker():
+        while time.perf_counter() < end:
+            execute(time.perf_counter())
+
+    def open_loop_worker():
+        while True:
+            scheduled = schedule.get()
+            if scheduled is None:
+                return
+            execute(scheduled)
+
+    workers = [
+        threading.Thread(target=closed_loop_worker if rate is None else open_loop_worker, daemon=True)
+        for _ in range(concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+
+    if rate is not None:
+        rng = np.random.default_rng(2137)
+        scheduled = start
+        while True:
+            scheduled += rng.exponential(1 / rate)
+            if scheduled >= end:
+                break
+            time.sleep(max(0.0, scheduled - time.perf_counter()))
+            schedule.put(scheduled)
+        for _ in workers:
+            schedule.put(None)
+
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    n_errors = sum(errors.values())
+    n_requests = len(latencies) + n_errors
+    return {
+        'requests': n_requests,
+        'errors': n_errors,
+        'error_rate': n_errors / n_requests if n_requests else None,
+        'error_kinds': errors,
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed,
+        'houses_per_second': len(latencies) * batch_size / elapsed,
+        'latency_ms': {
+            'mean': float(latencies_ms.mean()) if len(latencies_ms) else None,
+            'max': float(latencies_ms.max()) if len(latencies_ms) else None,
+            **{
+                f"p{p:g}": float(np.percentile(latencies_ms, p)) if len(latencies_ms) else None
+                for p in LATENCY_PERCENTILES
+            }
+        }
+    }
+
+
+def compare_reports(baseline_path: str, current_path: str, threshold: float = 0.1) -> dict:
+    """
+    Compare two load test reports.
+
+    Parameters:
+    - baseline_path (str): Report of the reference commit.
+    - current_path (str): Report of the commit under test.
+    - threshold (float): Relative drop of throughput or rise of p99 latency treated as a regression.
+
+    Returns:
+    dict: Ratios of throughput and p50/p99 latency, and whether any of them regressed.
+
+    Raises:
+    ValueError: If the reports were measured with different settings (COMPARED_CONFIG), e.g. an
+    in-process closed-loop run against an HTTP open-loop one.
+    """
+    def _load(path):
+        with open(path) as f:
+            return json.load(f)
+
+    base_report, new_report = _load(baseline_path), _load(current_path)
+    differences = [
+        f"{key}: {base_report['config'].get(key)!r} vs {new_report['config'].get(key)!r}"
+        for key in COMPARED_CONFIG if base_report['config'].get(key) != new_report['config'].get(key)
+    ]
+    if differences:
+        raise ValueError("The reports were measured with different settings (" + "; ".join(differences) + ")")
+
+    base, new = base_report["result"], new_report["result"]
+    comparison = {
+        'throughput_ratio': new['requests_per_second'] / base['requests_per_second'],
+        'p50_ratio': new['latency_ms']['p50'] / base['latency_ms']['p50'],
+        'p99_ratio': new['latency_ms']['p99'] / base['latency_ms']['p99'],
+        'error_rate_base': base['error_rate'],
+        'error_rate_new': new['error_rate']
+    }
+    comparison['regression'] = (
+        comparison['throughput_ratio'] < 1.0 - threshold
+        or comparison['p99_ratio'] > 1.0 + threshold
+        or (new['error_rate'] or 0) > (base['error_rate'] or 0)
+    )
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the prediction path (in-process or over HTTP), fully offline.")
+    parser.add_argument("--target", choices=TARGETS, default="inprocess")
+    parser.add_argument("--url", default=None, help="Running service to test (default: start one on a free local port)")
+    parser.add_argument("--service-args", nargs=argparse.REMAINDER, default=[],
+                        help="Arguments of the started service, e.g. --service-args --batch-wait-ms 5 (must be last)")
+    parser.add_argument("--source", choices=SOURCES, default="ames", help="Replayed houses")
+    parser.add_argument("--records", type=int, default=1000, help="Distinct houses replayed in a loop")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=None, help="Requests per second (open-loop); default closed-loop")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of measured load")
+    parser.add_argument("--batch-size", type=int, default=1, help="Houses per request")
+    parser.add_argument("--model-path", default="model/")
+    parser.add_argument("--fast-start", action="store_true", help="In-process: load the precompiled forest")
+    parser.add_argument("--output", default=None, help="Path of the JSON report")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two reports instead of running a load test")
+    args = parser.parse_args()
+
+    if args.compare:
+        try:
+            comparison = compare_reports(*args.compare)
+        except json.JSONDecodeError:
+            raise
+        except ValueError as e:
+            # Not a regression: the reports cannot be compared at all
+            print(f"[!] {e}")
+            sys.exit(2)
+        print(json.dumps(comparison, indent=4))
+        if comparison['regression']:
+            print("\n[!] Throughput, latency or error rate regression detected")
+            sys.exit(1)
+        sys.exit(0)
+
+    records = load_records(args.source, args.records)
+    service = None
+    if args.target == "inprocess":
+        target = InProcessTarget(args.model_path, args.fast_start)
+    else:
+        url = args.url
+        if url is None:
+            service, url = start_service(args.model_path, args.service_args)
+            print(f"[OK] Service started on {url}")
+        target = HttpTarget(url)
+
+    mode = f"{args.rate:g} req/s open-loop" if args.rate else "closed-loop"
+    print(f"Load testing {args.target} target: {args.concurrency} workers, {mode}, {args.batch_size} house(s) per request, {args.duration:g}s...")
+    try:
+        result = run_load(target, records, args.concurrency, args.rate, args.duration, args.batch_size)
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+
+    report = {
+        "commit": _git_commit(),
+        "created": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count()
+        },
+        "config": {
+            "target": args.target,
+            "service_args": args.service_args if args.target == "http" and args.url is None else None,
+            "source": args.source,
+            "records": args.records,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "duration_s": args.duration,
+            "batch_size": args.batch_size,
+            "fast_start": args.fast_start
+        },
+        "result": result
+    }
+
+    latency = result['latency_ms']
+    print(
+        f"[OK] {result['requests']:,} requests, {result['requests_per_second']:,.1f} req/s "
+        f"({result['houses_per_second']:,.1f} houses/s), p50 {latency['p50'] or float('nan'):.1f} ms, "
+        f"p99 {latency['p99'] or float('nan'):.1f} ms, errors {result['errors']} ({(result['error_rate'] or 0):.2%})"
+    )
+
+    output_path = args.output or os.path.join(RESULTS_DIR, f"load_{args.target}_{report['commit']}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Load test report saved to {output_path}")
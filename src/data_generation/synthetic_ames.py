@@ -0,0 +1,204 @@
+import sys
+import os
+import argparse
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+import numpy as np
+import pandas as pd
+
+
+# Columns describing the size of the house. They are scaled together by one per-row factor,
+# so that e.g. 1stFlrSF + 2ndFlrSF + LowQualFinSF still adds up to GrLivArea
+SIZE_COLUMNS: tuple = (
+    "MasVnrArea", "BsmtFinSF1", "BsmtFinSF2", "BsmtUnfSF", "1stFlrSF", "2ndFlrSF",
+    "LowQualFinSF", "GarageArea", "WoodDeckSF", "OpenPorchSF", "EnclosedPorch",
+    "3SsnPorch", "ScreenPorch", "PoolArea"
+)
+
+# Columns describing the size of the lot, scaled by a separate per-row factor
+LOT_COLUMNS: tuple = ("LotArea", "LotFrontage")
+
+# Categorical columns that are tied to the house structure and must stay consistent with the
+# numeric columns (e.g. a '1Story' house has no second floor). Columns with missing values
+# are added to this list automatically, so that joint missingness patterns survive
+# (no garage -> GarageType, GarageFinish, GarageQual, GarageCond and GarageYrBlt all missing).
+STRUCTURAL_CATEGORIES: tuple = ("MSZoning", "BldgType", "HouseStyle", "Foundation", "CentralAir")
+
+# How strongly the sale price follows the size of the house (price ~ size ** elasticity)
+PRICE_SIZE_ELASTICITY: float = 0.7
+
+
+class SyntheticAmesGenerator:
+    """
+    Generates plausible Ames housing rows learned from the real dataset.
+
+    Every synthetic row is built in three steps:
+    1. A (Neighborhood, OverallQual) cell is drawn from the joint frequencies of the real data.
+    2. A donor house from that cell provides the numeric columns and the structural categorical
+       columns (including their missing values, which clean_data has to impute later).
+       House size, lot size and price are perturbed with per-row log-normal factors.
+    3. The remaining categorical columns are drawn from their per-column frequencies.
+
+    Generation is streamed in chunks and every chunk has its own seed derived from (seed, chunk index),
+    so chunk N is always the same regardless of chunk order or how many rows were generated before.
+    """
+
+    def __init__(self, size_noise: float = 0.08, lot_noise: float = 0.10, price_noise: float = 0.05):
+        """
+        Parameters:
+        - size_noise (float): Standard deviation of the log of the house size factor.
+        - lot_noise (float): Standard deviation of the log of the lot size factor.
+        - price_noise (float): Standard deviation of the log of the extra price noise.
+        """
+        self.size_noise = size_noise
+        self.lot_noise = lot_noise
+        self.price_noise = price_noise
+
+    def fit(self, df: pd.DataFrame) -> "SyntheticAmesGenerator":
+        """
+        Learn the distributions of the real dataset.
+
+        Parameters:
+        df (pd.DataFrame): Raw Ames dataset (as in datasets/ames-train.csv).
+
+        Returns:
+        SyntheticAmesGenerator: self
+        """
+        self.columns_ = df.columns.tolist()
+        self.integer_columns_ = df.select_dtypes(include="integer").columns.tolist()
+
+        numeric_columns = df.select_dtypes(include="number").columns.drop("Id", errors="ignore").tolist()
+        categorical_columns = df.select_dtypes(include="object").columns.tolist()
+        structural_columns = [
+            column for column in categorical_columns
+            if column in STRUCTURAL_CATEGORIES or column == "Neighborhood" or df[column].isnull().any()
+        ]
+        self.free_categories_ = {}
+        for column in categorical_columns:
+            if column in structural_columns:
+                continue
+            frequencies = df[column].value_counts(dropna=False, normalize=True)
+            self.free_categories_[column] = (frequencies.index.to_numpy(dtype=object), frequencies.to_numpy())
+
+        self.donors_ = df[numeric_columns + structural_columns].reset_index(drop=True)
+
+        # Group donor rows by their (Neighborhood, OverallQual) cell
+        cells = df["Neighborhood"].astype(str) + "|" + df["OverallQual"].astype(str)
+        codes, uniques = pd.factorize(cells.reset_index(drop=True))
+        counts = np.bincount(codes)
+        self.cells_ = uniques.tolist()
+        self.cell_probabilities_ = counts / counts.sum()
+        self.cell_sizes_ = counts
+        self.cell_starts_ = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self.cell_members_ = np.argsort(codes, kind="stable")
+
+        return self
+
+    def generate_chunk(self, n_rows: int, seed: int = 2137, chunk_index: int = 0, start_id: int = 1) -> pd.DataFrame:
+        """
+        Generate a single chunk of synthetic rows.
+
+        Parameters:
+        - n_rows (int): Number of rows to generate.
+        - seed (int): Seed of the whole stream.
+        - chunk_index (int): Position of the chunk in the stream, mixed into the seed.
+        - start_id (int): Id of the first row of the chunk.
+
+        Returns:
+        pd.DataFrame: Rows with the same columns (and order) as the dataset the generator was fitted on.
+        """
+        rng = np.random.default_rng([seed, chunk_index])
+
+        # 1. Draw cells and a donor inside every cell
+        cells = rng.choice(len(self.cells_), size=n_rows, p=self.cell_probabilities_)
+        offsets = np.floor(rng.random(n_rows) * self.cell_sizes_[cells]).astype(int)
+        donors = self.cell_members_[self.cell_starts_[cells] + offsets]
+        chunk = self.donors_.iloc[donors].reset_index(drop=True)
+
+        # 2. Perturb house size, lot size and price
+        size_factor = rng.lognormal(0.0, self.size_noise, n_rows)
+        lot_factor = rng.lognormal(0.0, self.lot_noise, n_rows)
+        price_factor = rng.lognormal(0.0, self.price_noise, n_rows)
+
+        for column in SIZE_COLUMNS:
+            if column in chunk.columns:
+                chunk[column] = (chunk[column] * size_factor).round()
+        for column in LOT_COLUMNS:
+            if column in chunk.columns:
+                chunk[column] = (chunk[column] * lot_factor).round()
+
+        # Keep the totals consistent with their scaled parts
+        if {"TotalBsmtSF", "BsmtFinSF1", "BsmtFinSF2", "BsmtUnfSF"}.issubset(chunk.columns):
+            chunk["TotalBsmtSF"] = chunk["BsmtFinSF1"] + chunk["BsmtFinSF2"] + chunk["BsmtUnfSF"]
+        if {"GrLivArea", "1stFlrSF", "2ndFlrSF", "LowQualFinSF"}.issubset(chunk.columns):
+            chunk["GrLivArea"] = chunk["1stFlrSF"] + chunk["2ndFlrSF"] + chunk["LowQualFinSF"]
+        if "SalePrice" in chunk.columns:
+            chunk["SalePrice"] = (
+                chunk["SalePrice"] * size_factor ** PRICE_SIZE_ELASTICITY * price_factor
+            ).round()
+
+        # 3. Draw the remaining categorical columns from their frequencies
+        for column, (values, probabilities) in self.free_categories_.items():
+            chunk[column] = values[rng.choice(len(values), size=n_rows, p=probabilities)]
+
+        if "Id" in self.columns_:
+            chunk["Id"] = np.arange(start_id, start_id + n_rows)
+
+        # Scaling turned fully observed integer columns into floats
+        for column in self.integer_columns_:
+            chunk[column] = chunk[column].astype("int64")
+
+        return chunk[self.columns_]
+
+    def generate(self, n_rows: int, chunk_size: int = 100_000, seed: int = 2137):
+        """
+        Stream synthetic rows in chunks.
+
+        Parameters:
+        - n_rows (int): Total number of rows to generate.
+        - chunk_size (int): Maximum number of rows per chunk.
+        - seed (int): Seed of the stream. The same seed and chunk_size always give the same rows.
+
+        Yields:
+        pd.DataFrame: Consecutive chunks of synthetic rows with unique Ids.
+        """
+        for chunk_index, start in enumerate(range(0, n_rows, chunk_size)):
+            size = min(chunk_size, n_rows - start)
+            yield self.generate_chunk(size, seed=seed, chunk_index=chunk_index, start_id=start + 1)
+
+    def write_csv(self, path: str, n_rows: int, chunk_size: int = 100_000, seed: int = 2137):
+        """
+        Stream synthetic rows to a CSV file without holding the whole dataset in memory.
+
+        Parameters:
+        - path (str): Destination CSV file.
+        - n_rows (int): Total number of rows to generate.
+        - chunk_size (int): Number of rows generated and written at once.
+        - seed (int): Seed of the stream.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        for chunk_index, chunk in enumerate(self.generate(n_rows, chunk_size=chunk_size, seed=seed)):
+            chunk.to_csv(path, mode="w" if chunk_index == 0 else "a", header=chunk_index == 0, index=False)
+
+
+def load_generator(path: str = "datasets/ames-train.csv") -> SyntheticAmesGenerator:
+    """Fit a generator on the raw Ames dataset stored at path."""
+    return SyntheticAmesGenerator().fit(pd.read_csv(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic Ames housing data.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of rows to generate")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Rows generated and written at once")
+    parser.add_argument("--seed", type=int, default=2137)
+    parser.add_argument("--source", default="datasets/ames-train.csv", help="Real dataset to learn from")
+    parser.add_argument("--output", default="datasets/synthetic/ames-synthetic.csv")
+    args = parser.parse_args()
+
+    generator = load_generator(args.source)
+    generator.write_csv(args.output, args.rows, chunk_size=args.chunk_size, seed=args.seed)
+    print(f"Saved {args.rows:,} synthetic rows to {args.output}")
@@ -1,16 +1,30 @@
 import sys
 import os  
+import json
+from contextlib import nullcontext
 
 # This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+import numpy as np
 import pandas as pd
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import OrdinalEncoder
 from src.utils.logger import get_logger
 from src.features.build_features import engineer_features
+from src.features.schema import encode_with_schema
 
 logger = get_logger(__name__, log_file="logs/preprocess.log")
 
+INPUT_DEFAULTS_PATH = "model/input_defaults.json"
+
+# Groups of fields describing a part of the house that may be missing. When the indicator column is 0
+# the house has no such part and the fields get the value cleaning assigns to such houses;
+# otherwise they get the most common value among houses that have it.
+CONDITIONAL_DEFAULTS: dict = {
+    'garage': ('GarageCars', ('GarageType', 'GarageFinish', 'GarageQual', 'GarageCond')),
+    'basement': ('TotalBsmtSF', ('BsmtQual', 'BsmtCond', 'BsmtExposure', 'BsmtFinType1', 'BsmtFinType2')),
+    'fireplace': ('Fireplaces', ('FireplaceQu', )),
+    'pool': ('PoolArea', ('PoolQC', ))
+}
+
 
 def load_data(path):
     """Load data from CSV file."""
@@ -34,9 +48,10 @@ def remove_outliers(df: pd.DataFrame) -> pd.DataFrame:
     return df[(df["SalePrice"] <= upper_bound) & (df["SalePrice"] >= lower_bound)]
 
 
-def clean_data(df: pd.DataFrame, do_remove_outliers:bool = True):
+def clean_data(df: pd.DataFrame, do_remove_outliers:bool = True, verbose: bool = True):
     """Clean data by imputing missing values & removing outliers."""
-    logger.info("Starting data cleaning process")
+    if verbose:
+        logger.info("Starting data cleaning process")
 
     # Remove redundant 
 
@@ -44,6 +59,15 @@ def clean_data(df: pd.DataFrame, do_remove_outliers:bool = True):
     if do_remove_outliers:
         df = remove_outliers(df)
     
+    # Nothing to impute (e.g. houses to predict, already filled with the input defaults)
+    if not df.isnull().values.any():
+        if verbose:
+            print("Data cleaning complete")
+        return df
+    
+    # Imported here, so that the serving path does not import scikit-learn
+    from sklearn.impute import SimpleImputer
+    
     # Input missing values
     num_imputer = SimpleImputer(strategy="median")
     cat_imputer = SimpleImputer(strategy="most_frequent")
@@ -54,7 +78,7 @@ def clean_data(df: pd.DataFrame, do_remove_outliers:bool = True):
     # Log numeric columns with missing values
     for col in num_cols:
         missing = df[col].isnull().sum()
-        if missing > 0:
+        if missing > 0 and verbose:
             print(
                 f"Filling {missing} missing values in numeric column '{col}' using most frequent value."
             )
@@ -64,80 +88,188 @@ def clean_data(df: pd.DataFrame, do_remove_outliers:bool = True):
     # Log categorical columns with missing values
     for col in cat_cols:
         missing = df[col].isnull().sum()
-        if missing > 0:
+        if missing > 0 and verbose:
             print(
                 f"Filling {missing} missing values in categorical column '{col}' using constant NOT_PRESENT."
             )
 
     df.loc[:, cat_cols] = cat_imputer.fit_transform(df[cat_cols])
     
-    print("Data cleaning complete")        
+    if verbose:
+        print("Data cleaning complete")        
     return df
 
 
-def encode_hierarchical_categories(df: pd.DataFrame) -> pd.DataFrame:
-    quality_encoder: OrdinalEncoder = OrdinalEncoder(categories=[['NOT_PRESENT', 'Po', 'Fa', 'TA', 'Gd', 'Ex']])
-    quality_categories: tuple = (
+# Categories with a natural order, encoded as their position in the list (worst first)
+QUALITY_CATEGORIES: list = ['NOT_PRESENT', 'Po', 'Fa', 'TA', 'Gd', 'Ex']
+HIERARCHICAL_CATEGORIES: dict = {
+    'PavedDrive': ["N", "P", "Y"],
+    'GarageFinish': ["NOT_PRESENT", "Unf", "RFn", "Fin"],
+    'Functional': ["Sal", "Sev", "Maj2", "Maj1", "Mod", "Min2", "Min1", "Typ"],
+    **{column: QUALITY_CATEGORIES for column in (
         "ExterQual", "ExterCond", "BsmtQual", "BsmtCond", 
         "HeatingQC", "KitchenQual", "FireplaceQu", "GarageQual", 
         "GarageCond", "PoolQC"
-    )
+    )},
+    'Street': ['NOT_PRESENT', 'Grvl', 'Pave'],
+    'Alley': ['NOT_PRESENT', 'Grvl', 'Pave'],
+    'LotShape': ["IR3", "IR2", "IR1", "Reg"],
+    'Utilities': ['AllPub', 'NoSewr', 'NoSeWa', 'ELO'],
+    'LandSlope': ["Gtl", "Mod", "Sev"],
+    'BsmtExposure': ["NOT_PRESENT", "No", "Mn", "Av", "Gd"],
+    'BsmtFinType1': ["NOT_PRESENT", "Unf", "LwQ", "Rec", "BLQ", "ALQ", "GLQ"],
+    'BsmtFinType2': ["NOT_PRESENT", "Unf", "LwQ", "Rec", "BLQ", "ALQ", "GLQ"]
+}
+
 
-    street_encoder: OrdinalEncoder = OrdinalEncoder(categories=[['NOT_PRESENT', 'Grvl', 'Pave']])
-    street_categories: tuple = ('Street', 'Alley')
+def encode_hierarchical_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ordinal encoding of HIERARCHICAL_CATEGORIES (same output as sklearn's OrdinalEncoder with fixed
+    categories, without importing scikit-learn on the serving path).
+    """
+    for column, categories in HIERARCHICAL_CATEGORIES.items():
+        codes = pd.Categorical(df[column], categories=categories).codes
+        if (codes < 0).any():
+            unknown = sorted(df[column][codes < 0].astype(str).unique())
+            raise ValueError(f"Found unknown categories {unknown} in column '{column}'")
+        df[column] = codes.astype(float)
+    
+    return df
 
-    shape_encoder: OrdinalEncoder = OrdinalEncoder(categories=[["IR3", "IR2", "IR1", "Reg"]])
-    shape_categories: tuple = ("LotShape", )
 
-    utilities_encoder: OrdinalEncoder = OrdinalEncoder(categories=[['AllPub', 'NoSewr', 'NoSeWa', 'ELO']])
-    utilities_categories: tuple = ("Utilities", )
+def transform_data(
+    df: pd.DataFrame,
+    is_training=True,
+    do_remove_outliers: bool = True,
+    verbose: bool = True,
+    schema: dict = None,
+    timer=None
+) -> pd.DataFrame:
+    """
+    In-memory part of the preprocessing pipeline: clean -> engineer features -> encode
+    
+    Parameters:
+    df (pd.DataFrame): Raw data (as in datasets/ames-train.csv)
+    is_training (bool): Whether this is training data (has SalePrice)
+    do_remove_outliers (bool): Whether to remove SalePrice outliers
+    verbose (bool): Whether to print and log progress (disabled on the serving path)
+    schema (dict): Feature schema of a trained model (see src/features/schema.py). When given, the output
+    is encoded and aligned to exactly the model's features
+    timer (StageTimer): Records the latency of every step (see src/serving/metrics.py). None does not measure
+    
+    Returns:
+    pd.DataFrame: Featured and one-hot encoded data
+    """
+    def stage(name):
+        return timer.time(name) if timer is not None else nullcontext()
 
-    slope_encoder: OrdinalEncoder = OrdinalEncoder(categories=[["Gtl", "Mod", "Sev"]])
-    slope_categories: tuple = ("LandSlope", )
+    # Clean data
+    with stage("clean_data"):
+        df_cleaned = clean_data(df, do_remove_outliers=do_remove_outliers, verbose=verbose)
+    if verbose:
+        logger.info(f"Cleaned data shape: {df_cleaned.shape}")
+    
+    # Engineer features
+    if verbose:
+        logger.info("Starting feature engineering")
+    with stage("engineer_features"):
+        df_featured = engineer_features(df_cleaned, is_training=is_training, verbose=verbose)
+    if verbose:
+        logger.info(f"Featured data shape: {df_featured.shape}")
+    
+    # Encode categories that represent some kind of hierarchy
+    with stage("encode_hierarchical"):
+        df_featured = encode_hierarchical_categories(df_featured)
 
-    basement_exposure_encoder: OrdinalEncoder = OrdinalEncoder(
-        categories=[["NOT_PRESENT", "No", "Mn", "Av", "Gd"]]
-    )
-    basement_exposure_categories: tuple = ("BsmtExposure",)
+    # Convert categorical features to numeric using one-hot encoding
+    if schema is not None:
+        # One-hot encoding and alignment with the model's columns are a single step here
+        with stage("encode_align"):
+            return encode_with_schema(df_featured, schema)
+    with stage("get_dummies"):
+        return pd.get_dummies(df_featured)
 
-    basement_living_quatres_encoder: OrdinalEncoder = OrdinalEncoder(
-        categories=[["NOT_PRESENT", "Unf", "LwQ", "Rec", "BLQ", "ALQ", "GLQ"]]
-    )
-    basement_living_quatres_categories: tuple = ("BsmtFinType1", "BsmtFinType2")
 
-    functionality_encoder: OrdinalEncoder = OrdinalEncoder(
-        categories=[["Sal", "Sev", "Maj2", "Maj1", "Mod", "Min2", "Min1", "Typ"]]
-    )
-    functionality_categories: tuple = ("Functional", )
-
-    finish_encoder: OrdinalEncoder = OrdinalEncoder(categories=[["NOT_PRESENT", "Unf", "RFn", "Fin"]])
-    finish_categories: tuple = ("GarageFinish", )
-
-    paved_encoder: OrdinalEncoder = OrdinalEncoder(categories=[["N", "P", "Y"]])
-    paved_categories: tuple = ("PavedDrive", )
-
-    for column in paved_categories:
-        df[column] = paved_encoder.fit_transform(df[[column]])
-    for column in finish_categories:
-        df[column] = finish_encoder.fit_transform(df[[column]])
-    for column in functionality_categories:
-        df[column] = functionality_encoder.fit_transform(df[[column]])
-    for column in quality_categories:
-        df[column] = quality_encoder.fit_transform(df[[column]])
-    for column in street_categories:
-        df[column] = street_encoder.fit_transform(df[[column]])
-    for column in shape_categories:
-        df[column] = shape_encoder.fit_transform(df[[column]])
-    for column in utilities_categories:
-        df[column] = utilities_encoder.fit_transform(df[[column]])
-    for column in slope_categories:
-        df[column] = slope_encoder.fit_transform(df[[column]])
-    for column in basement_exposure_categories:
-        df[column] = basement_exposure_encoder.fit_transform(df[[column]])
-    for column in basement_living_quatres_categories:
-        df[column] = basement_living_quatres_encoder.fit_transform(df[[column]])
+def compute_input_defaults(df: pd.DataFrame, target_column: str = "SalePrice") -> dict:
+    """
+    Default values of raw input fields, used when a house to predict does not specify them.
     
-    return df
+    Parameters:
+    df (pd.DataFrame): Raw training data (as in datasets/ames-train.csv)
+    target_column (str): Column excluded from the inputs
+    
+    Returns:
+    dict: 'columns' (ordered raw input columns), 'numeric' (numeric columns), 'values' (median of numeric
+    and mode of categorical fields) and 'conditional' (per group of CONDITIONAL_DEFAULTS: indicator column,
+    defaults for houses with ('present') and without ('absent') that part)
+    """
+    inputs = df.drop(columns=[target_column], errors="ignore")
+    numeric = inputs.select_dtypes(include="number").columns.tolist()
+    
+    values = {column: float(inputs[column].median()) for column in numeric}
+    values.update({column: inputs[column].mode()[0] for column in inputs.columns if column not in numeric})
+    # The Id is not a property of the house
+    values['Id'] = 0
+    
+    conditional = {}
+    for group, (indicator, columns) in CONDITIONAL_DEFAULTS.items():
+        has_part = inputs[indicator] > 0
+        conditional[group] = {
+            'indicator': indicator,
+            'present': {column: inputs.loc[has_part, column].mode()[0] for column in columns},
+            # Missing values of houses without the part are imputed with the overall mode by clean_data
+            'absent': {column: values[column] for column in columns}
+        }
+    
+    return {'columns': inputs.columns.tolist(), 'numeric': numeric, 'values': values, 'conditional': conditional}
+
+
+def save_input_defaults(df: pd.DataFrame, path: str = INPUT_DEFAULTS_PATH) -> dict:
+    """Compute the input defaults of the raw training data and save them as JSON."""
+    defaults = compute_input_defaults(df)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(defaults, f, indent=4)
+    logger.info(f"Input defaults saved to {path}")
+    return defaults
+
+
+def load_input_defaults(path: str = INPUT_DEFAULTS_PATH, reference_path: str = "datasets/ames-train.csv") -> dict:
+    """
+    Load the input defaults saved by the preprocessing pipeline.
+    Falls back to computing them from the raw training data if the file does not exist yet.
+    """
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return compute_input_defaults(pd.read_csv(reference_path))
+
+
+def fill_input_defaults(df: pd.DataFrame, defaults: dict) -> pd.DataFrame:
+    """
+    Fill missing raw input fields of houses to predict with the defaults (conditional defaults first).
+    
+    Parameters:
+    df (pd.DataFrame): Raw houses, any subset of the raw input columns
+    defaults (dict): Output of compute_input_defaults / load_input_defaults
+    
+    Returns:
+    pd.DataFrame: Houses with all raw input columns, in training order, without missing values
+    """
+    df = df.reindex(columns=defaults['columns'])
+    for column in defaults['numeric']:
+        try:
+            df[column] = pd.to_numeric(df[column])
+        except (ValueError, TypeError):
+            raise ValueError(f"Field '{column}' must be numeric")
+    
+    for group in defaults['conditional'].values():
+        has_part = df[group['indicator']].fillna(defaults['values'][group['indicator']]) > 0
+        for column, present in group['present'].items():
+            fill = np.where(has_part, present, group['absent'][column])
+            df[column] = df[column].fillna(pd.Series(fill, index=df.index))
+    
+    return df.fillna(defaults['values']).infer_objects()
 
 
 def preprocess_pipeline(input_path, output_path, is_training=True):
@@ -153,20 +285,12 @@ def preprocess_pipeline(input_path, output_path, is_training=True):
     df = load_data(input_path)
     logger.info(f"Loaded data shape: {df.shape}")
     
-    # Clean data
-    df_cleaned = clean_data(df)
-    logger.info(f"Cleaned data shape: {df_cleaned.shape}")
-    
-    # Engineer features
-    logger.info("Starting feature engineering")
-    df_featured = engineer_features(df_cleaned, is_training=is_training)
-    logger.info(f"Featured data shape: {df_featured.shape}")
+    # Defaults of fields not given when predicting (used by the app and the prediction service)
+    if is_training:
+        save_input_defaults(df)
     
-    # Encode categories that represent some kind of hierarchy
-    df_featured = encode_hierarchical_categories(df_featured)
-
-    # Convert categorical features to numeric using one-hot encoding
-    df_featured = pd.get_dummies(df_featured)
+    # Clean, engineer features and encode
+    df_featured = transform_data(df, is_training=is_training)
 
     # Save processed data
     df_featured.to_csv(output_path, index=False)
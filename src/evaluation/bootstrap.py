@@ -0,0 +1,255 @@
+import sys
+import os
+import json
+import argparse
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+import numpy as np
+import pandas as pd
+from src.evaluation.streaming_metrics import PRICE_BINS, PRICE_LABELS
+
+
+# Resamples of the confidence intervals and their level
+BOOTSTRAP_RESAMPLES = 2000
+CONFIDENCE_LEVEL = 0.95
+# Elements of one chunk of the (resamples x houses) index matrix, bounding the memory of the resampled arrays
+MAX_CHUNK_ELEMENTS = 4_000_000
+# Metrics where a higher value is better (the others are errors)
+HIGHER_IS_BETTER = ('R2',)
+
+
+def price_range_codes(actual) -> np.ndarray:
+    """Index into PRICE_LABELS of every price (bins right-closed like pd.cut); len(PRICE_LABELS) outside the bins."""
+    codes = np.searchsorted(PRICE_BINS, np.asarray(actual, dtype=float), side='left') - 1
+    codes[(codes < 0) | (codes >= len(PRICE_LABELS))] = len(PRICE_LABELS)
+    return codes
+
+
+def _resampled_metrics(actual: np.ndarray, predicted: np.ndarray, codes: np.ndarray, indices: np.ndarray) -> dict:
+    """
+    Metrics of every resample of one chunk of the index matrix (one resample per row), all at once.
+
+    Parameters:
+    - actual (np.ndarray): Actual prices.
+    - predicted (np.ndarray): Predicted prices.
+    - codes (np.ndarray): price_range_codes(actual).
+    - indices (np.ndarray): Shape (n_resamples, n_houses), houses drawn into each resample.
+
+    Returns:
+    dict: Metric name -> array of n_resamples values; 'MAPE_by_price_range' -> (n_resamples, n_ranges) array.
+    """
+    n_resamples, n = indices.shape
+    error = predicted - actual
+    abs_percent_error = np.abs(error / actual) * 100
+    # Centered, so that the variance of a resample is not the difference of two huge sums
+    centered = actual - actual.mean()
+
+    resampled_error = error[indices]
+    resampled_ape = abs_percent_error[indices]
+    resampled_actual = centered[indices]
+
+    sse = (resampled_error ** 2).sum(axis=1)
+    sst = (resampled_actual ** 2).sum(axis=1) - resampled_actual.sum(axis=1) ** 2 / n
+
+    # Per-range sums of one bincount over (resample, range) pairs; the last range collects prices outside the bins
+    n_ranges = len(PRICE_LABELS) + 1
+    pairs = (np.arange(n_resamples)[:, None] * n_ranges + codes[indices]).ravel()
+    range_sums = np.bincount(pairs, weights=resampled_ape.ravel(), minlength=n_resamples * n_ranges).reshape(n_resamples, n_ranges)
+    range_counts = np.bincount(pairs, minlength=n_resamples * n_ranges).reshape(n_resamples, n_ranges)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        range_mape = range_sums / range_counts
+
+    return {
+        'RMSE': np.sqrt(sse / n),
+        'MAE': np.abs(resampled_error).mean(axis=1),
+        'R2': 1 - sse / sst,
+        'MAPE': resampled_ape.mean(axis=1),
+        'MAPE_by_price_range': range_mape[:, :-1]
+    }
+
+
+def _bootstrap_distributions(actual: np.ndarray, predictions: list, n_resamples: int, seed: int) -> list:
+    """Resampled metrics of every predictions array, all on the same resamples (generated chunk by chunk)."""
+    n = len(actual)
+    codes = price_range_codes(actual)
+    chunk_rows = max(1, MAX_CHUNK_ELEMENTS // n)
+    rng = np.random.default_rng(seed)
+
+    chunks = [[] for _ in predictions]
+    for start in range(0, n_resamples, chunk_rows):
+        indices = rng.integers(0, n, size=(min(chunk_rows, n_resamples - start), n))
+        for chunk, predicted in zip(chunks, predictions):
+            chunk.append(_resampled_metrics(actual, predicted, codes, indices))
+
+    return [{name: np.concatenate([part[name] for part in chunk]) for name in chunk[0]} for chunk in chunks]
+
+
+def _point_metrics(actual: np.ndarray, predicted: np.ndarray) -> dict:
+    """The metrics of the whole set, computed like a single resample that contains every house once."""
+    return {
+        name: values[0]
+        for name, values in _resampled_metrics(actual, predicted, price_range_codes(actual), np.arange(len(actual))[None, :]).items()
+    }
+
+
+def _interval(estimate: float, distribution: np.ndarray, confidence: float) -> dict:
+    alpha = 1 - confidence
+    # Ranges empty in a resample give NaN and are left out
+    lower, upper = np.nanquantile(distribution, [alpha / 2, 1 - alpha / 2])
+    return {'estimate': float(estimate), 'lower': float(lower), 'upper': float(upper)}
+
+
+def bootstrap_metrics(
+    actual,
+    predicted,
+    n_resamples: int = BOOTSTRAP_RESAMPLES,
+    confidence: float = CONFIDENCE_LEVEL,
+    seed: int = 2137
+) -> dict:
+    """
+    Percentile bootstrap confidence intervals of RMSE, MAE, R2, MAPE and the MAPE of each price range.
+
+    The resamples are rows of a (n_resamples x n_houses) index matrix and are evaluated together with
+    vectorized NumPy, in chunks of at most MAX_CHUNK_ELEMENTS drawn houses.
+
+    Parameters:
+    - actual (array-like): Actual prices.
+    - predicted (array-like): Predicted prices, in the same order.
+    - n_resamples (int): Bootstrap resamples.
+    - confidence (float): Confidence level of the intervals.
+    - seed (int): Seed of the resamples.
+
+    Returns:
+    dict: Metric name -> {'estimate', 'lower', 'upper'}; 'MAPE_by_price_range' -> {price range -> interval}
+    (ranges without houses are left out).
+    """
+    actual = np.asarray(actual, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+    estimates = _point_metrics(actual, predicted)
+    distribution = _bootstrap_distributions(actual, [predicted], n_resamples, seed)[0]
+
+    intervals = {
+        name: _interval(estimates[name], distribution[name], confidence)
+        for name in ('RMSE', 'MAE', 'R2', 'MAPE')
+    }
+    intervals['MAPE_by_price_range'] = {
+        label: _interval(estimates['MAPE_by_price_range'][i], distribution['MAPE_by_price_range'][:, i], confidence)
+        for i, label in enumerate(PRICE_LABELS)
+        if np.isfinite(estimates['MAPE_by_price_range'][i])
+    }
+    return intervals
+
+
+def paired_bootstrap(
+    actual,
+    predicted_old,
+    predicted_new,
+    n_resamples: int = BOOTSTRAP_RESAMPLES,
+    confidence: float = CONFIDENCE_LEVEL,
+    seed: int = 2137
+) -> dict:
+    """
+    Paired bootstrap comparison of two models predicting the same houses.
+
+    Both models are evaluated on the same resamples, so the interval of the difference only reflects
+    how the two models differ, not how hard the drawn houses are.
+
+    Parameters:
+    - actual (array-like): Actual prices.
+    - predicted_old (array-like): Predictions of the current model.
+    - predicted_new (array-like): Predictions of the new model, in the same order.
+    - n_resamples (int): Bootstrap resamples.
+    - confidence (float): Confidence level of the intervals.
+    - seed (int): Seed of the resamples.
+
+    Returns:
+    dict: Metric name -> {'old', 'new', 'difference' (new - old), 'lower', 'upper', 'p_not_better', 'significant'};
+    p_not_better is the share of resamples where the new model is not better, significant means the interval
+    of the difference excludes zero in favour of the new model.
+    """
+    actual = np.asarray(actual, dtype=float)
+    predictions = [np.asarray(predicted_old, dtype=float), np.asarray(predicted_new, dtype=float)]
+    old, new = [_point_metrics(actual, predicted) for predicted in predictions]
+    old_distribution, new_distribution = _bootstrap_distributions(actual, predictions, n_resamples, seed)
+
+    comparison = {}
+    for name in ('RMSE', 'MAE', 'R2', 'MAPE'):
+        differences = new_distribution[name] - old_distribution[name]
+        interval = _interval(new[name] - old[name], differences, confidence)
+        # Sign that makes an improvement positive
+        sign = 1 if name in HIGHER_IS_BETTER else -1
+        comparison[name] = {
+            'old': float(old[name]),
+            'new': float(new[name]),
+            'difference': interval['estimate'],
+            'lower': interval['lower'],
+            'upper': interval['upper'],
+            'p_not_better': float(np.mean(sign * differences <= 0)),
+            'significant': bool(interval['lower'] > 0 if sign > 0 else interval['upper'] < 0)
+        }
+    return comparison
+
+
+def format_intervals(intervals: dict, n_resamples: int = BOOTSTRAP_RESAMPLES, confidence: float = CONFIDENCE_LEVEL) -> str:
+    """Text block of the confidence intervals for evaluation_report.txt."""
+    title = f"CONFIDENCE INTERVALS ({confidence:.0%} bootstrap, {n_resamples:,} resamples)"
+    lines = [title, "-" * len(title)]
+    for name, label, fmt in (('RMSE', 'RMSE', '${:,.2f}'), ('MAE', 'MAE', '${:,.2f}'),
+                             ('R2', 'R-squared', '{:.4f}'), ('MAPE', 'MAPE', '{:.2f}%')):
+        interval = intervals[name]
+        lines.append(f"{label + ':':<12}{fmt.format(interval['estimate']):>14}   "
+                     f"[{fmt.format(interval['lower'])} - {fmt.format(interval['upper'])}]")
+    lines.append("MAPE by price range:")
+    for label, interval in intervals['MAPE_by_price_range'].items():
+        lines.append(f"  {label:<10}{interval['estimate']:>12.2f}%   [{interval['lower']:.2f}% - {interval['upper']:.2f}%]")
+    return "\n".join(lines)
+
+
+def format_comparison(comparison: dict) -> str:
+    """Text table of a paired_bootstrap comparison."""
+    lines = [f"{'Metric':<8}{'Old':>14}{'New':>14}{'New - Old':>14}   {'Interval':<28}{'P(not better)':>14}"]
+    for name, row in comparison.items():
+        fmt = '{:,.4f}' if name == 'R2' else '{:,.2f}'
+        interval = f"[{fmt.format(row['lower'])}, {fmt.format(row['upper'])}]"
+        marker = "  [OK] better" if row['significant'] else ""
+        lines.append(f"{name:<8}{fmt.format(row['old']):>14}{fmt.format(row['new']):>14}{fmt.format(row['difference']):>14}   "
+                     f"{interval:<28}{row['p_not_better']:>14.3f}{marker}")
+    return "\n".join(lines)
+
+
+def load_predictions(actuals_path: str, *prediction_paths: str) -> pd.DataFrame:
+    """Actual prices (column Actual) joined on Id with the SalePrice of every predictions file (columns Predicted_<i>)."""
+    df = pd.read_csv(actuals_path, usecols=['Id', 'SalePrice']).rename(columns={'SalePrice': 'Actual'})
+    for i, path in enumerate(prediction_paths):
+        predictions = pd.read_csv(path, usecols=['Id', 'SalePrice']).rename(columns={'SalePrice': f'Predicted_{i}'})
+        df = df.merge(predictions, on='Id')
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals of the evaluation metrics.")
+    parser.add_argument("--predictions", default="evaluation/validation_predictions.csv")
+    parser.add_argument("--actuals", default="evaluation/validation_actual.csv")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="Paired comparison of two predictions files of the same houses")
+    parser.add_argument("--resamples", type=int, default=BOOTSTRAP_RESAMPLES)
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE_LEVEL)
+    parser.add_argument("--seed", type=int, default=2137)
+    parser.add_argument("--output", default=None, help="Also save the result as JSON")
+    args = parser.parse_args()
+
+    if args.compare:
+        df = load_predictions(args.actuals, *args.compare)
+        result = paired_bootstrap(df['Actual'], df['Predicted_0'], df['Predicted_1'], args.resamples, args.confidence, args.seed)
+        print(f"Paired bootstrap of {len(df):,} houses ({args.confidence:.0%} intervals, {args.resamples:,} resamples)")
+        print(format_comparison(result))
+    else:
+        df = load_predictions(args.actuals, args.predictions)
+        result = bootstrap_metrics(df['Actual'], df['Predicted_0'], args.resamples, args.confidence, args.seed)
+        print(format_intervals(result, args.resamples, args.confidence))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=4)
+        print(f"[OK] Saved to {args.output}")
@@ -0,0 +1,294 @@
+import heapq
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# Bins of the per-price-range analysis (right-closed, like pd.cut)
+PRICE_BINS: list = [0, 100000, 150000, 200000, 250000, 300000, 1000000]
+PRICE_LABELS: list = ['<$100k', '$100-150k', '$150-200k', '$200-250k', '$250-300k', '>$300k']
+
+# Houses listed as the best and worst predictions of the report
+TOP_N = 5
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch of non-negative values with a bounded relative error.
+
+    Values are counted in logarithmic buckets (bucket i holds values in (gamma^(i-1), gamma^i]), so a
+    quantile is returned within relative_accuracy of the true value, memory grows only with the
+    logarithm of the value range, and two sketches merge by adding their bucket counts.
+
+    Parameters:
+    - relative_accuracy (float): Relative error of the returned quantiles.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        positive = values[values > 0]
+        self.zeros += len(values) - len(positive)
+        self.count += len(values)
+        indexes, counts = np.unique(np.ceil(np.log(positive) / np.log(self.gamma)).astype(np.int64), return_counts=True)
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other: "QuantileSketch"):
+        self.zeros += other.zeros
+        self.count += other.count
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return 0.0
+        seen = self.zeros
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Middle of the bucket (in relative terms)
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class _Moments:
+    """Count, mean and sum of squared deviations of a stream, merged with Chan's parallel formula."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values: np.ndarray):
+        other = _Moments()
+        other.n = len(values)
+        if other.n:
+            other.mean = float(values.mean())
+            other.m2 = float(((values - other.mean) ** 2).sum())
+            self.merge(other)
+
+    def merge(self, other: "_Moments"):
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+        self.mean += delta * other.n / n
+        self.n = n
+
+
+class MetricsAccumulator:
+    """
+    Evaluation metrics of a stream of (Id, actual, predicted) chunks in bounded memory.
+
+    The state is a handful of sums, moments, extremes, per-price-range buckets, the current best and
+    worst TOP_N predictions and a quantile sketch of the absolute errors; it is updated chunk by chunk
+    and two accumulators (e.g. of different processes) merge into the accumulator of both streams.
+    metrics() and summary() give the numbers of evaluate_model.calculate_metrics and of the report.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.sum_abs_error = 0.0
+        self.sum_squared_error = 0.0
+        self.sum_abs_percent_error = 0.0
+        self.within = {5: 0, 10: 0, 15: 0}
+        self.actual = _Moments()
+        self.error = _Moments()
+        self.predicted_sum = 0.0
+        self.actual_range = [np.inf, -np.inf]
+        self.predicted_range = [np.inf, -np.inf]
+        self.abs_error_range = [np.inf, -np.inf]
+        self.range_sums = np.zeros(len(PRICE_LABELS))
+        self.range_counts = np.zeros(len(PRICE_LABELS), dtype=np.int64)
+        self.abs_error_sketch = QuantileSketch()
+        # (sort key, position, row) heaps; the position keeps the order of ties like nsmallest/nlargest
+        self._best = []
+        self._worst = []
+
+    def update(self, ids, actual, predicted):
+        ids = np.asarray(ids)
+        # The report lists the best and worst rows with their original dtypes
+        raw_actual, raw_predicted = np.asarray(actual), np.asarray(predicted)
+        actual = raw_actual.astype(float)
+        predicted = raw_predicted.astype(float)
+        if len(actual) == 0:
+            return
+
+        error = predicted - actual
+        abs_error = np.abs(error)
+        abs_percent_error = np.abs(error / actual * 100)
+        position = self.n
+
+        self.n += len(actual)
+        self.sum_abs_error += abs_error.sum()
+        self.sum_squared_error += (error ** 2).sum()
+        self.sum_abs_percent_error += abs_percent_error.sum()
+        for threshold in self.within:
+            self.within[threshold] += int((abs_percent_error <= threshold).sum())
+        self.actual.update(actual)
+        self.error.update(error)
+        self.predicted_sum += predicted.sum()
+        self._extend_range(self.actual_range, actual)
+        self._extend_range(self.predicted_range, predicted)
+        self._extend_range(self.abs_error_range, abs_error)
+
+        # Bin i holds PRICE_BINS[i] < actual <= PRICE_BINS[i + 1]
+        bins = np.searchsorted(PRICE_BINS, actual, side='left') - 1
+        inside = (bins >= 0) & (bins < len(PRICE_LABELS))
+        self.range_sums += np.bincount(bins[inside], weights=abs_percent_error[inside], minlength=len(PRICE_LABELS))
+        self.range_counts += np.bincount(bins[inside], minlength=len(PRICE_LABELS))
+
+        self.abs_error_sketch.update(abs_error)
+
+        # Only the TOP_N best and worst of this chunk can enter the overall top
+        order = np.argsort(abs_percent_error, kind='stable')
+        for candidates, heap, sign in ((order[:TOP_N], self._best, -1), (order[::-1][:TOP_N], self._worst, 1)):
+            for i in candidates:
+                row = (ids[i].item(), raw_actual[i].item(), raw_predicted[i].item(), abs_percent_error[i].item())
+                self._push(heap, (sign * abs_percent_error[i], -(position + i), row))
+
+    @staticmethod
+    def _extend_range(current: list, values: np.ndarray):
+        current[0] = min(current[0], float(values.min()))
+        current[1] = max(current[1], float(values.max()))
+
+    @staticmethod
+    def _push(heap: list, item: tuple):
+        # Min-heap of the TOP_N largest keys
+        if len(heap) < TOP_N:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+
+    def merge(self, other: "MetricsAccumulator") -> "MetricsAccumulator":
+        """Add the state of another accumulator. Its rows count as coming after the rows of this one."""
+        offset = self.n
+        self.n += other.n
+        self.sum_abs_error += other.sum_abs_error
+        self.sum_squared_error += other.sum_squared_error
+        self.sum_abs_percent_error += other.sum_abs_percent_error
+        for threshold in self.within:
+            self.within[threshold] += other.within[threshold]
+        self.actual.merge(other.actual)
+        self.error.merge(other.error)
+        self.predicted_sum += other.predicted_sum
+        for current, extra in ((self.actual_range, other.actual_range), (self.predicted_range, other.predicted_range),
+                               (self.abs_error_range, other.abs_error_range)):
+            current[0] = min(current[0], extra[0])
+            current[1] = max(current[1], extra[1])
+        self.range_sums += other.range_sums
+        self.range_counts += other.range_counts
+        self.abs_error_sketch.merge(other.abs_error_sketch)
+        for heap, extra in ((self._best, other._best), (self._worst, other._worst)):
+            for key, position, row in extra:
+                self._push(heap, (key, position - offset, row))
+        return self
+
+    def metrics(self) -> dict:
+        """Same keys and values as evaluate_model.calculate_metrics, plus percentiles of the absolute error."""
+        ss_total = self.actual.m2
+        return {
+            'RMSE': np.sqrt(self.sum_squared_error / self.n),
+            'MAE': self.sum_abs_error / self.n,
+            'R2': 1 - self.sum_squared_error / ss_total,
+            'MAPE': self.sum_abs_percent_error / self.n,
+            'Mean_Error': self.error.mean,
+            'Std_Error': np.sqrt(self.error.m2 / self.n),
+            'Max_Error': self.abs_error_range[1],
+            'Min_Error': self.abs_error_range[0],
+            'Abs_Error_Percentiles': {
+                f"p{q * 100:g}": self.abs_error_sketch.quantile(q) for q in (0.5, 0.9, 0.95, 0.99)
+            }
+        }
+
+    def summary(self) -> dict:
+        """Numbers and tables of the report besides the metrics, in the form of evaluate_model.summarize_results."""
+        columns = ['Id', 'Actual', 'Predicted', 'AbsPercentError']
+        best = [row for _, _, row in sorted(self._best, key=lambda item: item[:2], reverse=True)]
+        worst = [row for _, _, row in sorted(self._worst, key=lambda item: item[:2], reverse=True)]
+
+        counts = self.range_counts
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, self.range_sums / np.maximum(counts, 1), np.nan)
+        price_ranges = pd.DataFrame(
+            {'mean': means, 'count': counts},
+            index=pd.CategoricalIndex(PRICE_LABELS, categories=PRICE_LABELS, ordered=True, name='PriceRange')
+        )
+
+        return {
+            'n': self.n,
+            'actual_min': self.actual_range[0],
+            'actual_max': self.actual_range[1],
+            'predicted_min': self.predicted_range[0],
+            'predicted_max': self.predicted_range[1],
+            'actual_mean': self.actual.mean,
+            'predicted_mean': self.predicted_sum / self.n,
+            'within': dict(self.within),
+            'best': pd.DataFrame(best, columns=columns),
+            'worst': pd.DataFrame(worst, columns=columns),
+            'price_ranges': price_ranges
+        }
+
+
+def _accumulate_chunk(ids, actual, predicted) -> MetricsAccumulator:
+    accumulator = MetricsAccumulator()
+    accumulator.update(ids, actual, predicted)
+    return accumulator
+
+
+def _paired_chunks(predictions_path: str, actuals_path: str, chunk_size: int):
+    """Chunks of both files read in lockstep; the files must list the same houses in the same order."""
+    predictions = pd.read_csv(predictions_path, usecols=['Id', 'SalePrice'], chunksize=chunk_size)
+    actuals = pd.read_csv(actuals_path, usecols=['Id', 'SalePrice'], chunksize=chunk_size)
+    for predicted, actual in zip(predictions, actuals):
+        if len(predicted) != len(actual) or not np.array_equal(predicted['Id'].to_numpy(), actual['Id'].to_numpy()):
+            raise ValueError("Predictions and actual prices are not in the same Id order (sort both files by Id)")
+        yield actual['Id'].to_numpy(), actual['SalePrice'].to_numpy(), predicted['SalePrice'].to_numpy()
+    if next(predictions, None) is not None or next(actuals, None) is not None:
+        raise ValueError("Predictions and actual prices have a different number of rows")
+
+
+def accumulate_files(predictions_path: str, actuals_path: str, chunk_size: int = 500_000, n_workers: int = 1) -> MetricsAccumulator:
+    """
+    Evaluate a predictions file against the actual prices chunk by chunk.
+
+    Parameters:
+    - predictions_path (str): CSV with Id,SalePrice (e.g. the output of src/serving/batch_score.py).
+    - actuals_path (str): CSV with Id and SalePrice (other columns are not read), in the same Id order.
+    - chunk_size (int): Rows per chunk.
+    - n_workers (int): Processes accumulating chunks (their accumulators are merged). 1 accumulates here.
+
+    Returns:
+    MetricsAccumulator: State of the whole files.
+    """
+    total = MetricsAccumulator()
+    chunks = _paired_chunks(predictions_path, actuals_path, chunk_size)
+    if n_workers == 1:
+        for ids, actual, predicted in chunks:
+            total.update(ids, actual, predicted)
+        return total
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        # At most two chunks per worker in flight; merged in input order, so ties keep the file order
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(_accumulate_chunk, *chunk))
+            if len(in_flight) >= 2 * n_workers:
+                total.merge(in_flight.popleft().result())
+        while in_flight:
+            total.merge(in_flight.popleft().result())
+    return total
+
@@ -2,12 +2,13 @@ import pandas as pd
 import numpy as np
 
 
-def engineer_features(df, is_training=True):
+def engineer_features(df, is_training=True, verbose=True):
     """
     Feature engineering with 10 new features.
     Parameters:
     df (pd.DataFrame): Input dataframe with house data
     is_training (bool): Whether this is training data (has SalePrice)
+    verbose (bool): Whether to print a summary (disabled on the serving path)
     
     Returns:
     pd.DataFrame: Dataframe with 10 engineered features added
@@ -80,6 +81,9 @@ def engineer_features(df, is_training=True):
         (df_featured['YrSold'] - df_featured['YearRemodAdd']) < 10
     ).astype(int)
     
+    if not verbose:
+        return df_featured
+    
     # Print summary
     print(f"Feature engineering complete!")
     print(f"Original features: {df.shape[1]}")
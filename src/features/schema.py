@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+
+def build_feature_schema(feature_names, feature_frame: pd.DataFrame = None) -> dict:
+    """
+    Describe the model's input features, so that raw houses can be encoded without the training data.
+
+    One-hot columns are named '<column>_<value>' by pd.get_dummies (raw and engineered column names
+    contain no '_').
+
+    Parameters:
+    feature_names (list): Ordered features the model was trained on (model.feature_names_in_)
+    feature_frame (pd.DataFrame): Training features, used for the dtypes. Without it one-hot columns
+    are assumed to be bool and the others float64.
+
+    Returns:
+    dict: 'features' (ordered names), 'dtypes', 'index' (feature -> position), 'one_hot' (column ->
+    vocabulary of values) and 'one_hot_index' (column -> positions of the vocabulary's features)
+    """
+    features = [str(name) for name in feature_names]
+
+    one_hot, one_hot_index = {}, {}
+    for position, name in enumerate(features):
+        if "_" in name:
+            column, value = name.split("_", 1)
+            one_hot.setdefault(column, []).append(value)
+            one_hot_index.setdefault(column, []).append(position)
+
+    if feature_frame is not None:
+        dtypes = {name: str(feature_frame[name].dtype) for name in features}
+    else:
+        dtypes = {name: "bool" if "_" in name else "float64" for name in features}
+
+    return {
+        'features': features,
+        'dtypes': dtypes,
+        'index': {name: position for position, name in enumerate(features)},
+        'one_hot': one_hot,
+        'one_hot_index': one_hot_index
+    }
+
+
+def encode_with_schema(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    One-hot encode and align featured houses with the model's features in one vectorized pass.
+
+    Equivalent to pd.get_dummies followed by reindexing to the model's columns (unknown categories and
+    missing features become 0), but writes straight into the model's column order using the schema's
+    precomputed positions.
+
+    Parameters:
+    df (pd.DataFrame): Featured houses (after encode_hierarchical_categories), categorical columns not yet one-hot encoded
+    schema (dict): Output of build_feature_schema
+
+    Returns:
+    pd.DataFrame: Houses with the model's features, in the model's column order
+    """
+    X = np.zeros((len(df), len(schema['features'])))
+
+    for column in df.columns:
+        if column in schema['one_hot']:
+            codes = pd.Categorical(df[column].astype(str), categories=schema['one_hot'][column]).codes
+            rows = np.flatnonzero(codes >= 0)
+            X[rows, np.asarray(schema['one_hot_index'][column])[codes[rows]]] = 1
+        elif column in schema['index'] and df[column].dtype != object:
+            X[:, schema['index'][column]] = df[column].to_numpy(dtype=float)
+
+    return pd.DataFrame(X, columns=schema['features'], index=df.index)
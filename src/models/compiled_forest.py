@@ -0,0 +1,128 @@
+import sys
+import os
+import json
+import argparse
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+import numpy as np
+
+
+COMPILED_MODEL_FILE = "house_price_model.npz"
+FEATURE_SCHEMA_FILE = "feature_schema.json"
+
+
+class CompiledForest:
+    """
+    A fitted random forest flattened into padded NumPy arrays (one row per tree).
+
+    Loading it needs neither scikit-learn nor unpickling, which makes it the fast-start model of the
+    serving processes. apply() and predict() give the same results as the original RandomForestRegressor
+    (inputs are compared as float32, like scikit-learn does).
+    """
+
+    def __init__(self, arrays: dict, feature_schema: dict = None):
+        self.leaf_values_ = arrays['value']
+        self.max_depth = int(arrays['max_depth'])
+        self.model_version = str(arrays['model_version'])
+        self.n_estimators, self._width = arrays['feature'].shape
+        self.feature_names_in_ = np.asarray(arrays['feature_names'], dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self.feature_schema_ = feature_schema
+
+        # Nodes are addressed in the flattened arrays (tree * width + node). Leaves (feature < 0) point to
+        # themselves, so a descent of max_depth steps needs no check whether a row already reached its leaf.
+        self._tree_offset = np.arange(self.n_estimators)[:, None] * self._width
+        is_leaf = arrays['feature'] < 0
+        node_index = np.arange(arrays['feature'].size).reshape(arrays['feature'].shape)
+        self._left = np.where(is_leaf, node_index, arrays['children_left'] + self._tree_offset).ravel()
+        self._right = np.where(is_leaf, node_index, arrays['children_right'] + self._tree_offset).ravel()
+        self._feature = np.where(is_leaf, 0, arrays['feature']).ravel()
+        self._threshold = arrays['threshold'].ravel()
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf index of every row in every tree, shape (n_rows, n_trees)."""
+        X = np.asarray(X, dtype=np.float32)
+        values = X.ravel()
+        row_offset = np.arange(len(X))[:, None] * X.shape[1]
+        nodes = np.repeat(self._tree_offset.T, len(X), axis=0)
+
+        # All rows descend all trees one level per step
+        for _ in range(self.max_depth):
+            go_left = values[row_offset + self._feature[nodes]] <= self._threshold[nodes]
+            nodes = np.where(go_left, self._left[nodes], self._right[nodes])
+        return nodes - self._tree_offset.T
+
+    def predict(self, X) -> np.ndarray:
+        return self.leaf_values_[np.arange(self.n_estimators), self.apply(X)].mean(axis=1)
+
+
+def compile_forest(model, model_version: str = "") -> dict:
+    """
+    Flatten a fitted RandomForestRegressor into padded arrays.
+
+    Parameters:
+    - model (RandomForestRegressor): Fitted forest.
+    - model_version (str): Version of the pickled model the arrays were compiled from.
+
+    Returns:
+    dict: Arrays of shape (n_trees, max_node_count) - children_left, children_right, feature, threshold, value -
+    plus feature_names, max_depth and model_version.
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    shape = (len(trees), max(tree.node_count for tree in trees))
+
+    arrays = {
+        'children_left': np.zeros(shape, dtype=np.int32),
+        'children_right': np.zeros(shape, dtype=np.int32),
+        # Padding nodes are marked as leaves, like the real leaves (feature -2 in scikit-learn)
+        'feature': np.full(shape, -2, dtype=np.int32),
+        'threshold': np.zeros(shape),
+        'value': np.zeros(shape)
+    }
+    for t, tree in enumerate(trees):
+        n = tree.node_count
+        arrays['children_left'][t, :n] = tree.children_left
+        arrays['children_right'][t, :n] = tree.children_right
+        arrays['feature'][t, :n] = tree.feature
+        arrays['threshold'][t, :n] = tree.threshold
+        arrays['value'][t, :n] = tree.value[:, 0, 0]
+
+    arrays['feature_names'] = np.asarray(model.feature_names_in_, dtype=str)
+    arrays['max_depth'] = np.asarray(max(tree.max_depth for tree in trees))
+    arrays['model_version'] = np.asarray(model_version)
+    return arrays
+
+
+def save_compiled_model(model, model_path: str = "model/", model_version: str = ""):
+    """Save the compiled forest and the feature schema next to the pickled model."""
+    np.savez(os.path.join(model_path, COMPILED_MODEL_FILE), **compile_forest(model, model_version))
+    with open(os.path.join(model_path, FEATURE_SCHEMA_FILE), 'w') as f:
+        json.dump(model.feature_schema_, f)
+
+
+def load_compiled_model(model_path: str = "model/") -> CompiledForest:
+    """Load the compiled forest and its feature schema (no scikit-learn import, no unpickling)."""
+    with np.load(os.path.join(model_path, COMPILED_MODEL_FILE)) as arrays:
+        arrays = dict(arrays)
+    with open(os.path.join(model_path, FEATURE_SCHEMA_FILE)) as f:
+        feature_schema = json.load(f)
+    return CompiledForest(arrays, feature_schema)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the trained forest for fast-start serving.")
+    parser.add_argument("--model-path", default="model/")
+    args = parser.parse_args()
+
+    # Imported here: compiling needs the pickled model, loading the compiled one does not
+    import joblib
+    from src.features.schema import build_feature_schema
+    from src.utils.versioning import file_version
+
+    model_file = os.path.join(args.model_path, "house_price_model.pkl")
+    model = joblib.load(model_file)
+    if getattr(model, "feature_schema_", None) is None:
+        model.feature_schema_ = build_feature_schema(model.feature_names_in_)
+    save_compiled_model(model, args.model_path, file_version(model_file))
+    print(f"[OK] Compiled forest saved to {os.path.join(args.model_path, COMPILED_MODEL_FILE)}")
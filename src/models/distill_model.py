@@ -0,0 +1,179 @@
+import sys
+import os
+import json
+import argparse
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.metrics import mean_squared_error
+from src.data_generation.synthetic_ames import load_generator
+from src.data_preprocessing.preprocess import transform_data
+from src.models.model_profiling import model_size_bytes, measure_predict_latency
+from src.models.train_model import validation_scores
+
+
+STUDENT_TYPES: tuple = ("forest", "boosting")
+
+
+def build_student(student_type: str = "boosting", n_trees: int = 200, max_depth: int = 6):
+    """
+    Create a small student model within the given tree/depth budget.
+
+    Parameters:
+    - student_type (str): 'forest' (shallow RandomForestRegressor) or 'boosting' (HistGradientBoostingRegressor).
+    - n_trees (int): Number of trees (boosting iterations).
+    - max_depth (int): Maximum depth of every tree.
+
+    Returns:
+    Unfitted scikit-learn regressor.
+    """
+    if student_type == "forest":
+        return RandomForestRegressor(n_estimators=n_trees, max_depth=max_depth, random_state=2137, n_jobs=-1)
+    if student_type == "boosting":
+        return HistGradientBoostingRegressor(max_iter=n_trees, max_depth=max_depth, random_state=2137)
+    raise ValueError(f"Unknown student type: {student_type}. Choose one of {STUDENT_TYPES}")
+
+
+def build_synthetic_inputs(feature_names: list, n_rows: int, seed: int = 2137) -> pd.DataFrame:
+    """
+    Generate synthetic houses and encode them into the teacher's feature space.
+
+    Parameters:
+    - feature_names (list): Ordered features the teacher was trained on.
+    - n_rows (int): Number of synthetic houses.
+    - seed (int): Seed of the synthetic data generator.
+
+    Returns:
+    pd.DataFrame: Encoded synthetic inputs with exactly the teacher's columns.
+    """
+    raw = load_generator().generate_chunk(n_rows, seed=seed).drop(columns=["SalePrice"])
+    featured = transform_data(raw, is_training=False, do_remove_outliers=False)
+    return featured.reindex(columns=feature_names, fill_value=0)
+
+
+def distill_model(
+    teacher,
+    X_train: pd.DataFrame,
+    X_val: pd.DataFrame,
+    y_val: pd.Series,
+    student_type: str = "boosting",
+    n_trees: int = 200,
+    max_depth: int = 6,
+    synthetic_rows: int = 20_000,
+    seed: int = 2137
+) -> tuple:
+    """
+    Train a compact student on the teacher's predictions over real and synthetic inputs.
+
+    Parameters:
+    - teacher: Fitted forest (the production model).
+    - X_train (pd.DataFrame): Real training inputs (datasets/used/training.csv without the target).
+    - X_val (pd.DataFrame): Validation inputs (datasets/used/validation.csv without the target).
+    - y_val (pd.Series): Validation targets.
+    - student_type (str): 'forest' or 'boosting'.
+    - n_trees (int): Tree budget of the student.
+    - max_depth (int): Depth budget of the student.
+    - synthetic_rows (int): Number of synthetic houses added to the transfer set.
+    - seed (int): Seed of the synthetic data generator.
+
+    Returns:
+    tuple: (student, report)
+    """
+    feature_names = teacher.feature_names_in_.tolist()
+    transfer_set = X_train[feature_names]
+    if synthetic_rows > 0:
+        print(f"Generating {synthetic_rows:,} synthetic houses for the transfer set...")
+        transfer_set = pd.concat(
+            [transfer_set, build_synthetic_inputs(feature_names, synthetic_rows, seed)],
+            ignore_index=True
+        )
+
+    print(f"Labelling {len(transfer_set):,} rows with the teacher...")
+    soft_targets = teacher.predict(transfer_set)
+
+    print(f"Training {student_type} student ({n_trees} trees, max depth {max_depth})...")
+    student = build_student(student_type, n_trees, max_depth)
+    student.fit(transfer_set, soft_targets)
+
+    X_val = X_val[feature_names]
+    teacher_pred = teacher.predict(X_val)
+    student_pred = student.predict(X_val)
+
+    teacher_latency = measure_predict_latency(teacher, X_val)
+    student_latency = measure_predict_latency(student, X_val)
+    teacher_size = model_size_bytes(teacher)
+    student_size = model_size_bytes(student)
+
+    teacher_scores = validation_scores(y_val, teacher_pred)
+    student_scores = validation_scores(y_val, student_pred)
+
+    report = {
+        'student': {'type': student_type, 'n_trees': n_trees, 'max_depth': max_depth},
+        'transfer_set': {'real_rows': len(X_train), 'synthetic_rows': synthetic_rows},
+        'teacher': {**teacher_scores, **teacher_latency, 'size_mb': teacher_size / 1024 ** 2},
+        'student_metrics': {**student_scores, **student_latency, 'size_mb': student_size / 1024 ** 2},
+        'delta': {
+            'rmse': student_scores['rmse'] - teacher_scores['rmse'],
+            'rmse_pct': (student_scores['rmse'] / teacher_scores['rmse'] - 1) * 100,
+            'fidelity_rmse': float(np.sqrt(mean_squared_error(teacher_pred, student_pred))),
+            'single_speedup': teacher_latency['single_p50_ms'] / student_latency['single_p50_ms'],
+            'batch_speedup': teacher_latency['batch_ms'] / student_latency['batch_ms'],
+            'size_reduction': teacher_size / student_size
+        }
+    }
+    return student, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distill the production forest into a compact student model.")
+    parser.add_argument("--student", choices=STUDENT_TYPES, default="boosting")
+    parser.add_argument("--trees", type=int, default=200, help="Tree budget of the student")
+    parser.add_argument("--depth", type=int, default=6, help="Depth budget of the student")
+    parser.add_argument("--synthetic-rows", type=int, default=20_000,
+                        help="Synthetic houses added to the transfer set (0 = real data only)")
+    parser.add_argument("--seed", type=int, default=2137)
+    args = parser.parse_args()
+
+    teacher_path = "model/house_price_model.pkl"
+    training_path = "datasets/used/training.csv"
+    validation_path = "datasets/used/validation.csv"
+    for path in (teacher_path, training_path, validation_path):
+        if not os.path.exists(path):
+            print(f"{path} not found. Please run train_model.py first.")
+            exit(1)
+
+    teacher = joblib.load(teacher_path)
+    training = pd.read_csv(training_path)
+    validation = pd.read_csv(validation_path)
+
+    student, report = distill_model(
+        teacher,
+        training.drop(columns=["SalePrice"]),
+        validation.drop(columns=["SalePrice"]),
+        validation["SalePrice"],
+        student_type=args.student,
+        n_trees=args.trees,
+        max_depth=args.depth,
+        synthetic_rows=args.synthetic_rows,
+        seed=args.seed
+    )
+
+    student_file = "model/house_price_model_student.pkl"
+    joblib.dump(student, student_file)
+    print(f"\nStudent model saved to {student_file}")
+
+    os.makedirs("evaluation", exist_ok=True)
+    report_file = "evaluation/distillation_report.json"
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"Distillation report saved to {report_file}")
+
+    print(f"\nTeacher RMSE: ${report['teacher']['rmse']:,.2f} | Student RMSE: ${report['student_metrics']['rmse']:,.2f} "
+          f"({report['delta']['rmse_pct']:+.2f}%)")
+    print(f"Single-row speedup: {report['delta']['single_speedup']:.1f}x | "
+          f"Batch speedup: {report['delta']['batch_speedup']:.1f}x | "
+          f"Size reduction: {report['delta']['size_reduction']:.1f}x")
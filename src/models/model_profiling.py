@@ -0,0 +1,58 @@
+import time
+import pickle
+
+import numpy as np
+import pandas as pd
+
+
+def model_size_bytes(model) -> int:
+    """
+    Return the size of the serialized model in bytes.
+
+    Parameters:
+    model: Any picklable model.
+
+    Returns:
+    int: Length of the pickled model.
+    """
+    return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def measure_predict_latency(model, X: pd.DataFrame, n_single: int = 50, n_batch: int = 3) -> dict:
+    """
+    Measure single-row and batch prediction latency of a model.
+
+    Parameters:
+    - model: Fitted model with a predict method.
+    - X (pd.DataFrame): Rows to predict. Single-row latency cycles through its first n_single rows.
+    - n_single (int): Number of single-row predictions to time.
+    - n_batch (int): Number of whole-batch predictions to time (the fastest one is reported).
+
+    Returns:
+    dict: Latencies in milliseconds:
+    - single_p50_ms, single_p99_ms: Percentiles of one-row predict calls.
+    - batch_ms: Predict time of the whole X.
+    - batch_per_row_us: batch_ms spread over the rows of X, in microseconds.
+    """
+    # Warm up (thread pools, lazy imports)
+    model.predict(X.iloc[:1])
+
+    single = []
+    for i in range(n_single):
+        row = X.iloc[[i % len(X)]]
+        start = time.perf_counter()
+        model.predict(row)
+        single.append((time.perf_counter() - start) * 1000)
+
+    batch = []
+    for _ in range(n_batch):
+        start = time.perf_counter()
+        model.predict(X)
+        batch.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'single_p50_ms': float(np.percentile(single, 50)),
+        'single_p99_ms': float(np.percentile(single, 99)),
+        'batch_ms': min(batch),
+        'batch_per_row_us': min(batch) * 1000 / len(X)
+    }
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from src.models.model_profiling import model_size_bytes, measure_predict_latency
+
+
+SELECTION_RULES: tuple = ("rmse", "budget", "pareto")
+
+
+def leaderboard_from_cv_results(cv_results: dict) -> pd.DataFrame:
+    """
+    Turn GridSearchCV.cv_results_ (scored with neg_mean_squared_error) into a leaderboard.
+
+    Returns:
+    pd.DataFrame: Columns 'params' and 'cv_rmse', best candidate first.
+    """
+    return pd.DataFrame({
+        'params': cv_results['params'],
+        'cv_rmse': np.sqrt(-np.asarray(cv_results['mean_test_score']))
+    }).sort_values('cv_rmse', kind='stable').reset_index(drop=True)
+
+
+def profile_candidates(
+    leaderboard: pd.DataFrame,
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    base_params: dict,
+    n_candidates: int = 20
+) -> pd.DataFrame:
+    """
+    Fit the best candidates of a leaderboard and measure their serving cost.
+
+    Parameters:
+    - leaderboard (pd.DataFrame): Columns 'params' and 'cv_rmse', best candidate first.
+    - X_train (pd.DataFrame): Training features.
+    - y_train (pd.Series): Training targets.
+    - base_params (dict): Fixed RandomForestRegressor parameters (random_state, n_jobs).
+    - n_candidates (int): How many of the best candidates to profile.
+
+    Returns:
+    pd.DataFrame: The profiled part of the leaderboard with latency (ms) and serialized size (MB) columns.
+    """
+    profile_rows = X_train.iloc[:200]
+    rows = []
+    for i, candidate in enumerate(leaderboard.head(n_candidates).itertuples()):
+        print(f"Profiling candidate {i + 1}/{min(n_candidates, len(leaderboard))}: {candidate.params}")
+        model = RandomForestRegressor(**{**base_params, **candidate.params})
+        model.fit(X_train, y_train)
+        rows.append({
+            'params': candidate.params,
+            'cv_rmse': candidate.cv_rmse,
+            **measure_predict_latency(model, profile_rows),
+            'size_mb': model_size_bytes(model) / 1024 ** 2
+        })
+
+    report = pd.DataFrame(rows)
+    report['pareto_optimal'] = pareto_front(report)
+    return report
+
+
+def pareto_front(report: pd.DataFrame, objectives: tuple = ('cv_rmse', 'single_p99_ms', 'size_mb')) -> np.ndarray:
+    """
+    Mark candidates that are not dominated by any other candidate (lower is better for every objective).
+
+    Returns:
+    np.ndarray: Boolean mask, True for candidates on the Pareto front.
+    """
+    values = report[list(objectives)].to_numpy()
+    # dominated[i, j]: candidate j is at least as good as i everywhere and strictly better somewhere
+    no_worse = (values[None, :, :] <= values[:, None, :]).all(axis=2)
+    better = (values[None, :, :] < values[:, None, :]).any(axis=2)
+    return ~(no_worse & better).any(axis=1)
+
+
+def select_candidate(
+    report: pd.DataFrame,
+    rule: str = "rmse",
+    max_p99_ms: float = None,
+    max_size_mb: float = None,
+    rmse_tolerance_pct: float = 1.0
+) -> pd.Series:
+    """
+    Select a candidate from a profiled leaderboard.
+
+    Parameters:
+    - report (pd.DataFrame): Output of profile_candidates.
+    - rule (str): Selection rule:
+      'rmse'   - lowest CV RMSE (the plain GridSearchCV choice).
+      'budget' - lowest CV RMSE among candidates within max_p99_ms and max_size_mb.
+      'pareto' - among Pareto-optimal candidates within rmse_tolerance_pct of the best CV RMSE,
+                 the one with the lowest p99 single-row latency.
+    - max_p99_ms (float): Single-row p99 latency budget in milliseconds ('budget' rule).
+    - max_size_mb (float): Serialized model size budget in MB ('budget' rule).
+    - rmse_tolerance_pct (float): Accepted CV RMSE increase in % ('pareto' rule).
+
+    Returns:
+    pd.Series: The selected row of the report.
+    """
+    if rule == "rmse":
+        return report.sort_values('cv_rmse').iloc[0]
+
+    if rule == "budget":
+        within_budget = np.ones(len(report), dtype=bool)
+        if max_p99_ms is not None:
+            within_budget &= report['single_p99_ms'] <= max_p99_ms
+        if max_size_mb is not None:
+            within_budget &= report['size_mb'] <= max_size_mb
+        if not within_budget.any():
+            print("[!] No candidate fits the budget, selecting the fastest one")
+            return report.sort_values('single_p99_ms').iloc[0]
+        return report[within_budget].sort_values('cv_rmse').iloc[0]
+
+    if rule == "pareto":
+        best_rmse = report['cv_rmse'].min()
+        acceptable = report['pareto_optimal'] & (report['cv_rmse'] <= best_rmse * (1 + rmse_tolerance_pct / 100))
+        return report[acceptable].sort_values('single_p99_ms').iloc[0]
+
+    raise ValueError(f"Unknown selection rule: {rule}. Choose one of {SELECTION_RULES}")
@@ -0,0 +1,376 @@
+import sys
+import os
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+
+# A work queue is a directory (possibly on a filesystem shared by several machines):
+#   manifest.json    - list of all submitted task ids
+#   data.pkl         - (X, y) training data, unless the tasks point to another data file
+#   pending/*.json   - tasks waiting for a worker
+#   claimed/*.json   - tasks being trained; a worker claims a task by renaming it from pending/,
+#                      which is atomic, so every task is trained by exactly one worker. The worker
+#                      touches the claim while it trains (a lease); claims not touched for
+#                      CLAIM_LEASE_SECONDS belong to a dead worker and are moved back to pending/
+#   done/*.pkl       - trained forest slices
+QUEUE_SUBDIRS: tuple = ("pending", "claimed", "done")
+
+# A claim not touched for this long is stale. Much longer than the heartbeat, so that clock differences
+# between the machines sharing the queue do not requeue live claims
+CLAIM_LEASE_SECONDS = 600.0
+CLAIM_HEARTBEAT_SECONDS = 30.0
+
+
+def _atomic_write(path: str, write):
+    """Write a file through a temporary name, so readers never see a partially written file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_json(path: str, data: dict):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
+
+
+def submit_forest_tasks(
+    queue_dir: str,
+    params: dict,
+    n_slices: int,
+    data_file: str = None,
+    shard_data: bool = False,
+    seed: int = 2137
+) -> list:
+    """
+    Split a forest into slices and put one training task per slice in the work queue.
+
+    Parameters:
+    - queue_dir (str): Work queue directory.
+    - params (dict): RandomForestRegressor parameters of the whole forest. Its n_estimators is split between slices.
+    - n_slices (int): Number of slices (tasks).
+    - data_file (str): Joblib file with (X, y). Defaults to data.pkl inside the queue directory.
+    - shard_data (bool): Whether every slice is trained on its own disjoint shard of the rows
+      instead of the whole dataset.
+    - seed (int): Base seed; slice i uses seed + i, so slices grow different trees.
+
+    Returns:
+    list: Submitted task ids.
+    """
+    for subdir in QUEUE_SUBDIRS:
+        os.makedirs(os.path.join(queue_dir, subdir), exist_ok=True)
+    data_file = data_file or os.path.join(queue_dir, "data.pkl")
+
+    n_estimators = params.get('n_estimators', 100)
+    trees_per_slice = np.diff(np.linspace(0, n_estimators, n_slices + 1).round().astype(int))
+
+    task_ids = []
+    for i, n_trees in enumerate(trees_per_slice):
+        if n_trees == 0:
+            continue
+        task_id = f"slice_{i:04d}"
+        task = {
+            'task_id': task_id,
+            'data_file': os.path.abspath(data_file),
+            'params': {**params, 'n_estimators': int(n_trees), 'random_state': seed + i},
+            'shard': [i, n_slices] if shard_data else None
+        }
+        path = os.path.join(queue_dir, "pending", f"{task_id}.json")
+        _atomic_write(path, lambda tmp: _write_json(tmp, task))
+        task_ids.append(task_id)
+
+    _atomic_write(os.path.join(queue_dir, "manifest.json"), lambda tmp: _write_json(tmp, {'tasks': task_ids}))
+    return task_ids
+
+
+def claim_task(queue_dir: str) -> dict:
+    """
+    Claim the next pending task of the work queue.
+
+    Returns:
+    dict: The claimed task, or None if no task is pending.
+    """
+    pending_dir = os.path.join(queue_dir, "pending")
+    for name in sorted(os.listdir(pending_dir)):
+        if not name.endswith(".json"):
+            continue
+        claimed_path = os.path.join(queue_dir, "claimed", name)
+        try:
+            os.rename(os.path.join(pending_dir, name), claimed_path)
+        except FileNotFoundError:
+            # Another worker was faster
+            continue
+        # The lease starts now (renaming keeps the modification time of the submission)
+        os.utime(claimed_path)
+        with open(claimed_path) as f:
+            return json.load(f)
+    return None
+
+
+def requeue_stale_claims(queue_dir: str, lease_seconds: float = CLAIM_LEASE_SECONDS) -> list:
+    """
+    Move claims whose worker stopped touching them for lease_seconds back to pending/.
+
+    Claims of slices that are already trained (the worker died just before removing the claim) are removed.
+
+    Returns:
+    list: Ids of the requeued tasks.
+    """
+    requeued = []
+    now = time.time()
+    for name in sorted(os.listdir(os.path.join(queue_dir, "claimed"))):
+        if not name.endswith(".json"):
+            continue
+        claimed_path = os.path.join(queue_dir, "claimed", name)
+        task_id = name[:-len(".json")]
+        try:
+            if now - os.path.getmtime(claimed_path) < lease_seconds:
+                continue
+            if os.path.exists(os.path.join(queue_dir, "done", f"{task_id}.pkl")):
+                os.remove(claimed_path)
+            else:
+                os.rename(claimed_path, os.path.join(queue_dir, "pending", name))
+                requeued.append(task_id)
+        except FileNotFoundError:
+            # Finished or requeued by someone else meanwhile
+            continue
+    return requeued
+
+
+@contextmanager
+def _heartbeat(claimed_path: str, interval: float = CLAIM_HEARTBEAT_SECONDS):
+    """Keep touching a claim in a background thread, so that its lease does not expire while the slice trains."""
+    stop = threading.Event()
+
+    def touch():
+        while not stop.wait(interval):
+            try:
+                os.utime(claimed_path)
+            except FileNotFoundError:
+                return
+
+    thread = threading.Thread(target=touch, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_forest_worker(queue_dir: str, n_jobs: int = 1, worker_id: str = None, lease_seconds: float = CLAIM_LEASE_SECONDS) -> int:
+    """
+    Train forest slices from the work queue until no task is pending.
+
+    Stale claims of dead workers are requeued before every claim, so the remaining workers take them over.
+
+    Parameters:
+    - queue_dir (str): Work queue directory.
+    - n_jobs (int): Threads used by every slice. Keep 1 when several workers share a machine.
+    - worker_id (str): Name used in the log. Defaults to <hostname>-<pid>.
+    - lease_seconds (float): Age of a claim after which it is considered stale.
+
+    Returns:
+    int: Number of slices trained by this worker.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    data_cache = {}
+    trained = 0
+
+    while True:
+        for task_id in requeue_stale_claims(queue_dir, lease_seconds):
+            print(f"[{worker_id}] [!] Requeued {task_id}, its worker stopped responding")
+        task = claim_task(queue_dir)
+        if task is None:
+            break
+        claimed_path = os.path.join(queue_dir, "claimed", f"{task['task_id']}.json")
+        if task['data_file'] not in data_cache:
+            data_cache[task['data_file']] = joblib.load(task['data_file'])
+        X, y = data_cache[task['data_file']]
+
+        if task['shard'] is not None:
+            shard, n_shards = task['shard']
+            rows = np.arange(len(X)) % n_shards == shard
+            X, y = X[rows], y[rows]
+
+        start = time.perf_counter()
+        forest = RandomForestRegressor(**{**task['params'], 'n_jobs': n_jobs})
+        with _heartbeat(claimed_path, min(CLAIM_HEARTBEAT_SECONDS, lease_seconds / 4)):
+            forest.fit(X, y)
+
+        done_path = os.path.join(queue_dir, "done", f"{task['task_id']}.pkl")
+        _atomic_write(done_path, lambda tmp: joblib.dump(forest, tmp))
+        try:
+            os.remove(claimed_path)
+        except FileNotFoundError:
+            # Requeued as stale meanwhile; the slice is done, a second training of it gives the same trees
+            pass
+
+        trained += 1
+        print(f"[{worker_id}] Trained {task['task_id']} "
+              f"({task['params']['n_estimators']} trees, {len(X)} rows) in {time.perf_counter() - start:.1f}s")
+
+    return trained
+
+
+def collect_forest_slices(
+    queue_dir: str,
+    timeout: float = None,
+    poll_interval: float = 1.0,
+    lease_seconds: float = CLAIM_LEASE_SECONDS
+) -> list:
+    """
+    Wait until every submitted slice is trained and load them.
+
+    Stale claims of dead workers are requeued while waiting (and reported), so a running or new
+    worker trains them again instead of the merge waiting forever.
+
+    Parameters:
+    - queue_dir (str): Work queue directory.
+    - timeout (float): Maximum number of seconds to wait. None waits forever.
+    - poll_interval (float): Seconds between checks of the done/ directory.
+    - lease_seconds (float): Age of a claim after which it is considered stale.
+
+    Returns:
+    list: Trained forest slices, in task order.
+    """
+    with open(os.path.join(queue_dir, "manifest.json")) as f:
+        task_ids = json.load(f)['tasks']
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    paths = [os.path.join(queue_dir, "done", f"{task_id}.pkl") for task_id in task_ids]
+    while not all(os.path.exists(path) for path in paths):
+        if deadline is not None and time.monotonic() > deadline:
+            missing = [task_id for task_id, path in zip(task_ids, paths) if not os.path.exists(path)]
+            raise TimeoutError(f"Forest slices not trained in time: {', '.join(missing)}")
+        requeued = requeue_stale_claims(queue_dir, lease_seconds)
+        if requeued:
+            print(f"[!] Requeued {', '.join(requeued)}: their worker stopped responding, waiting for another worker")
+        time.sleep(poll_interval)
+
+    return [joblib.load(path) for path in paths]
+
+
+def merge_forests(forests: list, n_jobs: int = -1) -> RandomForestRegressor:
+    """
+    Merge forest slices into one servable forest.
+
+    Parameters:
+    - forests (list): Fitted RandomForestRegressor slices trained on the same features.
+    - n_jobs (int): n_jobs of the merged forest used when predicting.
+
+    Returns:
+    RandomForestRegressor: Forest with the trees of all slices. n_estimators is the total number of trees
+    and feature_importances_ is the average over all trees, exactly as for a forest trained in one piece.
+    """
+    merged = forests[0]
+    for forest in forests[1:]:
+        if forest.n_features_in_ != merged.n_features_in_:
+            raise ValueError("Cannot merge forests trained on different features")
+
+    merged.estimators_ = [tree for forest in forests for tree in forest.estimators_]
+    merged.n_estimators = len(merged.estimators_)
+    merged.n_jobs = n_jobs
+    return merged
+
+
+def train_parallel_forest(
+    X: pd.DataFrame,
+    y: pd.Series,
+    params: dict,
+    n_workers: int = None,
+    n_slices: int = None,
+    shard_data: bool = False,
+    queue_dir: str = None
+) -> RandomForestRegressor:
+    """
+    Train a RandomForestRegressor as slices in separate worker processes and merge them.
+
+    Parameters:
+    - X (pd.DataFrame): Training features.
+    - y (pd.Series): Training targets.
+    - params (dict): RandomForestRegressor parameters of the whole forest.
+    - n_workers (int): Number of worker processes. Defaults to os.cpu_count().
+    - n_slices (int): Number of slices. Defaults to n_workers.
+    - shard_data (bool): Whether every slice is trained on its own shard of the rows.
+    - queue_dir (str): Work queue directory. A temporary directory is used if not given.
+
+    Returns:
+    RandomForestRegressor: The merged forest.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    n_slices = n_slices or n_workers
+
+    with tempfile.TemporaryDirectory(prefix="forest-queue-") as tmp:
+        queue_dir = queue_dir or tmp
+        os.makedirs(queue_dir, exist_ok=True)
+        joblib.dump((X, y), os.path.join(queue_dir, "data.pkl"))
+        submit_forest_tasks(queue_dir, params, n_slices, shard_data=shard_data, seed=params.get('random_state') or 2137)
+
+        print(f"Training {params.get('n_estimators', 100)} trees as {n_slices} slices on {n_workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            list(pool.map(run_forest_worker, [queue_dir] * n_workers))
+
+        forests = collect_forest_slices(queue_dir, timeout=0)
+
+    return merge_forests(forests, n_jobs=params.get('n_jobs', -1))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train a random forest as slices through a file-based work queue.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = subparsers.add_parser("submit", help="Put forest slices in the work queue")
+    submit_parser.add_argument("--queue", required=True, help="Work queue directory (shared between machines)")
+    submit_parser.add_argument("--data", default="datasets/used/training.csv", help="CSV with features and target")
+    submit_parser.add_argument("--target", default="SalePrice")
+    submit_parser.add_argument("--slices", type=int, required=True)
+    submit_parser.add_argument("--shard", action="store_true", help="Train every slice on its own shard of the rows")
+
+    worker_parser = subparsers.add_parser("worker", help="Train slices from the work queue until it is empty")
+    worker_parser.add_argument("--queue", required=True)
+    worker_parser.add_argument("--n-jobs", type=int, default=-1, help="Threads per slice")
+    worker_parser.add_argument("--lease", type=float, default=CLAIM_LEASE_SECONDS,
+                               help="Seconds after which a claim of a dead worker is requeued")
+
+    merge_parser = subparsers.add_parser("merge", help="Wait for all slices and merge them into one model")
+    merge_parser.add_argument("--queue", required=True)
+    merge_parser.add_argument("--output", default="model/house_price_model.pkl")
+    merge_parser.add_argument("--timeout", type=float, default=None)
+    merge_parser.add_argument("--lease", type=float, default=CLAIM_LEASE_SECONDS,
+                              help="Seconds after which a claim of a dead worker is requeued")
+    args = parser.parse_args()
+
+    if args.command == "submit":
+        # Imported here, so that workers do not need the training code
+        from src.models.train_model import load_model_parameters
+
+        dataset = pd.read_csv(args.data)
+        os.makedirs(args.queue, exist_ok=True)
+        joblib.dump(
+            (dataset.drop(columns=[args.target]), dataset[args.target]),
+            os.path.join(args.queue, "data.pkl")
+        )
+        task_ids = submit_forest_tasks(args.queue, load_model_parameters(), args.slices, shard_data=args.shard)
+        print(f"Submitted {len(task_ids)} forest slices to {args.queue}")
+
+    elif args.command == "worker":
+        trained = run_forest_worker(args.queue, n_jobs=args.n_jobs, lease_seconds=args.lease)
+        print(f"Worker finished after training {trained} slice(s)")
+
+    elif args.command == "merge":
+        model = merge_forests(collect_forest_slices(args.queue, timeout=args.timeout, lease_seconds=args.lease))
+        joblib.dump(model, args.output)
+        print(f"Merged forest with {model.n_estimators} trees saved to {args.output}")
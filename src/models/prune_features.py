@@ -0,0 +1,199 @@
+import sys
+import os
+import json
+import time
+import argparse
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error
+from src.models.train_model import load_data, get_datasets, load_model_parameters
+from src.models.model_profiling import model_size_bytes, measure_predict_latency
+
+
+DEFAULT_TOP_K: tuple = (10, 20, 40, 80)
+DEFAULT_CUMULATIVE_IMPORTANCE: tuple = (0.90, 0.95, 0.99)
+
+
+def select_top_features(
+    feature_importance: pd.DataFrame,
+    top_k: int = None,
+    cumulative_importance: float = None
+) -> list:
+    """
+    Select the most important features.
+
+    Parameters:
+    - feature_importance (pd.DataFrame): Columns 'feature' and 'importance'.
+    - top_k (int): Keep the k most important features.
+    - cumulative_importance (float): Keep the fewest features whose importances sum up to this share (0.0 - 1.0).
+    Exactly one of top_k and cumulative_importance should be given.
+
+    Returns:
+    list: Selected feature names, most important first.
+    """
+    ranked = feature_importance.sort_values('importance', ascending=False)
+    if top_k is not None:
+        return ranked['feature'].head(top_k).tolist()
+
+    shares = ranked['importance'].cumsum() / ranked['importance'].sum()
+    n_features = int(np.searchsorted(shares.to_numpy(), cumulative_importance) + 1)
+    return ranked['feature'].head(n_features).tolist()
+
+
+def _fit_and_profile(params: dict, X_train, y_train, X_val, y_val) -> tuple:
+    """Fit a forest on the given columns and measure its accuracy, training time, size and latency."""
+    model = RandomForestRegressor(**params)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_time = time.perf_counter() - start
+
+    rmse = np.sqrt(mean_squared_error(y_val, model.predict(X_val)))
+    latency = measure_predict_latency(model, X_val)
+
+    stats = {
+        'n_features': X_train.shape[1],
+        'val_rmse': rmse,
+        'train_time_s': train_time,
+        'model_size_mb': model_size_bytes(model) / 1024 ** 2,
+        **latency
+    }
+    return model, stats
+
+
+def evaluate_feature_subsets(
+    dataset: pd.DataFrame,
+    params: dict,
+    top_ks=DEFAULT_TOP_K,
+    cumulative_importances=DEFAULT_CUMULATIVE_IMPORTANCE,
+    target_column: str = "SalePrice"
+) -> tuple:
+    """
+    Retrain the forest on several subsets of the most important features and profile every variant.
+
+    The importances come from a reference forest trained on all features with the same parameters
+    and on the same training split as train_model_with_tuning.
+
+    Parameters:
+    - dataset (pd.DataFrame): Featured dataset (as produced by preprocess.py).
+    - params (dict): RandomForestRegressor parameters, usually the tuned ones from model_metadata.json.
+    - top_ks (iterable of int): Subset sizes to try.
+    - cumulative_importances (iterable of float): Cumulative importance thresholds to try.
+    - target_column (str): The name of the column to predict.
+
+    Returns:
+    tuple: (report, models, feature_lists)
+    - report (pd.DataFrame): One row per subset with validation RMSE, training time, size and latencies.
+    - models (dict): Subset name -> fitted model.
+    - feature_lists (dict): Subset name -> list of features the model was trained on.
+    """
+    estimators = dataset.drop(columns=[target_column])
+    targets = dataset[target_column]
+    X_train, X_val, y_train, y_val = get_datasets(estimators, targets, target_column, dump=False)
+
+    print(f"Training reference model on all {X_train.shape[1]} features...")
+    reference, reference_stats = _fit_and_profile(params, X_train, y_train, X_val, y_val)
+    feature_importance = pd.DataFrame({
+        'feature': X_train.columns,
+        'importance': reference.feature_importances_
+    })
+
+    subsets = {'all': X_train.columns.tolist()}
+    for k in top_ks:
+        if k < X_train.shape[1]:
+            subsets[f'top_{k}'] = select_top_features(feature_importance, top_k=k)
+    for threshold in cumulative_importances:
+        subsets[f'cumulative_{threshold:.2f}'] = select_top_features(
+            feature_importance, cumulative_importance=threshold
+        )
+
+    rows = [{'subset': 'all', **reference_stats}]
+    models = {'all': reference}
+    for name, features in subsets.items():
+        if name == 'all':
+            continue
+        print(f"Training model on {name} ({len(features)} features)...")
+        models[name], stats = _fit_and_profile(params, X_train[features], y_train, X_val[features], y_val)
+        rows.append({'subset': name, **stats})
+
+    report = pd.DataFrame(rows)
+    report['rmse_increase_pct'] = (report['val_rmse'] / reference_stats['val_rmse'] - 1) * 100
+    report['single_speedup'] = reference_stats['single_p50_ms'] / report['single_p50_ms']
+    report['size_reduction'] = reference_stats['model_size_mb'] / report['model_size_mb']
+
+    return report, models, subsets
+
+
+def choose_subset(report: pd.DataFrame, max_rmse_increase_pct: float = 1.0) -> str:
+    """
+    Choose the subset with the fewest features whose validation RMSE is at most
+    max_rmse_increase_pct percent worse than the model trained on all features.
+    """
+    acceptable = report[report['rmse_increase_pct'] <= max_rmse_increase_pct]
+    return acceptable.sort_values(['n_features', 'val_rmse']).iloc[0]['subset']
+
+
+def save_pruned_model(model, features: list, subset_stats: dict, model_path: str = "model/"):
+    """
+    Save the pruned model and its reduced input schema.
+
+    Parameters:
+    - model: Model trained on the pruned features.
+    - features (list): Ordered feature names the model expects.
+    - subset_stats (dict): Row of the pruning report describing the model.
+    - model_path (str): Directory to save the model and the schema.
+    """
+    os.makedirs(model_path, exist_ok=True)
+
+    model_file = os.path.join(model_path, "house_price_model_pruned.pkl")
+    joblib.dump(model, model_file)
+    print(f"Pruned model saved to {model_file}")
+
+    schema_file = os.path.join(model_path, "pruned_feature_schema.json")
+    with open(schema_file, 'w') as f:
+        json.dump({
+            'subset': subset_stats['subset'],
+            'n_features': len(features),
+            'features': features,
+            'metrics': {key: value for key, value in subset_stats.items() if key != 'subset'}
+        }, f, indent=4)
+    print(f"Pruned feature schema saved to {schema_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prune features by importance and report the latency/accuracy trade-off.")
+    parser.add_argument("--top-k", type=int, nargs="*", default=list(DEFAULT_TOP_K))
+    parser.add_argument("--cumulative", type=float, nargs="*", default=list(DEFAULT_CUMULATIVE_IMPORTANCE),
+                        help="Cumulative importance thresholds (0.0 - 1.0)")
+    parser.add_argument("--max-rmse-increase", type=float, default=1.0,
+                        help="Maximum accepted validation RMSE increase in %% when choosing the pruned model")
+    parser.add_argument("--emit", action="store_true", help="Save the chosen pruned model and its schema")
+    args = parser.parse_args()
+
+    data_path = "datasets/processed/ames-train-featured.csv"
+    if not os.path.exists(data_path):
+        print(f"Featured data not found at {data_path}")
+        print("Please run preprocess.py first to generate featured data.")
+        exit(1)
+
+    dataset = load_data(data_path).dropna(subset=["SalePrice"])
+    report, models, subsets = evaluate_feature_subsets(
+        dataset, load_model_parameters(), args.top_k, args.cumulative
+    )
+
+    os.makedirs("evaluation", exist_ok=True)
+    report.to_csv("evaluation/feature_pruning_report.csv", index=False)
+    print("\nFeature pruning report:")
+    print(report.to_string(index=False))
+    print("\n   [OK] Report saved to evaluation/feature_pruning_report.csv")
+
+    chosen = choose_subset(report, args.max_rmse_increase)
+    print(f"\nChosen subset: {chosen} ({len(subsets[chosen])} features)")
+    if args.emit:
+        stats = report[report['subset'] == chosen].iloc[0].to_dict()
+        save_pruned_model(models[chosen], subsets[chosen], stats)
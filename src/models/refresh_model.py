@@ -0,0 +1,162 @@
+import sys
+import os
+import json
+import argparse
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from src.data_preprocessing.preprocess import transform_data
+from src.models.parallel_forest import merge_forests
+from src.models.train_model import save_model_and_metadata, validation_scores
+
+
+RECENT_SALES_PATH = "datasets/used/recent_sales.csv"
+
+
+def featurize_new_sales(new_sales: pd.DataFrame, feature_names: list, reference_path: str = "datasets/ames-train.csv") -> pd.DataFrame:
+    """
+    Preprocess raw new sales into the model's feature space.
+
+    New sales are cleaned together with the original raw dataset, so that missing values are imputed
+    with the same statistics as during training (a small batch of sales could otherwise have columns
+    with no observed values at all). Outliers are removed like in preprocess.py.
+
+    Parameters:
+    - new_sales (pd.DataFrame): Raw new sales, in the format of datasets/ames-train.csv (with SalePrice).
+    - feature_names (list): Ordered features the model was trained on.
+    - reference_path (str): Raw dataset the model was trained on.
+
+    Returns:
+    pd.DataFrame: Featured new sales with the model's columns and SalePrice.
+    """
+    reference = pd.read_csv(reference_path)
+    combined = pd.concat([reference, new_sales], ignore_index=True)
+    featured = transform_data(combined, is_training=True)
+
+    new_rows = featured[featured.index >= len(reference)]
+    return new_rows.reindex(columns=feature_names + ["SalePrice"], fill_value=0).reset_index(drop=True)
+
+
+def select_recent_window(history: pd.DataFrame, window_rows: int) -> pd.DataFrame:
+    """Return the window_rows most recent sales (by YrSold, MoSold) of the history."""
+    ordered = history.sort_values(["YrSold", "MoSold"], kind="stable")
+    return ordered.tail(window_rows)
+
+
+def refresh_forest(model, recent: pd.DataFrame, n_new_trees: int, n_retire: int = None, target_column: str = "SalePrice"):
+    """
+    Grow new trees on recent data and retire the oldest trees of the forest.
+
+    The hyperparameters of the forest are kept. Every tree is tagged with the generation
+    (refresh number) it was grown in, stored in model.tree_generations_.
+
+    Parameters:
+    - model (RandomForestRegressor): Forest to refresh.
+    - recent (pd.DataFrame): Recent sales (features and target) the new trees are grown on.
+    - n_new_trees (int): Number of trees to grow.
+    - n_retire (int): Number of oldest trees to drop. Defaults to n_new_trees, which keeps the forest size.
+    - target_column (str): The name of the column to predict.
+
+    Returns:
+    tuple: (refreshed_model, generation)
+    """
+    n_retire = n_new_trees if n_retire is None else n_retire
+    generations = list(getattr(model, "tree_generations_", [0] * len(model.estimators_)))
+    generation = max(generations) + 1
+
+    # Every generation gets its own seed, so that refreshes are reproducible but grow different trees
+    seed = int(np.random.SeedSequence([model.random_state or 2137, generation]).generate_state(1)[0])
+    new_trees = clone(model).set_params(n_estimators=n_new_trees, random_state=seed)
+    new_trees.fit(recent.drop(columns=[target_column]), recent[target_column])
+
+    # Trees are kept in the order they were grown, so the oldest ones come first
+    n_retire = min(n_retire, len(model.estimators_) - 1)
+    model.estimators_ = model.estimators_[n_retire:]
+    refreshed = merge_forests([model, new_trees], n_jobs=model.n_jobs)
+    refreshed.tree_generations_ = generations[n_retire:] + [generation] * n_new_trees
+
+    return refreshed, generation
+
+
+def refresh_model(
+    new_sales_path: str,
+    n_new_trees: int = None,
+    n_retire: int = None,
+    window_rows: int = None,
+    model_path: str = "model/"
+):
+    """
+    Refresh the trained model with new sales without rerunning the hyperparameter search.
+
+    Parameters:
+    - new_sales_path (str): CSV with raw new sales (format of datasets/ames-train.csv).
+    - n_new_trees (int): Trees to grow. Defaults to 10 % of the forest.
+    - n_retire (int): Oldest trees to retire. Defaults to n_new_trees.
+    - window_rows (int): Size of the sliding window of recent sales the new trees are trained on.
+      Defaults to the size of the original training set.
+    - model_path (str): Directory with the model and its metadata.
+    """
+    model = joblib.load(os.path.join(model_path, "house_price_model.pkl"))
+    with open(os.path.join(model_path, "model_metadata.json")) as f:
+        metadata = json.load(f)
+
+    feature_names = model.feature_names_in_.tolist()
+    new_sales = featurize_new_sales(pd.read_csv(new_sales_path), feature_names)
+    print(f"Loaded {len(new_sales)} new sales")
+
+    # How well did the current model do on the new sales before seeing them
+    before = validation_scores(new_sales["SalePrice"], model.predict(new_sales[feature_names]))
+    print(f"RMSE on new sales before refresh: ${before['rmse']:,.2f}")
+
+    # Sliding window over the training data, earlier refreshes and the new sales
+    training = pd.read_csv("datasets/used/training.csv")
+    recent_sales = new_sales
+    if os.path.exists(RECENT_SALES_PATH):
+        recent_sales = pd.concat([pd.read_csv(RECENT_SALES_PATH), new_sales], ignore_index=True)
+        # Refreshing with the same file twice must not fill the window with copies of its sales
+        recent_sales = recent_sales.drop_duplicates(subset=["Id"] if "Id" in recent_sales.columns else None, keep="last")
+
+    history = pd.concat([training, recent_sales], ignore_index=True)
+    window = select_recent_window(history, window_rows or len(training))
+
+    n_new_trees = n_new_trees or max(1, len(model.estimators_) // 10)
+    print(f"Growing {n_new_trees} trees on the {len(window)} most recent sales...")
+    model, generation = refresh_forest(model, window, n_new_trees, n_retire)
+
+    validation = pd.read_csv("datasets/used/validation.csv")
+    metrics = metadata['metrics']
+    metrics['validation'] = validation_scores(validation["SalePrice"], model.predict(validation[feature_names]))
+    metrics['refresh'] = {
+        'generation': generation,
+        'new_sales': len(new_sales),
+        'new_trees': n_new_trees,
+        'n_estimators': len(model.estimators_),
+        'window_rows': len(window),
+        'new_sales_before_refresh': before
+    }
+    print(f"Validation RMSE after refresh: ${metrics['validation']['rmse']:,.2f}")
+
+    feature_importance = pd.DataFrame({
+        'feature': feature_names,
+        'importance': model.feature_importances_
+    }).sort_values('importance', ascending=False)
+
+    save_model_and_metadata(model, metadata['parameters'], metrics, feature_importance, model_path)
+    # Only sales the saved model was refreshed with join the window of the next refresh
+    recent_sales.to_csv(RECENT_SALES_PATH, index=False)
+    print(f"[OK] {len(recent_sales)} recent sales saved to {RECENT_SALES_PATH}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the trained forest with new sales.")
+    parser.add_argument("new_sales", help="CSV with raw new sales (format of datasets/ames-train.csv)")
+    parser.add_argument("--new-trees", type=int, default=None, help="Trees to grow (default: 10%% of the forest)")
+    parser.add_argument("--retire", type=int, default=None, help="Oldest trees to retire (default: --new-trees)")
+    parser.add_argument("--window", type=int, default=None, help="Number of most recent sales the new trees are trained on")
+    args = parser.parse_args()
+
+    refresh_model(args.new_sales, args.new_trees, args.retire, args.window)
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import GridSearchCV, ParameterGrid
+from src.models.model_selection import leaderboard_from_cv_results
+
+
+def get_strata(X: pd.DataFrame, y: pd.Series, n_price_bins: int = 5) -> pd.Series:
+    """
+    Assign every row to a stratum of SalePrice quantile x Neighborhood.
+
+    Parameters:
+    - X (pd.DataFrame): One-hot encoded features (with Neighborhood_* columns).
+    - y (pd.Series): SalePrice.
+    - n_price_bins (int): Number of SalePrice quantile bins.
+
+    Returns:
+    pd.Series: Stratum label of every row, aligned with X.
+    """
+    price_bins = pd.qcut(y, q=n_price_bins, labels=False, duplicates="drop").astype(str)
+
+    neighborhood_columns = [column for column in X.columns if column.startswith("Neighborhood_")]
+    if neighborhood_columns:
+        neighborhoods = X[neighborhood_columns].astype(float).idxmax(axis=1)
+        return price_bins + "|" + neighborhoods
+    return price_bins
+
+
+def stratified_subsample(strata: pd.Series, n_rows: int, seed: int = 2137) -> np.ndarray:
+    """
+    Draw a stratified subsample with every stratum represented proportionally to its size.
+
+    Parameters:
+    - strata (pd.Series): Stratum label of every row.
+    - n_rows (int): Approximate size of the subsample.
+    - seed (int): Seed of the random generator.
+
+    Returns:
+    np.ndarray: Positions (not index labels) of the selected rows.
+    """
+    if n_rows >= len(strata):
+        return np.arange(len(strata))
+
+    rng = np.random.default_rng(seed)
+    fraction = n_rows / len(strata)
+
+    # Shuffle, then keep the first ~fraction of every stratum. Stochastic rounding of the
+    # per-stratum quota keeps small strata represented in expectation.
+    order = rng.permutation(len(strata))
+    shuffled = pd.Series(strata.to_numpy()[order])
+    rank = shuffled.groupby(shuffled).cumcount().to_numpy()
+    quota = shuffled.map(shuffled.value_counts() * fraction).to_numpy()
+    quota = np.floor(quota + rng.random(len(quota)))
+
+    return np.sort(order[rank < quota])
+
+
+def subsample_search(
+    X: pd.DataFrame,
+    y: pd.Series,
+    param_grid: dict,
+    base_params: dict,
+    sample_rows: int = 1000,
+    max_sample_rows: int = 10_000,
+    grow: bool = True,
+    growth_factor: int = 3,
+    keep_fraction: float = 1 / 3,
+    cv: int = 3,
+    seed: int = 2137
+) -> tuple:
+    """
+    Rank hyperparameter candidates on stratified subsamples instead of the full training data.
+
+    Every round cross-validates the remaining candidates on a stratified subsample
+    (SalePrice quantile x Neighborhood). With grow=True only the best keep_fraction of the candidates
+    survive to the next round, which uses a growth_factor times larger sample, until one candidate is
+    left or the sample reaches max_sample_rows. The winner is NOT refitted here - refit it on the full data.
+
+    Parameters:
+    - X (pd.DataFrame): Training features.
+    - y (pd.Series): Training targets.
+    - param_grid (dict): Grid of RandomForestRegressor parameters, as for GridSearchCV.
+    - base_params (dict): Fixed RandomForestRegressor parameters (random_state, n_jobs).
+    - sample_rows (int): Sample size of the first round.
+    - max_sample_rows (int): Largest sample size. Keeps the tuning cost independent of the dataset size.
+    - grow (bool): Whether to run successive rounds on growing samples.
+    - growth_factor (int): How many times the sample grows every round.
+    - keep_fraction (float): Share of candidates surviving every round.
+    - cv (int): Number of cross-validation folds.
+    - seed (int): Seed of the subsampling.
+
+    Returns:
+    tuple: (best_params, search_log)
+    - best_params (dict): Parameters of the winning candidate.
+    - search_log (list): One dict per round with the sample size, number of candidates, best CV RMSE
+      and the leaderboard of the round.
+    """
+    strata = get_strata(X, y)
+    candidates = list(ParameterGrid(param_grid))
+    n_rows = sample_rows
+    search_log = []
+    round_index = 0
+
+    while True:
+        n_rows = min(n_rows, max_sample_rows, len(X))
+        rows = stratified_subsample(strata, n_rows, seed=seed + round_index)
+
+        print(f"Round {round_index + 1}: {len(candidates)} candidates on {len(rows)} rows...")
+        grid_search = GridSearchCV(
+            estimator=RandomForestRegressor(**base_params),
+            param_grid=[{key: [value] for key, value in candidate.items()} for candidate in candidates],
+            cv=cv,
+            scoring='neg_mean_squared_error',
+            n_jobs=-1,
+            refit=False
+        )
+        grid_search.fit(X.iloc[rows], y.iloc[rows])
+
+        leaderboard = leaderboard_from_cv_results(grid_search.cv_results_)
+        candidates = leaderboard['params'].tolist()
+        search_log.append({
+            'round': round_index + 1,
+            'sample_rows': len(rows),
+            'n_candidates': len(candidates),
+            'best_cv_rmse': float(np.sqrt(-grid_search.best_score_)),
+            'best_params': grid_search.best_params_,
+            'leaderboard': leaderboard
+        })
+        print(f"   Best CV RMSE: {search_log[-1]['best_cv_rmse']:,.2f} with {grid_search.best_params_}")
+
+        if not grow or n_rows >= min(max_sample_rows, len(X)):
+            break
+        candidates = candidates[:max(1, int(np.ceil(len(candidates) * keep_fraction)))]
+        if len(candidates) == 1:
+            break
+        n_rows *= growth_factor
+        round_index += 1
+
+    return candidates[0], search_log
@@ -1,6 +1,11 @@
+import sys
+import os
+import argparse
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 import pandas as pd
 import numpy as np
-import os
 import joblib
 import json
 from datetime import datetime
@@ -10,6 +15,15 @@ from sklearn.model_selection import train_test_split, GridSearchCV, cross_val_sc
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from math import sqrt
+from src.models.parallel_forest import train_parallel_forest
+from src.models.subsample_search import subsample_search
+from src.models.model_selection import SELECTION_RULES, leaderboard_from_cv_results, profile_candidates, select_candidate
+from src.features.schema import build_feature_schema
+from src.models.forest_intervals import INTERVAL_QUANTILES, predict_with_intervals
+from src.models.compiled_forest import COMPILED_MODEL_FILE, save_compiled_model
+from src.utils.versioning import file_version
+from src.evaluation.bootstrap import BOOTSTRAP_RESAMPLES, bootstrap_metrics
+from src.monitoring.drift import DRIFT_REFERENCE_FILE, build_drift_reference, save_drift_reference
 
 
 def load_data(path: str) -> pd.DataFrame:
@@ -25,6 +39,25 @@ def load_data(path: str) -> pd.DataFrame:
     return pd.read_csv(path)
 
 
+def validation_scores(y_true, y_pred) -> dict:
+    """
+    Validation metrics in the form stored in model_metadata.json.
+
+    Parameters:
+    y_true: Actual prices
+    y_pred: Predicted prices
+
+    Returns:
+    dict: rmse, mae, r2 and mape (in %)
+    """
+    return {
+        'rmse': float(sqrt(mean_squared_error(y_true, y_pred))),
+        'mae': float(mean_absolute_error(y_true, y_pred)),
+        'r2': float(r2_score(y_true, y_pred)),
+        'mape': float(np.mean(np.abs((y_true - y_pred) / y_true)) * 100)
+    }
+
+
 def evaluate_model(model, X, y, cv=5):
     """
     Evaluate model using cross-validation.
@@ -103,7 +136,12 @@ def get_datasets(
 def train_model_with_tuning(
     dataset: pd.DataFrame, 
     target_column: str = "SalePrice",
-    tune_hyperparameters: bool = True
+    tune_hyperparameters: bool = True,
+    parallel_workers: int = None,
+    search_strategy: str = "grid",
+    selection_rule: str = "rmse",
+    latency_budget_ms: float = None,
+    size_budget_mb: float = None
 ) -> tuple:
     """
     Train a RandomForestRegressor model with optional hyperparameter tuning.
@@ -112,6 +150,14 @@ def train_model_with_tuning(
     df (pd.DataFrame): The input dataset with features and target.
     target_column (str): The name of the column to predict. Defaults to 'SalePrice'.
     tune_hyperparameters (bool): Whether to perform GridSearchCV for hyperparameter tuning.
+    parallel_workers (int): If given, the final model is trained as forest slices in this many
+    worker processes (see parallel_forest.py) instead of a single RandomForestRegressor fit.
+    search_strategy (str): 'grid' runs GridSearchCV on the whole training set. 'subsample' ranks the
+    candidates on growing stratified subsamples (see subsample_search.py) and refits only the winner.
+    selection_rule (str): 'rmse' picks the candidate with the best CV RMSE. 'budget' and 'pareto' also
+    measure predict latency and serialized size of the best candidates (see model_selection.py).
+    latency_budget_ms (float): p99 single-row predict latency budget for the 'budget' rule.
+    size_budget_mb (float): Serialized model size budget for the 'budget' rule.
 
     Returns:
     tuple: (trained_model, best_params, evaluation_metrics, feature_importance)
@@ -127,6 +173,7 @@ def train_model_with_tuning(
     
     # Split into training and validation sets (80% training, 20% validation)
     X_train, X_val, y_train, y_val = get_datasets(estimators, targets, target_column, dump=True)  
+    selection_summary = None
     
     if tune_hyperparameters:
         print("Performing hyperparameter tuning with GridSearchCV...")
@@ -142,38 +189,91 @@ def train_model_with_tuning(
             'bootstrap': [True, False]
         }
         
-        # Create base model
-        rf_base = RandomForestRegressor(random_state=2137, n_jobs=-1)
-        
-        # Perform GridSearchCV
-        grid_search = GridSearchCV(
-            estimator=rf_base,
-            param_grid=param_grid,
-            cv=5,
-            scoring='neg_mean_squared_error',
-            n_jobs=-1,
-            verbose=1
-        )
-        
-        # Fit grid search
-        grid_search.fit(X_train, y_train)
+        if search_strategy == "subsample":
+            print("Ranking candidates on stratified subsamples of the training data...")
+            best_params, search_log = subsample_search(
+                X_train, y_train, param_grid, {'random_state': 2137, 'n_jobs': -1}
+            )
+            leaderboard = search_log[-1]['leaderboard']
+            # The winner is refitted on the full training data below
+            model = None
+            
+            print(f"\nBest parameters found: {best_params}")
+            print(f"Best CV score on the last sample (RMSE): {search_log[-1]['best_cv_rmse']:.2f}")
+            
+        else:
+            # Create base model
+            rf_base = RandomForestRegressor(random_state=2137, n_jobs=-1)
+            
+            # Perform GridSearchCV
+            grid_search = GridSearchCV(
+                estimator=rf_base,
+                param_grid=param_grid,
+                cv=5,
+                scoring='neg_mean_squared_error',
+                n_jobs=-1,
+                verbose=1,
+                # The final fit is done separately when it is spread over worker processes
+                # or when the winner is chosen by serving cost as well
+                refit=parallel_workers is None and selection_rule == "rmse"
+            )
+            
+            # Fit grid search
+            grid_search.fit(X_train, y_train)
+            
+            # Get best model
+            best_params = grid_search.best_params_
+            leaderboard = leaderboard_from_cv_results(grid_search.cv_results_)
+            model = grid_search.best_estimator_ if grid_search.refit else None
+            
+            print(f"\nBest parameters found: {best_params}")
+            print(f"Best CV score (RMSE): {np.sqrt(-grid_search.best_score_):.2f}")
         
-        # Get best model
-        model = grid_search.best_estimator_
-        best_params = grid_search.best_params_
+        if selection_rule != "rmse":
+            print(f"\nSelecting model by '{selection_rule}' rule (latency and size of the best candidates)...")
+            selection_report = profile_candidates(leaderboard, X_train, y_train, {'random_state': 2137, 'n_jobs': -1})
+            selected = select_candidate(selection_report, selection_rule, latency_budget_ms, size_budget_mb)
+            best_params = selected['params']
+            model = None
+            
+            os.makedirs("evaluation", exist_ok=True)
+            selection_report.to_csv("evaluation/model_selection_report.csv", index=False)
+            print(selection_report.drop(columns=['params']).to_string())
+            print(f"   [OK] Model selection report saved to evaluation/model_selection_report.csv")
+            
+            selection_summary = {
+                'rule': selection_rule,
+                'latency_budget_ms': latency_budget_ms,
+                'size_budget_mb': size_budget_mb,
+                'cv_rmse': float(selected['cv_rmse']),
+                'single_p99_ms': float(selected['single_p99_ms']),
+                'size_mb': float(selected['size_mb'])
+            }
+            print(f"\nSelected parameters: {best_params}")
         
-        print(f"\nBest parameters found: {best_params}")
-        print(f"Best CV score (RMSE): {np.sqrt(-grid_search.best_score_):.2f}")
+        # Refit the winner on the full training data, unless GridSearchCV already did
+        if model is None:
+            final_params = {'random_state': 2137, 'n_jobs': -1, **best_params}
+            if parallel_workers is None:
+                model = RandomForestRegressor(**final_params)
+                model.fit(X_train, y_train)
+            else:
+                model = train_parallel_forest(X_train, y_train, final_params, n_workers=parallel_workers)
         
     else:
         print("Training model without hyperparameter tuning...")
         # Use default parameters
-        model = RandomForestRegressor(random_state=2137, n_jobs=-1)
-        model.fit(X_train, y_train)
+        if parallel_workers is None:
+            model = RandomForestRegressor(random_state=2137, n_jobs=-1)
+            model.fit(X_train, y_train)
+        else:
+            model = train_parallel_forest(
+                X_train, y_train, {'random_state': 2137, 'n_jobs': -1}, n_workers=parallel_workers
+            )
         best_params = model.get_params()
     
-    # Make predictions on validation set
-    y_pred = model.predict(X_val)
+    # Make predictions on validation set (with the per-house interval from the spread of the trees)
+    y_pred, y_lower, y_upper = predict_with_intervals(model, X_val)
     
     # Save validation predictions with IDs
     print("\nSaving validation predictions...")
@@ -215,19 +315,23 @@ def train_model_with_tuning(
     val_actual.to_csv("evaluation/validation_actual.csv", index=False)
     print(f"   [OK] Validation actual prices saved to evaluation/validation_actual.csv")
     
-    # Calculate metrics
-    rmse = sqrt(mean_squared_error(y_val, y_pred))
-    mae = mean_absolute_error(y_val, y_pred)
-    r2 = r2_score(y_val, y_pred)
+    # Calculate metrics (RMSE, MAE, R-squared and MAPE - Mean Absolute Percentage Error)
+    scores = validation_scores(y_val, y_pred)
+    rmse, mae, r2, mape = scores['rmse'], scores['mae'], scores['r2'], scores['mape']
     
-    # Calculate MAPE (Mean Absolute Percentage Error)
-    mape = np.mean(np.abs((y_val - y_pred) / y_val)) * 100
+    # Share of validation prices inside their prediction interval (nominal: 90 %)
+    interval_coverage = np.mean((y_val >= y_lower) & (y_val <= y_upper))
+    
+    # 95% bootstrap confidence intervals of the validation metrics (vectorized, cheap enough for every run)
+    bootstrap = bootstrap_metrics(y_val, y_pred, BOOTSTRAP_RESAMPLES)
     
     print(f"\nValidation Set Performance:")
-    print(f"RMSE: ${rmse:,.2f}")
-    print(f"MAE: ${mae:,.2f}")
-    print(f"R-squared Score: {r2:.4f}")
-    print(f"MAPE: {mape:.2f}%")
+    print(f"RMSE: ${rmse:,.2f} (95% CI ${bootstrap['RMSE']['lower']:,.2f} - ${bootstrap['RMSE']['upper']:,.2f})")
+    print(f"MAE: ${mae:,.2f} (95% CI ${bootstrap['MAE']['lower']:,.2f} - ${bootstrap['MAE']['upper']:,.2f})")
+    print(f"R-squared Score: {r2:.4f} (95% CI {bootstrap['R2']['lower']:.4f} - {bootstrap['R2']['upper']:.4f})")
+    print(f"MAPE: {mape:.2f}% (95% CI {bootstrap['MAPE']['lower']:.2f}% - {bootstrap['MAPE']['upper']:.2f}%)")
+    print(f"Prediction interval coverage: {interval_coverage:.1%} "
+          f"(nominal {INTERVAL_QUANTILES[1] - INTERVAL_QUANTILES[0]:.0%})")
     
     # Get cross-validation scores
     cv_metrics = evaluate_model(model, X_train, y_train)
@@ -248,21 +352,52 @@ def train_model_with_tuning(
     # Compile evaluation metrics
     evaluation_metrics = {
         'validation': {
-            'rmse': rmse,
-            'mae': mae,
-            'r2': r2,
-            'mape': mape
+            **scores,
+            'interval_coverage': float(interval_coverage),
+            'median_interval_width': float(np.median(y_upper - y_lower)),
+            'bootstrap': bootstrap
         },
         'cross_validation': cv_metrics,
         'n_samples_train': len(X_train),
         'n_samples_val': len(X_val),
         'n_features': estimators.shape[1]
     }
+    if selection_summary is not None:
+        evaluation_metrics['selection'] = selection_summary
     
     return model, best_params, evaluation_metrics, feature_importance
 
 
-def save_model_and_metadata(model, params, metrics, feature_importance: pd.DataFrame, model_path="model/"):
+def load_model_parameters(model_path: str = "model/") -> dict:
+    """
+    Load the RandomForestRegressor parameters chosen by the last training run.
+
+    Parameters:
+    model_path (str): Directory with model_metadata.json.
+
+    Returns:
+    dict: Parameters to pass to RandomForestRegressor. Falls back to the defaults used
+    by train_model_with_tuning if no model has been trained yet.
+    """
+    params = {'random_state': 2137, 'n_jobs': -1}
+
+    metadata_file = os.path.join(model_path, "model_metadata.json")
+    if os.path.exists(metadata_file):
+        with open(metadata_file, 'r') as f:
+            params.update(json.load(f)['parameters'])
+
+    return params
+
+
+def save_model_and_metadata(
+    model,
+    params,
+    metrics,
+    feature_importance: pd.DataFrame,
+    model_path="model/",
+    feature_frame: pd.DataFrame = None,
+    raw_frame: pd.DataFrame = None
+):
     """
     Save the trained model and associated metadata.
     
@@ -272,14 +407,30 @@ def save_model_and_metadata(model, params, metrics, feature_importance: pd.DataF
     metrics: Evaluation metrics
     feature_importance: Feature importance dataframe
     model_path: Directory to save model and metadata
+    feature_frame: Training features, used for the dtypes of the feature schema
+    raw_frame: Raw training data; with feature_frame, the drift monitor's reference histograms are saved
     """
     os.makedirs(model_path, exist_ok=True)
     
+    # The feature schema is stored inside the model, so serving needs neither the training data nor get_dummies
+    if feature_frame is not None or not hasattr(model, "feature_schema_"):
+        model.feature_schema_ = build_feature_schema(model.feature_names_in_, feature_frame)
+    
     # Save model
     model_file = os.path.join(model_path, "house_price_model.pkl")
     joblib.dump(model, model_file)
     print(f"\nModel saved to {model_file}")
     
+    # Precompiled copy of the forest for fast-start serving (no unpickling, no scikit-learn import)
+    save_compiled_model(model, model_path, file_version(model_file))
+    print(f"Compiled model saved to {os.path.join(model_path, COMPILED_MODEL_FILE)}")
+    
+    # Training distribution of the raw fields and the features, compared with scored houses by the drift monitor
+    if feature_frame is not None and raw_frame is not None:
+        features = feature_frame.reindex(columns=model.feature_schema_['features'])
+        save_drift_reference(build_drift_reference(raw_frame, features), model_path)
+        print(f"Drift reference saved to {os.path.join(model_path, DRIFT_REFERENCE_FILE)}")
+    
     # Save metadata
     metadata = {
         'training_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -301,6 +452,17 @@ def save_model_and_metadata(model, params, metrics, feature_importance: pd.DataF
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the house price model.")
+    parser.add_argument("--parallel-workers", type=int, default=None,
+                        help="Train the final forest as slices in this many worker processes")
+    parser.add_argument("--search", choices=("grid", "subsample"), default="grid",
+                        help="Hyperparameter search on the full training set or on stratified subsamples")
+    parser.add_argument("--select", choices=SELECTION_RULES, default="rmse",
+                        help="Model selection rule: best CV RMSE, best RMSE within budgets or Pareto front")
+    parser.add_argument("--latency-budget-ms", type=float, default=None, help="p99 single-row latency budget")
+    parser.add_argument("--size-budget-mb", type=float, default=None, help="Serialized model size budget")
+    args = parser.parse_args()
+
     # Load featured training data
     data_path = "datasets/processed/ames-train-featured.csv"
     
@@ -320,8 +482,14 @@ if __name__ == "__main__":
     # Train the model with hyperparameter tuning
     model, best_params, metrics, feature_importance = train_model_with_tuning(
         dataset, 
-        tune_hyperparameters=True  # Set to False to skip GridSearchCV
+        tune_hyperparameters=True,  # Set to False to skip GridSearchCV
+        parallel_workers=args.parallel_workers,
+        search_strategy=args.search,
+        selection_rule=args.select,
+        latency_budget_ms=args.latency_budget_ms,
+        size_budget_mb=args.size_budget_mb
     )
     
     # Save everything
-    save_model_and_metadata(model, best_params, metrics, feature_importance)
\ No newline at end of file
+    save_model_and_metadata(model, best_params, metrics, feature_importance, feature_frame=dataset.drop(columns=["SalePrice"]),
+                            raw_frame=pd.read_csv("datasets/ames-train.csv"))
\ No newline at end of file
@@ -0,0 +1,359 @@
+import sys
+import os
+import json
+import argparse
+import threading
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+import numpy as np
+import pandas as pd
+
+
+DRIFT_REFERENCE_FILE = "drift_reference.json"
+
+# Bins of every numeric feature (deciles of the training data) and most common categories kept per categorical one
+NUMERIC_BINS = 10
+MAX_CATEGORIES = 30
+# Raw columns that are not properties of the house
+NON_FEATURE_COLUMNS: tuple = ("Id", "SalePrice")
+
+# PSI of a stable feature is below the first bound, of a significantly drifted one above the second
+PSI_THRESHOLDS: tuple = (0.1, 0.25)
+# Share added to every bin before the PSI, so that empty bins do not give infinite values
+PSI_EPSILON = 1e-4
+
+
+class FeatureHistograms:
+    """
+    Fixed-bin histograms of a group of features, updated in constant memory.
+
+    Numeric features are counted in NUMERIC_BINS bins with edges at the deciles of the training data,
+    categorical ones per training category (up to MAX_CATEGORIES) plus one bin for any other value;
+    missing values are counted separately. Counts of all features are updated with a few vectorized
+    operations per batch, and histograms with the same bins are merged by adding their counts.
+
+    Parameters:
+    - numeric (list): Numeric columns.
+    - edges (list): Inner bin edges of every numeric column (at most NUMERIC_BINS - 1, increasing).
+    - categorical (list): Categorical columns.
+    - categories (list): Categories of every categorical column.
+    """
+
+    def __init__(self, numeric: list, edges: list, categorical: list, categories: list):
+        self.numeric = list(numeric)
+        self.edges = [list(column_edges) for column_edges in edges]
+        self.categorical = list(categorical)
+        self.categories = [list(column_categories) for column_categories in categories]
+
+        # Columns with fewer distinct deciles are padded with +inf edges, whose bins stay empty
+        self._edges = np.full((len(self.numeric), NUMERIC_BINS - 1), np.inf)
+        for i, column_edges in enumerate(self.edges):
+            self._edges[i, :len(column_edges)] = column_edges
+        # Categories of all columns in one index; row i of the table maps its positions to the bins of column i
+        # (the last position, -1, is any value not in the index)
+        self._all_categories = pd.Index(sorted({category for column_categories in self.categories for category in column_categories}))
+        self._category_bins = np.full((len(self.categorical), len(self._all_categories) + 1), MAX_CATEGORIES)
+        for i, column_categories in enumerate(self.categories):
+            self._category_bins[i, self._all_categories.get_indexer(column_categories)] = np.arange(len(column_categories))
+
+        self.numeric_counts = np.zeros((len(self.numeric), NUMERIC_BINS), dtype=np.int64)
+        # The last bin of every categorical column counts categories not seen in training
+        self.categorical_counts = np.zeros((len(self.categorical), MAX_CATEGORIES + 1), dtype=np.int64)
+        self.missing = np.zeros(len(self.numeric) + len(self.categorical), dtype=np.int64)
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, numeric: list = None) -> "FeatureHistograms":
+        """
+        Bins of the columns of df (numeric: the numeric dtypes unless given), filled with the counts of df.
+        """
+        numeric = df.select_dtypes(include="number").columns.tolist() if numeric is None else list(numeric)
+        categorical = [column for column in df.columns if column not in numeric]
+
+        edges = []
+        for column in numeric:
+            values = pd.to_numeric(df[column], errors='coerce').dropna().to_numpy(dtype=float)
+            deciles = np.quantile(values, np.linspace(0, 1, NUMERIC_BINS + 1)[1:-1]) if len(values) else []
+            edges.append(np.unique(deciles).tolist())
+        categories = [df[column].dropna().astype(str).value_counts().index[:MAX_CATEGORIES].tolist() for column in categorical]
+
+        histograms = cls(numeric, edges, categorical, categories)
+        histograms.update(df)
+        return histograms
+
+    def empty_like(self) -> "FeatureHistograms":
+        return FeatureHistograms(self.numeric, self.edges, self.categorical, self.categories)
+
+    def count(self, df: pd.DataFrame) -> tuple:
+        """Counts of a batch: (numeric_counts, categorical_counts, missing, rows). Columns df lacks count as missing."""
+        n = len(df)
+        numeric = df.reindex(columns=self.numeric)
+        try:
+            values = numeric.to_numpy(dtype=float)
+        except (ValueError, TypeError):
+            # Text in a numeric field counts as missing
+            values = numeric.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        numeric_missing = np.isnan(values)
+        # Bin of a value = number of inner edges below it (right-closed bins like pd.cut)
+        bins = np.empty(values.shape, dtype=np.int64)
+        for i in range(len(self.numeric)):
+            bins[:, i] = np.searchsorted(self._edges[i], values[:, i], side='left')
+        # One bincount over (feature, bin) pairs counts all features at once
+        pairs = (np.arange(len(self.numeric)) * NUMERIC_BINS + bins)[~numeric_missing]
+        numeric_counts = np.bincount(pairs, minlength=self.numeric_counts.size).reshape(self.numeric_counts.shape)
+
+        # All categorical columns at once; only the distinct labels are looked up (missing values get code -1)
+        labels = df.reindex(columns=self.categorical).to_numpy(dtype=object)
+        codes, uniques = pd.factorize(labels.ravel())
+        categorical_missing = (codes < 0).reshape(labels.shape)
+        positions = np.append(self._all_categories.get_indexer(uniques.astype(str)), -1)[codes].reshape(labels.shape)
+        bins = self._category_bins[np.arange(len(self.categorical)), positions]
+        pairs = (np.arange(len(self.categorical)) * (MAX_CATEGORIES + 1) + bins)[~categorical_missing]
+        categorical_counts = np.bincount(pairs, minlength=self.categorical_counts.size).reshape(self.categorical_counts.shape)
+
+        missing = np.concatenate([numeric_missing.sum(axis=0), categorical_missing.sum(axis=0)])
+        return numeric_counts, categorical_counts, missing, n
+
+    def add(self, counts: tuple):
+        """Add counts of a batch (from count) or of another histogram with the same bins (from state, also as JSON lists)."""
+        numeric_counts, categorical_counts, missing, rows = counts
+        with self._lock:
+            self.numeric_counts += np.reshape(numeric_counts, self.numeric_counts.shape).astype(np.int64)
+            self.categorical_counts += np.reshape(categorical_counts, self.categorical_counts.shape).astype(np.int64)
+            self.missing += np.asarray(missing, dtype=np.int64)
+            self.rows += rows
+
+    def update(self, df: pd.DataFrame):
+        self.add(self.count(df))
+
+    def state(self) -> tuple:
+        with self._lock:
+            return self.numeric_counts.copy(), self.categorical_counts.copy(), self.missing.copy(), self.rows
+
+    def reset(self):
+        with self._lock:
+            self.numeric_counts[:] = 0
+            self.categorical_counts[:] = 0
+            self.missing[:] = 0
+            self.rows = 0
+
+    def to_dict(self) -> dict:
+        numeric_counts, categorical_counts, missing, rows = self.state()
+        return {
+            'numeric': self.numeric,
+            'edges': self.edges,
+            'categorical': self.categorical,
+            'categories': self.categories,
+            'numeric_counts': numeric_counts.tolist(),
+            'categorical_counts': categorical_counts.tolist(),
+            'missing': missing.tolist(),
+            'rows': rows
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FeatureHistograms":
+        histograms = cls(data['numeric'], data['edges'], data['categorical'], data['categories'])
+        histograms.add((data['numeric_counts'], data['categorical_counts'], data['missing'], data['rows']))
+        return histograms
+
+
+def _shares(counts: np.ndarray) -> np.ndarray:
+    """Share of every bin among the non-missing values of each feature (rows of counts)."""
+    totals = counts.sum(axis=1, keepdims=True)
+    return counts / np.maximum(totals, 1)
+
+
+def population_stability_index(reference_counts: np.ndarray, current_counts: np.ndarray) -> np.ndarray:
+    """PSI of every feature (rows of the count arrays): sum over bins of (current - reference) * ln(current / reference)."""
+    reference = _shares(reference_counts) + PSI_EPSILON
+    current = _shares(current_counts) + PSI_EPSILON
+    return ((current - reference) * np.log(current / reference)).sum(axis=1)
+
+
+def binned_ks(reference_counts: np.ndarray, current_counts: np.ndarray) -> np.ndarray:
+    """Largest difference of the cumulative shares of every feature, the KS statistic at the bin edges."""
+    return np.abs(np.cumsum(_shares(current_counts), axis=1) - np.cumsum(_shares(reference_counts), axis=1)).max(axis=1)
+
+
+def drift_status(psi: float) -> str:
+    if psi >= PSI_THRESHOLDS[1]:
+        return "significant"
+    if psi >= PSI_THRESHOLDS[0]:
+        return "moderate"
+    return "stable"
+
+
+def compare_histograms(reference: FeatureHistograms, current: FeatureHistograms) -> list:
+    """
+    Drift of every feature of a group between the reference and the current histograms.
+
+    Returns:
+    list: One dict per feature - feature, kind, psi, ks (numeric features only), share of missing values
+    in the reference and the current data, status (stable / moderate / significant by PSI_THRESHOLDS).
+    """
+    reference_numeric, reference_categorical, reference_missing, reference_rows = reference.state()
+    current_numeric, current_categorical, current_missing, current_rows = current.state()
+
+    psi = np.concatenate([
+        population_stability_index(reference_numeric, current_numeric),
+        population_stability_index(reference_categorical, current_categorical)
+    ])
+    ks = np.concatenate([binned_ks(reference_numeric, current_numeric), np.full(len(reference.categorical), np.nan)])
+    # Features without any current value cannot be compared
+    observed = np.concatenate([current_numeric.sum(axis=1), current_categorical.sum(axis=1)]) > 0
+
+    features = []
+    kinds = ["numeric"] * len(reference.numeric) + ["categorical"] * len(reference.categorical)
+    for i, (feature, kind) in enumerate(zip(reference.numeric + reference.categorical, kinds)):
+        features.append({
+            'feature': feature,
+            'kind': kind,
+            'psi': float(psi[i]) if observed[i] else None,
+            'ks': float(ks[i]) if observed[i] and kind == "numeric" else None,
+            'missing_reference': float(reference_missing[i] / max(reference_rows, 1)),
+            'missing_current': float(current_missing[i] / max(current_rows, 1)),
+            'status': drift_status(psi[i]) if observed[i] else "no data"
+        })
+    return features
+
+
+class DriftMonitor:
+    """
+    Histograms of the scored houses next to the training histograms, for the raw fields as received
+    ('raw') and the model's features ('features').
+
+    update() is cheap enough to run on every scored batch; report() computes the drift statistics on demand.
+    Thread-safe, so the request threads of the service can share one monitor.
+    """
+
+    def __init__(self, reference: dict):
+        self.reference = reference
+        self.current = {group: histograms.empty_like() for group, histograms in reference.items()}
+
+    def update(self, raw: pd.DataFrame = None, features: pd.DataFrame = None):
+        for group, df in (('raw', raw), ('features', features)):
+            if df is not None and group in self.current:
+                self.current[group].update(df)
+
+    def count(self, raw: pd.DataFrame = None, features: pd.DataFrame = None) -> dict:
+        """Counts of a batch per group without updating the monitor (e.g. in a worker process; add them with add)."""
+        return {
+            group: self.current[group].count(df)
+            for group, df in (('raw', raw), ('features', features)) if df is not None and group in self.current
+        }
+
+    def add(self, counts: dict):
+        for group, group_counts in counts.items():
+            self.current[group].add(group_counts)
+
+    def state(self) -> dict:
+        return {group: histograms.state() for group, histograms in self.current.items()}
+
+    def reset(self):
+        for histograms in self.current.values():
+            histograms.reset()
+
+    def report(self) -> dict:
+        """
+        Drift statistics of every feature, most drifted first.
+
+        Returns:
+        dict: Per group: rows of the reference and the current data, features per status and the features.
+        """
+        report = {}
+        for group, reference in self.reference.items():
+            features = compare_histograms(reference, self.current[group])
+            features.sort(key=lambda feature: -1 if feature['psi'] is None else feature['psi'], reverse=True)
+            statuses = [feature['status'] for feature in features]
+            report[group] = {
+                'reference_rows': reference.rows,
+                'current_rows': self.current[group].rows,
+                'status_counts': {status: statuses.count(status) for status in ("stable", "moderate", "significant", "no data")},
+                'features': features
+            }
+        return report
+
+
+def build_drift_reference(raw: pd.DataFrame, features: pd.DataFrame) -> dict:
+    """
+    Training histograms of the raw fields and of the model's features.
+
+    Parameters:
+    - raw (pd.DataFrame): Raw training data (as in datasets/ames-train.csv).
+    - features (pd.DataFrame): The model's training features.
+    Id and SalePrice are left out of both groups (the model is trained with Id, but new houses always
+    have new Ids, which would show as drift).
+
+    Returns:
+    dict: 'raw' and 'features' FeatureHistograms.
+    """
+    features = features.drop(columns=list(NON_FEATURE_COLUMNS), errors="ignore")
+    return {
+        'raw': FeatureHistograms.fit(raw.drop(columns=list(NON_FEATURE_COLUMNS), errors="ignore")),
+        # One-hot and ordinal encoded columns are binned like any other number
+        'features': FeatureHistograms.fit(features, numeric=features.columns.tolist())
+    }
+
+
+def save_drift_reference(reference: dict, model_path: str = "model/"):
+    with open(os.path.join(model_path, DRIFT_REFERENCE_FILE), 'w') as f:
+        json.dump({group: histograms.to_dict() for group, histograms in reference.items()}, f)
+
+
+def load_drift_monitor(model_path: str = "model/") -> DriftMonitor:
+    """Monitor of the model's drift reference, or None for models saved without one."""
+    path = os.path.join(model_path, DRIFT_REFERENCE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    return DriftMonitor({group: FeatureHistograms.from_dict(histograms) for group, histograms in data.items()})
+
+
+def format_drift_report(report: dict, top: int = 10) -> str:
+    """Text summary of a DriftMonitor report: status counts and the most drifted features of each group."""
+    lines = []
+    for group, group_report in report.items():
+        counts = ", ".join(f"{count} {status}" for status, count in group_report['status_counts'].items() if count)
+        lines.append(f"{group}: {group_report['current_rows']:,} houses vs {group_report['reference_rows']:,} in training ({counts})")
+        for feature in group_report['features'][:top]:
+            if feature['psi'] is None:
+                continue
+            ks = f"  KS {feature['ks']:.3f}" if feature['ks'] is not None else ""
+            lines.append(f"  {feature['feature']:<28}PSI {feature['psi']:.3f}{ks}  [{feature['status']}]")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feature drift of scored houses against the training data.")
+    parser.add_argument("input", nargs="?", help="CSV of raw houses to compare with the training data")
+    parser.add_argument("--model-path", default="model/")
+    parser.add_argument("--build-reference", action="store_true",
+                        help="Save the training histograms of an already trained model (train_model.py does this)")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--output", default=None, help="Also save the drift report as JSON")
+    args = parser.parse_args()
+
+    from src.serving.predictor import HousePricePredictor
+
+    if args.build_reference:
+        predictor = HousePricePredictor(model_path=args.model_path, fast_start=True)
+        featured = pd.read_csv("datasets/processed/ames-train-featured.csv").reindex(columns=predictor.feature_names)
+        save_drift_reference(build_drift_reference(pd.read_csv("datasets/ames-train.csv"), featured), args.model_path)
+        print(f"[OK] Drift reference saved to {os.path.join(args.model_path, DRIFT_REFERENCE_FILE)}")
+
+    if args.input:
+        predictor = HousePricePredictor(model_path=args.model_path, fast_start=True)
+        if predictor.drift is None:
+            print(f"[!] No {DRIFT_REFERENCE_FILE} in {args.model_path}, run with --build-reference first")
+            sys.exit(1)
+        for chunk in pd.read_csv(args.input, chunksize=args.chunk_size):
+            predictor.drift.update(chunk, predictor.prepare_frame(chunk))
+        report = predictor.drift.report()
+        print(format_drift_report(report))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=4)
+            print(f"[OK] Drift report saved to {args.output}")
@@ -0,0 +1,236 @@
+import sys
+import os
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+import numpy as np
+import pandas as pd
+from src.serving.predictor import HousePricePredictor
+from src.utils.versioning import file_version
+from src.models.forest_intervals import predict_with_intervals
+from src.monitoring.drift import DRIFT_REFERENCE_FILE, DriftMonitor, load_drift_monitor, format_drift_report
+
+
+# Predictor of a worker process, loaded once by _init_worker
+_predictor: HousePricePredictor = None
+
+
+def _init_worker(model_path: str, n_jobs: int):
+    global _predictor
+    _predictor = HousePricePredictor(model_path=model_path)
+    _predictor.model.n_jobs = n_jobs
+
+
+def _score_chunk(chunk_index: int, chunk: pd.DataFrame, chunk_size: int, intervals: bool = False) -> tuple:
+    """
+    Predict one chunk of raw houses. Rows without an Id column are numbered by their position in the file.
+
+    Returns:
+    tuple: (scored chunk, drift histogram counts of the chunk or None when the model has no drift reference)
+    """
+    if 'Id' in chunk.columns:
+        ids = chunk['Id'].to_numpy()
+    else:
+        ids = chunk_index * chunk_size + np.arange(1, len(chunk) + 1)
+    X = _predictor.prepare_frame(chunk)
+    drift_counts = _predictor.drift.count(chunk, X) if _predictor.drift is not None else None
+    if not intervals:
+        return pd.DataFrame({'Id': ids, 'SalePrice': _predictor.model.predict(X)}), drift_counts
+
+    # Same pass over the trees as predict, the interval comes from the spread of the trees
+    prediction, lower, upper = predict_with_intervals(_predictor.model, X, leaf_values=_predictor.leaf_values)
+    return pd.DataFrame({'Id': ids, 'SalePrice': prediction, 'lower': lower, 'upper': upper}), drift_counts
+
+
+def read_chunks(path: str, chunk_size: int, skip_chunks: int = 0):
+    """
+    Read a CSV or Parquet file of raw houses in chunks.
+
+    Parameters:
+    - path (str): Input file (.csv or .parquet).
+    - chunk_size (int): Rows per chunk.
+    - skip_chunks (int): Chunks already scored (when resuming); they are skipped without being parsed.
+
+    Yields:
+    tuple: (chunk_index, pd.DataFrame)
+    """
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet files requires pyarrow: pip install pyarrow")
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_size)
+        for chunk_index, batch in enumerate(batches):
+            if chunk_index >= skip_chunks:
+                yield chunk_index, batch.to_pandas()
+    else:
+        skip_rows = range(1, 1 + skip_chunks * chunk_size)
+        reader = pd.read_csv(path, chunksize=chunk_size, skiprows=skip_rows)
+        for chunk_index, chunk in enumerate(reader, start=skip_chunks):
+            yield chunk_index, chunk
+
+
+def _load_checkpoint(path: str, expected: dict) -> dict:
+    """Return the checkpoint if it belongs to the same input, chunk size and model, otherwise None."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if any(checkpoint.get(key) != value for key, value in expected.items()):
+        print("[!] Checkpoint belongs to another input, chunk size or model, starting from scratch")
+        return None
+    return checkpoint
+
+
+def _drift_state(monitor: DriftMonitor) -> dict:
+    """Histogram counts of the monitor as JSON lists (stored in the checkpoint, added back with DriftMonitor.add)."""
+    return {
+        group: [numeric.tolist(), categorical.tolist(), missing.tolist(), rows]
+        for group, (numeric, categorical, missing, rows) in monitor.state().items()
+    }
+
+
+def _save_checkpoint(path: str, checkpoint: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def score_file(
+    input_path: str,
+    output_path: str,
+    chunk_size: int = 50_000,
+    n_workers: int = None,
+    model_path: str = "model/",
+    resume: bool = True,
+    intervals: bool = False
+) -> dict:
+    """
+    Score a (possibly very large) file of raw houses and stream Id,SalePrice to a CSV.
+
+    Chunks are prepared and predicted in a pool of worker processes (each loads the model once) and written
+    in input order. At most two chunks per worker are in flight, so memory does not grow with the file size.
+    After every written chunk a checkpoint (<output>.checkpoint.json) records the progress; an interrupted run
+    continues from the last completed chunk. When the model has a drift reference, the histograms of the scored
+    houses are accumulated chunk by chunk (in the workers) and the drift report is saved to <output>.drift.json.
+
+    Parameters:
+    - input_path (str): CSV or Parquet file in the format of datasets/ames-train.csv (SalePrice not needed).
+    - output_path (str): Output CSV with the columns Id and SalePrice.
+    - chunk_size (int): Rows per chunk.
+    - n_workers (int): Worker processes. Defaults to os.cpu_count(). 1 scores in the current process.
+    - model_path (str): Directory with the model and its metadata.
+    - resume (bool): Whether to continue from a checkpoint of an interrupted run.
+    - intervals (bool): Whether to add the lower and upper bound of the prediction interval
+      (5th-95th percentile of the trees' predictions).
+
+    Returns:
+    dict: Scored rows, elapsed seconds and rows per second of this run.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    checkpoint_path = f"{output_path}.checkpoint.json"
+    drift = load_drift_monitor(model_path)
+    run_key = {
+        'input': os.path.abspath(input_path),
+        'chunk_size': chunk_size,
+        'model_version': file_version(os.path.join(model_path, "house_price_model.pkl")),
+        'intervals': intervals
+    }
+
+    checkpoint = _load_checkpoint(checkpoint_path, run_key) if resume else None
+    if checkpoint is not None and os.path.exists(output_path):
+        print(f"Resuming after chunk {checkpoint['chunks_done']} ({checkpoint['rows_done']:,} rows already scored)")
+        output = open(output_path, 'r+')
+        # Drop anything written after the last checkpoint (a partially written chunk)
+        output.truncate(checkpoint['output_bytes'])
+        output.seek(checkpoint['output_bytes'])
+        if drift is not None and 'drift' in checkpoint:
+            drift.add(checkpoint['drift'])
+    else:
+        checkpoint = {**run_key, 'chunks_done': 0, 'rows_done': 0, 'output_bytes': 0}
+        output = open(output_path, 'w')
+        output.write("Id,SalePrice,lower,upper\n" if intervals else "Id,SalePrice\n")
+
+    rows_scored = 0
+    start = time.perf_counter()
+
+    def write(chunk_index: int, result: tuple):
+        nonlocal rows_scored
+        scored, drift_counts = result
+        scored.to_csv(output, header=False, index=False)
+        output.flush()
+        rows_scored += len(scored)
+        checkpoint.update({
+            'chunks_done': chunk_index + 1,
+            'rows_done': checkpoint['rows_done'] + len(scored),
+            'output_bytes': output.tell()
+        })
+        if drift is not None:
+            drift.add(drift_counts)
+            checkpoint['drift'] = _drift_state(drift)
+        _save_checkpoint(checkpoint_path, checkpoint)
+
+        elapsed = time.perf_counter() - start
+        print(f"Chunk {chunk_index + 1}: {checkpoint['rows_done']:,} rows scored ({rows_scored / elapsed:,.0f} rows/s)")
+
+    chunks = read_chunks(input_path, chunk_size, skip_chunks=checkpoint['chunks_done'])
+    try:
+        if n_workers == 1:
+            _init_worker(model_path, n_jobs=-1)
+            for chunk_index, chunk in chunks:
+                write(chunk_index, _score_chunk(chunk_index, chunk, chunk_size, intervals))
+        else:
+            # Every worker predicts with one thread; the parallelism comes from the processes
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(model_path, 1)) as pool:
+                in_flight = deque()
+                for chunk_index, chunk in chunks:
+                    in_flight.append((chunk_index, pool.submit(_score_chunk, chunk_index, chunk, chunk_size, intervals)))
+                    if len(in_flight) >= 2 * n_workers:
+                        done_index, future = in_flight.popleft()
+                        write(done_index, future.result())
+                while in_flight:
+                    done_index, future = in_flight.popleft()
+                    write(done_index, future.result())
+    finally:
+        output.close()
+
+    elapsed = time.perf_counter() - start
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    summary = {
+        'rows': rows_scored,
+        'total_rows': checkpoint['rows_done'],
+        'seconds': elapsed,
+        'rows_per_second': rows_scored / elapsed if elapsed > 0 else None
+    }
+    print(f"[OK] Scored {rows_scored:,} rows in {elapsed:.1f}s ({summary['rows_per_second'] or 0:,.0f} rows/s) -> {output_path}")
+    if drift is not None:
+        report = drift.report()
+        with open(f"{output_path}.drift.json", 'w') as f:
+            json.dump(report, f, indent=4)
+        print(format_drift_report(report, top=5))
+        print(f"[OK] Drift report saved to {output_path}.drift.json")
+    else:
+        print(f"[!] No {DRIFT_REFERENCE_FILE} in {model_path}, drift not monitored")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of houses in chunks (output: Id,SalePrice).")
+    parser.add_argument("input", help="CSV or Parquet file in the format of datasets/ames-train.csv")
+    parser.add_argument("--output", default="datasets/scored/predictions.csv")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--model-path", default="model/")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of an interrupted run")
+    parser.add_argument("--intervals", action="store_true", help="Add lower,upper columns with the prediction interval")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    score_file(args.input, args.output, args.chunk_size, args.workers, args.model_path, resume=not args.restart, intervals=args.intervals)
@@ -0,0 +1,121 @@
+import time
+import queue
+import threading
+
+from src.serving.metrics import Histogram
+
+
+BATCH_SIZE_BOUNDS: tuple = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+QUEUE_WAIT_MS_BOUNDS: tuple = (0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+
+class _Request:
+    """Records of one caller waiting for their predictions."""
+
+    def __init__(self, records: list):
+        self.records = records
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.model_version = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Collect concurrent prediction requests into one batch.
+
+    A background thread takes the first waiting request, then keeps collecting requests for up to
+    max_wait_ms or until max_rows records are gathered, prepares and predicts all of them in one
+    vectorized call and hands every caller their part of the results.
+
+    Parameters:
+    - predictor (HousePricePredictor): Anything with predict(records) -> list of results and a model_version.
+      May be replaced while running (hot reload); every batch is predicted by one predictor.
+    - max_wait_ms (float): How long the first request of a batch waits for others.
+    - max_rows (int): Batch size that triggers prediction without waiting any longer.
+    """
+
+    def __init__(self, predictor, max_wait_ms: float = 5.0, max_rows: int = 256):
+        self.predictor = predictor
+        self.max_wait = max_wait_ms / 1000
+        self.max_rows = max_rows
+        self.batch_size = Histogram(BATCH_SIZE_BOUNDS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BOUNDS)
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def predict(self, records: list) -> tuple:
+        """
+        Predict the records as part of the next batch. Blocks until the batch is predicted.
+
+        Returns:
+        tuple: (results, model_version of the predictor that predicted the batch - after a hot reload it
+        can differ from the predictor that was served when the request arrived)
+        """
+        request = _Request(records)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result, request.model_version
+
+    def stats(self) -> dict:
+        return {
+            'max_wait_ms': self.max_wait * 1000,
+            'max_rows': self.max_rows,
+            'batch_size': self.batch_size.snapshot(),
+            'queue_wait_ms': self.queue_wait_ms.snapshot()
+        }
+
+    def _collect(self) -> list:
+        requests = [self._queue.get()]
+        n_rows = len(requests[0].records)
+        deadline = time.perf_counter() + self.max_wait
+
+        while n_rows < self.max_rows:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            requests.append(request)
+            n_rows += len(request.records)
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            started = time.perf_counter()
+            for request in requests:
+                self.queue_wait_ms.observe((started - request.enqueued) * 1000)
+
+            records = [record for request in requests for record in request.records]
+            self.batch_size.observe(len(records))
+            predictor = self.predictor
+            try:
+                results = predictor.predict(records)
+            except Exception:
+                # One invalid request must not fail the others, so retry them one by one
+                for request in requests:
+                    self._predict_single(predictor, request)
+                continue
+
+            offset = 0
+            for request in requests:
+                request.result = results[offset:offset + len(request.records)]
+                request.model_version = predictor.model_version
+                offset += len(request.records)
+                request.done.set()
+
+    def _predict_single(self, predictor, request: _Request):
+        try:
+            request.result = predictor.predict(request.records)
+            request.model_version = predictor.model_version
+        except Exception as e:
+            request.error = e
+        request.done.set()
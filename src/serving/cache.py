@@ -0,0 +1,142 @@
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of predictions with a time-to-live, optionally backed by a local SQLite file.
+
+    Keys are hashes of the prepared feature vector (so equivalent inputs - e.g. a missing field and the same
+    field set to its default - share an entry) together with the model version. Binding a different model
+    version drops every entry of the previous model, so a newly loaded model never serves stale predictions.
+
+    Parameters:
+    - max_entries (int): Entries kept in memory; the least recently used ones are evicted.
+    - ttl_seconds (float): Age after which an entry is not used any more. None keeps entries until evicted.
+    - disk_path (str): SQLite file shared by processes on the same machine. None keeps the cache in memory only.
+    """
+
+    def __init__(self, max_entries: int = 100_000, ttl_seconds: float = None, disk_path: str = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.model_version = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_path is not None:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key TEXT PRIMARY KEY, model_version TEXT, created REAL, value TEXT)"
+            )
+            self._disk.commit()
+
+    def bind_model(self, model_version: str):
+        """Use the cache for predictions of the given model. Entries of any other model are dropped."""
+        with self._lock:
+            if model_version == self.model_version:
+                return
+            self.model_version = model_version
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM predictions WHERE model_version != ?", (model_version,))
+                self._disk.commit()
+
+    def keys(self, X: np.ndarray, model_version: str = None) -> list:
+        """
+        Cache key of every row of a prepared feature matrix.
+
+        The key includes the version of the model that predicts the rows (the bound model by default),
+        so a model that is being replaced can finish its requests without storing its predictions
+        under the new model's keys.
+        """
+        rows = np.ascontiguousarray(X, dtype=np.float64)
+        version = (model_version or self.model_version or "").encode()
+        return [hashlib.blake2b(version + row.tobytes(), digest_size=16).hexdigest() for row in rows]
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def get_many(self, keys: list) -> list:
+        """Cached values of the keys (None for misses)."""
+        now = time.time()
+        values = [None] * len(keys)
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and not self._expired(entry[0], now):
+                    self._entries.move_to_end(key)
+                    values[i] = entry[1]
+
+            missing = [i for i, value in enumerate(values) if value is None]
+            if self._disk is not None and missing:
+                found = {}
+                # SQLite limits the number of query parameters
+                for start in range(0, len(missing), 500):
+                    part = [keys[i] for i in missing[start:start + 500]]
+                    rows = self._disk.execute(
+                        f"SELECT key, created, value FROM predictions WHERE model_version = ? AND key IN ({','.join('?' * len(part))})",
+                        [self.model_version] + part
+                    ).fetchall()
+                    found.update({
+                        key: (created, tuple(json.loads(value)))
+                        for key, created, value in rows if not self._expired(created, now)
+                    })
+                for i in missing:
+                    if keys[i] in found:
+                        values[i] = found[keys[i]][1]
+                        self._store(keys[i], found[keys[i]])
+                        self.disk_hits += 1
+
+            n_hits = sum(value is not None for value in values)
+            self.hits += n_hits
+            self.misses += len(keys) - n_hits
+        return values
+
+    def put_many(self, keys: list, values: list):
+        """Store values (tuples of floats) under their keys."""
+        now = time.time()
+        values = [tuple(float(v) for v in value) for value in values]
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._store(key, (now, value))
+            if self._disk is not None:
+                self._disk.executemany(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                    [(key, self.model_version, now, json.dumps(value)) for key, value in zip(keys, values)]
+                )
+                self._disk.commit()
+
+    def _store(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM predictions")
+                self._disk.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'model_version': self.model_version,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else None
+        }
@@ -0,0 +1,157 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+
+class Histogram:
+    """
+    Thread-safe histogram with fixed bucket upper bounds (cumulative counts like Prometheus).
+
+    Parameters:
+    - bounds (tuple): Increasing upper bounds of the buckets. Values above the last bound
+      fall into an implicit +Inf bucket.
+    """
+
+    def __init__(self, bounds: tuple):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket containing the q-quantile (None when empty or in the +Inf bucket)."""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if count == 0:
+            return None
+        rank = q * count
+        seen = 0
+        for bound, bucket_count in zip(self.bounds, counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> dict:
+        """Counts per bucket (not cumulative), total count, sum, mean, p50 and p99."""
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+        return {
+            'buckets': {str(bound): n for bound, n in zip(self.bounds + ("+Inf",), counts)},
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else None,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99)
+        }
+
+
+# Latency buckets in seconds, from sub-millisecond stages of one house to large batches
+LATENCY_SECONDS_BOUNDS: tuple = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class StageTimer:
+    """
+    Latency histogram per named stage (e.g. the steps of preparing and predicting a batch).
+
+    Usage:
+        with timer.time("clean_data"):
+            df = clean_data(df)
+
+    Only stages that complete are observed.
+    """
+
+    def __init__(self, bounds: tuple = LATENCY_SECONDS_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        with self._lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = Histogram(self.bounds)
+            return self.histograms[stage]
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        yield
+        self.histogram(stage).observe(time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        """Histogram snapshot (with p50 and p99) of every stage."""
+        with self._lock:
+            histograms = dict(self.histograms)
+        return {stage: histogram.snapshot() for stage, histogram in histograms.items()}
+
+
+class Counter:
+    """Thread-safe counter per combination of label values."""
+
+    def __init__(self):
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.values)
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def prometheus_samples(name: str, kind: str, help_text: str, samples: list) -> list:
+    """
+    Lines of one counter or gauge in the Prometheus text format.
+
+    Parameters:
+    - name (str): Metric name.
+    - kind (str): 'counter' or 'gauge'.
+    - help_text (str): Description.
+    - samples (list): (labels dict, value) pairs; None values are skipped.
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f"{name}{_format_labels(labels)} {float(value):g}")
+    return lines
+
+
+def prometheus_histograms(name: str, help_text: str, histograms: dict, label: str = None) -> list:
+    """
+    Lines of histograms in the Prometheus text format (cumulative buckets, _sum and _count).
+
+    Parameters:
+    - name (str): Metric name.
+    - help_text (str): Description.
+    - histograms (dict): Label value -> Histogram (one histogram under the key None when label is None).
+    - label (str): Name of the label that tells the histograms apart.
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for label_value, histogram in histograms.items():
+        labels = {label: label_value} if label else {}
+        snapshot = histogram.snapshot()
+        cumulative = 0
+        for bound, count in snapshot['buckets'].items():
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {snapshot['sum']:g}")
+        lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+    return lines
@@ -0,0 +1,232 @@
+import sys
+import os
+import json
+import time
+from contextlib import nullcontext
+
+_import_start = time.perf_counter()
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+import numpy as np
+import pandas as pd
+from src.data_preprocessing.preprocess import transform_data, load_input_defaults, fill_input_defaults
+from src.features.schema import build_feature_schema
+from src.serving.cache import PredictionCache
+from src.serving.metrics import StageTimer
+from src.models.forest_intervals import build_leaf_value_table, predict_with_intervals
+from src.models.compiled_forest import COMPILED_MODEL_FILE, load_compiled_model
+from src.monitoring.drift import load_drift_monitor
+from src.utils.versioning import file_version
+# Seconds spent importing the serving dependencies (part of the startup time)
+IMPORT_SECONDS = time.perf_counter() - _import_start
+
+
+# Largest what-if grid predicted in one call
+MAX_WHAT_IF_ROWS = 100_000
+
+
+def build_what_if_grid(base: dict, variations: dict) -> pd.DataFrame:
+    """
+    Build every combination of the varied fields on top of one base house.
+
+    Parameters:
+    - base (dict): Raw fields of the base house.
+    - variations (dict): Values of every varied field, e.g. {'GrLivArea': range(300, 6001, 50)}.
+      Usually one or two fields.
+
+    Returns:
+    pd.DataFrame: One raw house per combination; the varied fields change fastest from the last one.
+    """
+    combinations = pd.MultiIndex.from_product([list(values) for values in variations.values()], names=list(variations))
+    if len(combinations) > MAX_WHAT_IF_ROWS:
+        raise ValueError(f"What-if grid of {len(combinations)} houses is larger than {MAX_WHAT_IF_ROWS}")
+
+    grid = pd.DataFrame([base]).iloc[np.zeros(len(combinations), dtype=int)].reset_index(drop=True)
+    for name in combinations.names:
+        grid[name] = combinations.get_level_values(name).to_numpy()
+    return grid
+
+
+class HousePricePredictor:
+    """
+    Model and preprocessing artifacts loaded once, with vectorized preparation and prediction of batches.
+
+    Inputs are raw house records (dicts with the columns of datasets/ames-train.csv). Missing fields are
+    filled with the training defaults, so a record only needs the fields the caller knows.
+    """
+
+    def __init__(
+        self,
+        model_path: str = "model/",
+        reference_path: str = "datasets/ames-train.csv",
+        cache: PredictionCache = None,
+        fast_start: bool = False,
+        timer: StageTimer = None
+    ):
+        """
+        Parameters:
+        - model_path (str): Directory with house_price_model.pkl, model_metadata.json and input_defaults.json.
+        - reference_path (str): Raw training data the input defaults are computed from when
+          input_defaults.json does not exist.
+        - cache (PredictionCache): Cache of predictions of prepared inputs. None predicts every input.
+        - fast_start (bool): Load the precompiled forest (house_price_model.npz and feature_schema.json)
+          instead of unpickling the model, so that neither joblib nor scikit-learn is imported.
+          Falls back to the pickled model when the compiled one is missing or out of date.
+        - timer (StageTimer): Latency histograms of the preparation and prediction stages; a new one if not given.
+        """
+        self.startup_timings = {'imports': IMPORT_SECONDS}
+        start = time.perf_counter()
+
+        model_file = os.path.join(model_path, "house_price_model.pkl")
+        self.model = self._load_compiled(model_path, model_file) if fast_start else None
+        if self.model is not None:
+            self.model_version = self.model.model_version
+        else:
+            # Imported here, so that the fast start does not import scikit-learn
+            import joblib
+            self.model = joblib.load(model_file)
+            self.model_version = file_version(model_file)
+        self.startup_timings['model'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        # Models saved before the schema was stored get one derived from their feature names
+        self.schema = getattr(self.model, "feature_schema_", None) or build_feature_schema(self.model.feature_names_in_)
+        self.feature_names = self.schema['features']
+        # Node outputs of all trees, gathered by predict_with_intervals
+        self.leaf_values = build_leaf_value_table(self.model)
+        self.startup_timings['schema'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(os.path.join(model_path, "model_metadata.json")) as f:
+            self.metadata = json.load(f)
+
+        self.defaults = load_input_defaults(os.path.join(model_path, "input_defaults.json"), reference_path)
+        # Histograms of the predicted houses against the training data (None for models saved without a reference)
+        self.drift = load_drift_monitor(model_path)
+        self.startup_timings['defaults'] = time.perf_counter() - start
+
+        # One default house through the whole path, so that the first request does not pay for the warm-up
+        # (and is not counted in the latency histograms)
+        self.timer = None
+        start = time.perf_counter()
+        predict_with_intervals(self.model, self.prepare([{}]), leaf_values=self.leaf_values)
+        self.startup_timings['warmup'] = time.perf_counter() - start
+        self.timer = timer or StageTimer()
+
+        self.cache = None
+        if cache is not None:
+            self.attach_cache(cache)
+
+    def attach_cache(self, cache: PredictionCache):
+        """Use the cache for this model's predictions (entries of any other model are dropped)."""
+        cache.bind_model(self.model_version)
+        self.cache = cache
+
+    @staticmethod
+    def _load_compiled(model_path: str, model_file: str):
+        """The precompiled forest, or None when it is missing or was compiled from another pickled model."""
+        compiled_file = os.path.join(model_path, COMPILED_MODEL_FILE)
+        if not os.path.exists(compiled_file):
+            print(f"[!] {compiled_file} not found, loading the pickled model (run src/models/compiled_forest.py)")
+            return None
+        model = load_compiled_model(model_path)
+        if os.path.exists(model_file) and model.model_version != file_version(model_file):
+            print(f"[!] {compiled_file} is out of date, loading the pickled model (run src/models/compiled_forest.py)")
+            return None
+        return model
+
+    def prepare(self, records: list) -> pd.DataFrame:
+        """
+        Turn raw house records into the model's feature matrix.
+
+        Parameters:
+        - records (list): Dicts with raw house fields. Unknown fields are ignored.
+
+        Returns:
+        pd.DataFrame: One row per record with the model's features, in the model's column order.
+        """
+        return self.prepare_frame(self._records_frame(records))
+
+    @staticmethod
+    def _records_frame(records: list) -> pd.DataFrame:
+        if len(records) == 0:
+            raise ValueError("No records to predict")
+        return pd.DataFrame(records)
+
+    def prepare_frame(self, raw: pd.DataFrame) -> pd.DataFrame:
+        """
+        Turn a frame of raw houses (columns of datasets/ames-train.csv, any subset) into the model's feature matrix.
+        """
+        with self._stage("fill_defaults"):
+            df = fill_input_defaults(raw, self.defaults)
+
+        # Fields are already filled, so cleaning does not impute anything from the (small) batch itself
+        return transform_data(df, is_training=False, do_remove_outliers=False, verbose=False, schema=self.schema, timer=self.timer)
+
+    def _stage(self, name: str):
+        return self.timer.time(name) if self.timer is not None else nullcontext()
+
+    def observe(self, raw: pd.DataFrame, X: pd.DataFrame):
+        """Count predicted houses (raw fields as received and prepared features) in the drift histograms."""
+        if self.drift is not None:
+            with self._stage("drift"):
+                self.drift.update(raw, X)
+
+    def predict(self, records: list) -> list:
+        """
+        Predict sale prices of a batch of raw house records.
+
+        The interval (lower, upper) spans the 5th to 95th percentile of the individual trees' predictions.
+
+        Returns:
+        list: One dict per record with 'Id' (when given), 'SalePrice', 'lower' and 'upper'.
+        """
+        raw = self._records_frame(records)
+        X = self.prepare_frame(raw)
+        predictions, lowers, uppers = self.predict_prepared(X)
+        self.observe(raw, X)
+
+        results = []
+        for record, prediction, lower, upper in zip(records, predictions, lowers, uppers):
+            result = {'SalePrice': float(prediction)}
+            if record.get('Id') is not None:
+                result = {'Id': record['Id'], **result}
+            result['lower'] = float(lower)
+            result['upper'] = float(upper)
+            results.append(result)
+        return results
+
+    def predict_prepared(self, X: pd.DataFrame) -> tuple:
+        """
+        Predict prepared inputs with intervals, taking the ones predicted before from the cache.
+
+        Returns:
+        tuple: (prediction, lower, upper) arrays.
+        """
+        if self.cache is None:
+            with self._stage("predict"):
+                return predict_with_intervals(self.model, X, leaf_values=self.leaf_values)
+
+        with self._stage("cache_lookup"):
+            keys = self.cache.keys(X.to_numpy(), self.model_version)
+            cached = self.cache.get_many(keys)
+        missing = [i for i, value in enumerate(cached) if value is None]
+
+        outputs = np.array([value if value is not None else (np.nan, np.nan, np.nan) for value in cached])
+        if missing:
+            with self._stage("predict"):
+                outputs[missing] = np.column_stack(predict_with_intervals(self.model, X.iloc[missing], leaf_values=self.leaf_values))
+            self.cache.put_many([keys[i] for i in missing], outputs[missing])
+        return outputs[:, 0], outputs[:, 1], outputs[:, 2]
+
+    def what_if(self, base: dict, variations: dict) -> pd.DataFrame:
+        """
+        Predict the price of a base house for every combination of the varied fields in one vectorized call.
+
+        Returns:
+        pd.DataFrame: The varied fields, the predicted SalePrice and its interval, one row per combination.
+        """
+        grid = build_what_if_grid(base, variations)
+        curve = grid[list(variations)].copy()
+        curve['SalePrice'], curve['lower'], curve['upper'] = self.predict_prepared(self.prepare_frame(grid))
+        return curve
@@ -0,0 +1,123 @@
+import os
+import time
+import threading
+
+import numpy as np
+
+
+# Files of a model directory; a change of any of them means a new model is being saved
+MODEL_FILES: tuple = (
+    "house_price_model.pkl",
+    "house_price_model.npz",
+    "feature_schema.json",
+    "model_metadata.json",
+    "input_defaults.json",
+    "drift_reference.json"
+)
+
+# Houses predicted by every newly loaded model before it is swapped in (missing fields take the defaults)
+SMOKE_RECORDS: list = [
+    {},
+    {'GrLivArea': 800, 'OverallQual': 4, 'GarageCars': 0, 'TotalBsmtSF': 0},
+    {'GrLivArea': 2500, 'OverallQual': 9, 'GarageCars': 3, 'Neighborhood': 'NridgHt'}
+]
+
+
+def model_signature(model_path: str = "model/") -> tuple:
+    """Modification time and size of every model file, cheap enough to poll."""
+    signature = []
+    for name in MODEL_FILES:
+        try:
+            stat = os.stat(os.path.join(model_path, name))
+        except FileNotFoundError:
+            continue
+        signature.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def check_smoke_predictions(predictions, n_records: int = len(SMOKE_RECORDS)):
+    """Raise ValueError unless there is one finite, positive price per smoke record."""
+    predictions = np.asarray(predictions, dtype=float)
+    if predictions.shape != (n_records,):
+        raise ValueError(f"Smoke test returned {predictions.shape} predictions for {n_records} houses")
+    if not (np.isfinite(predictions).all() and (predictions > 0).all()):
+        raise ValueError(f"Smoke test returned invalid prices: {predictions.tolist()}")
+
+
+def smoke_test(predictor):
+    """Predict SMOKE_RECORDS with a freshly loaded HousePricePredictor; raise ValueError if the output is not sane."""
+    results = predictor.predict(SMOKE_RECORDS)
+    check_smoke_predictions([result['SalePrice'] for result in results])
+    if any(not result['lower'] <= result['upper'] for result in results):
+        raise ValueError("Smoke test returned an interval with lower > upper")
+
+
+class ModelWatcher:
+    """
+    Poll a model directory and hot-swap newly saved models.
+
+    When the model files change, the watcher waits until they stop changing (training writes several
+    files), then loads and validates the new model in its own thread and hands it to on_swap. The
+    swap is a single reference assignment in on_swap, so requests that already hold the old model finish
+    on it. A model that fails to load or validate is reported and the old one stays in use.
+
+    Parameters:
+    - model_path (str): Directory with the model files.
+    - load (callable): Loads and validates the new model (raises on failure); returns what on_swap receives.
+    - on_swap (callable): Puts the loaded model in use.
+    - interval_seconds (float): Polling interval.
+    - signature (tuple): model_signature of the model in use; taken now if not given. Take it before loading
+      the initial model, so that a model saved in the meantime is not missed.
+    """
+
+    def __init__(self, model_path: str, load, on_swap, interval_seconds: float = 2.0, signature: tuple = None):
+        self.model_path = model_path
+        self.load = load
+        self.on_swap = on_swap
+        self.interval_seconds = interval_seconds
+        self.signature = model_signature(model_path) if signature is None else signature
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error = None
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+
+    def start(self) -> "ModelWatcher":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self) -> bool:
+        """Reload if the model files changed and are complete. Returns whether a new model was swapped in."""
+        signature = model_signature(self.model_path)
+        if signature == self.signature:
+            return False
+        # Still being written: wait one more interval for the files to settle
+        if self._stop.wait(self.interval_seconds) or model_signature(self.model_path) != signature:
+            return False
+
+        # Remembered even if loading fails, so a broken model is not retried until the files change again
+        self.signature = signature
+        start = time.perf_counter()
+        try:
+            model = self.load()
+        except Exception as e:
+            self.failed_reloads += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"[!] New model in {self.model_path} rejected, keeping the current one ({self.last_error})")
+            return False
+
+        self.on_swap(model)
+        self.reloads += 1
+        print(f"[OK] New model from {self.model_path} loaded and swapped in ({time.perf_counter() - start:.2f}s)")
+        return True
+
+    def stats(self) -> dict:
+        return {'reloads': self.reloads, 'failed_reloads': self.failed_reloads, 'last_error': self.last_error}
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.check()
@@ -0,0 +1,345 @@
+import sys
+import os
+import json
+import argparse
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# This makes sure we can import modules from the src folder (we are nested 2 levels inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from src.serving.predictor import HousePricePredictor
+from src.serving.batching import MicroBatcher
+from src.serving.cache import PredictionCache
+from src.serving.reload import ModelWatcher, model_signature, smoke_test
+from src.serving.metrics import StageTimer, Counter, prometheus_samples, prometheus_histograms
+
+
+# Largest accepted request body (a batch of ~10 000 houses)
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+# Endpoints measured separately in /metrics (anything else is counted as "other")
+ENDPOINTS: tuple = ("/health", "/stats", "/metrics", "/drift", "/predict", "/predict/batch", "/what-if")
+
+
+class PredictionServer(ThreadingHTTPServer):
+    # Many clients connect at once; the socketserver default backlog of 5 would reset their connections
+    request_queue_size = 1024
+    daemon_threads = True
+
+    # Set by watch_model when new models are hot-swapped in
+    watcher: ModelWatcher = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Whole-request latency per endpoint, responses per endpoint and status, predicted houses (for /metrics)
+        self.request_timer = StageTimer()
+        self.responses = Counter()
+        self.predicted_houses = Counter()
+
+    def swap_predictor(self, predictor: HousePricePredictor):
+        """Serve new requests with another predictor; requests that already started finish on the old one."""
+        handler = self.RequestHandlerClass
+        if predictor.cache is None and handler.predictor.cache is not None:
+            predictor.attach_cache(handler.predictor.cache)
+        # The stage histograms continue across models
+        predictor.timer = handler.predictor.timer
+        handler.predictor = predictor
+        if handler.batcher is not None:
+            handler.batcher.predictor = predictor
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """
+    JSON prediction endpoints:
+      GET  /health         - model version, training date and startup timings
+      GET  /stats          - batch size and queue wait histograms (with micro-batching), cache hit rate, model reloads,
+                             latency of every preparation and prediction stage (p50, p99)
+      GET  /metrics        - the same in the Prometheus text format
+      GET  /drift          - PSI and KS of every raw field and model feature of the predicted houses against training
+      POST /predict        - one house: {"GrLivArea": 1500, ...}
+      POST /predict/batch  - many houses: {"records": [{...}, {...}]} or a plain list
+      POST /what-if        - price curve: {"house": {...}, "vary": {"GrLivArea": [1000, 1500, 2000]}}
+    """
+
+    # Set by create_server
+    predictor: HousePricePredictor = None
+    batcher: MicroBatcher = None
+
+    def _endpoint(self) -> str:
+        return self.path if self.path in ENDPOINTS else "other"
+
+    def _send(self, status: int, payload: bytes, content_type: str):
+        self.server.responses.inc((self._endpoint(), str(status)))
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_json(self, status: int, body: dict):
+        self._send(status, json.dumps(body).encode(), "application/json")
+
+    def _send_internal_error(self, error: Exception):
+        """Answer an unexpected failure with a 500 instead of dropping the connection."""
+        print(f"[!] {self.command} {self.path} failed: {type(error).__name__}: {error}")
+        traceback.print_exc()
+        self._send_json(500, {'error': f"Internal error: {type(error).__name__}"})
+
+    def _read_json(self):
+        length = self.headers.get("Content-Length", "0")
+        if not length.isdigit():
+            raise ValueError(f"Invalid Content-Length {length!r}")
+        length = int(length)
+        if length > MAX_BODY_BYTES:
+            raise ValueError(f"Request body larger than {MAX_BODY_BYTES} bytes")
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def do_GET(self):
+        with self.server.request_timer.time(self._endpoint()):
+            self._get()
+
+    def do_POST(self):
+        with self.server.request_timer.time(self._endpoint()):
+            self._post()
+
+    def _get(self):
+        # One predictor for the whole request, even if a new model is swapped in meanwhile
+        predictor = self.predictor
+        if self.path == "/stats":
+            self._send_json(200, {
+                'batching': self.batcher.stats() if self.batcher else None,
+                'cache': predictor.cache.stats() if predictor.cache else None,
+                'reload': self.server.watcher.stats() if self.server.watcher else None,
+                'stages': predictor.timer.snapshot()
+            })
+            return
+        if self.path == "/metrics":
+            self._send(200, render_metrics(self.server, predictor, self.batcher).encode(), "text/plain; version=0.0.4")
+            return
+        if self.path == "/drift":
+            if predictor.drift is None:
+                self._send_json(404, {'error': "The model has no drift reference (run src/monitoring/drift.py --build-reference)"})
+                return
+            self._send_json(200, {'model_version': predictor.model_version, **predictor.drift.report()})
+            return
+        if self.path != "/health":
+            self._send_json(404, {'error': f"Unknown endpoint {self.path}"})
+            return
+        self._send_json(200, {
+            'status': 'ok',
+            'model_version': predictor.model_version,
+            'training_date': predictor.metadata.get('training_date'),
+            'startup_seconds': predictor.startup_timings
+        })
+
+    def _post(self):
+        if self.path == "/what-if":
+            self._what_if()
+            return
+        if self.path not in ("/predict", "/predict/batch"):
+            self._send_json(404, {'error': f"Unknown endpoint {self.path}"})
+            return
+
+        predictor = self.predictor
+        try:
+            body = self._read_json()
+            if self.path == "/predict":
+                if not isinstance(body, dict):
+                    raise ValueError("Expected a JSON object with the fields of one house")
+                records = [body]
+            else:
+                records = body.get('records') if isinstance(body, dict) else body
+                if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+                    raise ValueError("Expected a list of JSON objects (or {\"records\": [...]})")
+            if self.batcher is not None:
+                # The batch may be predicted by a model swapped in after this request arrived
+                predictions, model_version = self.batcher.predict(records)
+            else:
+                predictions, model_version = predictor.predict(records), predictor.model_version
+        except ValueError as e:
+            # Includes malformed JSON (json.JSONDecodeError is a ValueError)
+            self._send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self._send_internal_error(e)
+            return
+
+        self.server.predicted_houses.inc((self.path,), len(predictions))
+        response = {'model_version': model_version}
+        if self.path == "/predict":
+            response.update(predictions[0])
+        else:
+            response['predictions'] = predictions
+        self._send_json(200, response)
+
+    def _what_if(self):
+        predictor = self.predictor
+        try:
+            body = self._read_json()
+            if not isinstance(body, dict) or not isinstance(body.get('vary'), dict) or not body['vary']:
+                raise ValueError("Expected {\"house\": {...}, \"vary\": {\"<field>\": [values]}}")
+            for field, values in body['vary'].items():
+                # A bare number would fail in the grid and a string would be varied letter by letter
+                if not isinstance(values, list) or not values:
+                    raise ValueError(f"Expected a non-empty list of values for {field!r} in \"vary\"")
+            curve = predictor.what_if(body.get('house') or {}, body['vary'])
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self._send_internal_error(e)
+            return
+        self.server.predicted_houses.inc((self.path,), len(curve))
+        self._send_json(200, {
+            'model_version': predictor.model_version,
+            'curve': json.loads(curve.to_json(orient="records"))
+        })
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def render_metrics(server: PredictionServer, predictor: HousePricePredictor, batcher: MicroBatcher = None) -> str:
+    """Counters, gauges and latency histograms of the serving process in the Prometheus text format."""
+    lines = prometheus_samples("house_price_model_info", "gauge", "Version of the served model",
+                               [({'model_version': predictor.model_version}, 1)])
+    if server.watcher is not None:
+        lines += prometheus_samples("house_price_model_reloads_total", "counter", "Models hot-swapped in",
+                                    [({}, server.watcher.reloads)])
+        lines += prometheus_samples("house_price_model_rejected_reloads_total", "counter",
+                                    "New models rejected by loading or the smoke test", [({}, server.watcher.failed_reloads)])
+
+    lines += prometheus_histograms("house_price_stage_seconds", "Latency of the preparation and prediction stages",
+                                   dict(predictor.timer.histograms), label="stage")
+    lines += prometheus_histograms("house_price_request_seconds", "Latency of whole HTTP requests",
+                                   dict(server.request_timer.histograms), label="endpoint")
+    lines += prometheus_samples("house_price_responses_total", "counter", "HTTP responses", [
+        ({'endpoint': endpoint, 'status': status}, count)
+        for (endpoint, status), count in server.responses.snapshot().items()
+    ])
+    lines += prometheus_samples("house_price_predicted_houses_total", "counter", "Houses predicted", [
+        ({'endpoint': endpoint}, count) for (endpoint,), count in server.predicted_houses.snapshot().items()
+    ])
+
+    if predictor.drift is not None:
+        report = predictor.drift.report()
+        lines += prometheus_samples("house_price_drift_features", "gauge", "Features per drift status (PSI against training)", [
+            ({'group': group, 'status': status}, count)
+            for group, group_report in report.items() for status, count in group_report['status_counts'].items()
+        ])
+        lines += prometheus_samples("house_price_drift_max_psi", "gauge", "Largest PSI of any feature against training", [
+            ({'group': group}, max([feature['psi'] for feature in group_report['features'] if feature['psi'] is not None], default=0))
+            for group, group_report in report.items()
+        ])
+
+    if predictor.cache is not None:
+        cache = predictor.cache.stats()
+        lines += prometheus_samples("house_price_cache_hits_total", "counter", "Predictions served from the cache",
+                                    [({}, cache['hits'])])
+        lines += prometheus_samples("house_price_cache_disk_hits_total", "counter", "Cache hits found in the SQLite file",
+                                    [({}, cache['disk_hits'])])
+        lines += prometheus_samples("house_price_cache_misses_total", "counter", "Predictions not found in the cache",
+                                    [({}, cache['misses'])])
+        lines += prometheus_samples("house_price_cache_hit_ratio", "gauge", "Cache hits per lookup",
+                                    [({}, cache['hit_rate'])])
+        lines += prometheus_samples("house_price_cache_entries", "gauge", "Predictions held in memory",
+                                    [({}, cache['entries'])])
+
+    if batcher is not None:
+        lines += prometheus_histograms("house_price_batch_size", "Houses per micro-batch", {None: batcher.batch_size})
+        lines += prometheus_histograms("house_price_batch_queue_wait_milliseconds", "Wait of a request for its micro-batch",
+                                       {None: batcher.queue_wait_ms})
+    return "\n".join(lines) + "\n"
+
+
+def create_server(
+    predictor: HousePricePredictor,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    verbose: bool = False,
+    batch_wait_ms: float = 0.0,
+    batch_max_rows: int = 256
+) -> PredictionServer:
+    """
+    Create (but do not start) the prediction HTTP server.
+
+    Parameters:
+    - predictor (HousePricePredictor): Loaded predictor shared by all request threads.
+    - host (str): Interface to listen on.
+    - port (int): Port to listen on (0 picks a free port).
+    - verbose (bool): Whether to log every request.
+    - batch_wait_ms (float): Micro-batching window. Concurrent requests arriving within it are predicted
+      together. 0 disables micro-batching (every request is predicted on its own).
+    - batch_max_rows (int): Batch size that is predicted without waiting for the window to end.
+
+    Returns:
+    PredictionServer: Call serve_forever() to start handling requests.
+    """
+    batcher = MicroBatcher(predictor, batch_wait_ms, batch_max_rows) if batch_wait_ms > 0 else None
+    handler = type("BoundPredictionHandler", (PredictionHandler,), {'predictor': predictor, 'batcher': batcher})
+    server = PredictionServer((host, port), handler)
+    server.verbose = verbose
+    return server
+
+
+def watch_model(
+    server: PredictionServer,
+    model_path: str = "model/",
+    fast_start: bool = False,
+    interval_seconds: float = 2.0,
+    signature: tuple = None
+) -> ModelWatcher:
+    """
+    Hot-swap newly trained models into a running server.
+
+    A new model is loaded in the background, must pass the smoke test and then replaces the served one;
+    its predictions use the same cache (entries of the old model are dropped). signature is the
+    model_signature taken before the served model was loaded.
+    """
+    def load() -> HousePricePredictor:
+        predictor = HousePricePredictor(model_path=model_path, fast_start=fast_start)
+        smoke_test(predictor)
+        # The smoke test houses are not traffic
+        if predictor.drift is not None:
+            predictor.drift.reset()
+        return predictor
+
+    server.watcher = ModelWatcher(model_path, load, server.swap_predictor, interval_seconds, signature).start()
+    return server.watcher
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve house price predictions over HTTP (JSON).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model-path", default="model/")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    parser.add_argument("--batch-wait-ms", type=float, default=0.0,
+                        help="Micro-batching window in milliseconds (0 disables micro-batching)")
+    parser.add_argument("--batch-max-rows", type=int, default=256, help="Largest micro-batch")
+    parser.add_argument("--cache-size", type=int, default=100_000, help="Cached predictions (0 disables the cache)")
+    parser.add_argument("--cache-ttl", type=float, default=None, help="Seconds a cached prediction is used")
+    parser.add_argument("--cache-file", default=None, help="SQLite file persisting the cache between restarts")
+    parser.add_argument("--fast-start", action="store_true",
+                        help="Load the precompiled forest (house_price_model.npz) without scikit-learn")
+    parser.add_argument("--reload-interval", type=float, default=2.0,
+                        help="Seconds between checks for a newly trained model (0 disables hot reload)")
+    args = parser.parse_args()
+
+    cache = PredictionCache(args.cache_size, args.cache_ttl, args.cache_file) if args.cache_size > 0 else None
+    signature = model_signature(args.model_path)
+    predictor = HousePricePredictor(model_path=args.model_path, cache=cache, fast_start=args.fast_start)
+    timings = predictor.startup_timings
+    print("Startup: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+          + f" (total {sum(timings.values()):.2f}s)")
+    server = create_server(predictor, args.host, args.port, args.verbose, args.batch_wait_ms, args.batch_max_rows)
+    if args.reload_interval > 0:
+        watch_model(server, args.model_path, args.fast_start, args.reload_interval, signature)
+    print(f"[OK] Model {predictor.model_version} loaded, serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
@@ -12,7 +12,8 @@ def get_logger(name, log_file=None, level=logging.INFO):
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
 
-        fh = logging.FileHandler(log_file)
+        # The file is opened on the first record, so importing a module that only sets up its logger stays cheap
+        fh = logging.FileHandler(log_file, delay=True)
         fh.setLevel(level)
         formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
         fh.setFormatter(formatter)
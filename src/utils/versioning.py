@@ -0,0 +1,11 @@
+# src/utils/versioning.py
+import hashlib
+
+
+def file_version(path: str) -> str:
+    """Short content hash of a file, used as the version of a model artifact."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
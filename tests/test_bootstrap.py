@@ -0,0 +1,85 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
+# This makes sure we can import modules from the src folder (the tests are nested 1 level inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from src.evaluation import bootstrap
+from src.evaluation.streaming_metrics import PRICE_BINS, PRICE_LABELS
+
+N_RESAMPLES = 50
+SEED = 7
+
+
+@pytest.fixture
+def prices(monkeypatch):
+    # Chunks of 7 resamples, so the chunking is exercised too
+    monkeypatch.setattr(bootstrap, "MAX_CHUNK_ELEMENTS", 7 * 120)
+    rng = np.random.default_rng(0)
+    actual = rng.lognormal(12, 0.4, 120)
+    return actual, actual * rng.normal(1, 0.1, 120), actual * rng.normal(1, 0.08, 120)
+
+
+def resample_indices(n: int) -> list:
+    """The houses of every resample, drawn like bootstrap.py draws them."""
+    rng = np.random.default_rng(SEED)
+    rows = []
+    for start in range(0, N_RESAMPLES, 7):
+        rows.extend(rng.integers(0, n, size=(min(7, N_RESAMPLES - start), n)))
+    return rows
+
+
+def loop_metrics(actual: np.ndarray, predicted: np.ndarray) -> dict:
+    """Metrics of one resample the plain way."""
+    ape = pd.Series(np.abs((predicted - actual) / actual) * 100)
+    ranges = pd.cut(actual, bins=PRICE_BINS, labels=PRICE_LABELS)
+    return {
+        'RMSE': np.sqrt(mean_squared_error(actual, predicted)),
+        'MAE': mean_absolute_error(actual, predicted),
+        'R2': r2_score(actual, predicted),
+        'MAPE': ape.mean(),
+        'MAPE_by_price_range': ape.groupby(ranges, observed=False).mean().reindex(PRICE_LABELS).to_numpy()
+    }
+
+
+def loop_distribution(actual: np.ndarray, predicted: np.ndarray) -> dict:
+    resamples = [loop_metrics(actual[rows], predicted[rows]) for rows in resample_indices(len(actual))]
+    return {name: np.array([metrics[name] for metrics in resamples]) for name in resamples[0]}
+
+
+def test_vectorized_intervals_match_a_loop_over_resamples(prices):
+    actual, predicted, _ = prices
+    intervals = bootstrap.bootstrap_metrics(actual, predicted, N_RESAMPLES, seed=SEED)
+
+    estimates = loop_metrics(actual, predicted)
+    distribution = loop_distribution(actual, predicted)
+    for name in ('RMSE', 'MAE', 'R2', 'MAPE'):
+        lower, upper = np.quantile(distribution[name], [0.025, 0.975])
+        assert intervals[name] == pytest.approx({'estimate': estimates[name], 'lower': lower, 'upper': upper}, rel=1e-9)
+
+    for i, label in enumerate(PRICE_LABELS):
+        if np.isnan(estimates['MAPE_by_price_range'][i]):
+            assert label not in intervals['MAPE_by_price_range']
+            continue
+        lower, upper = np.nanquantile(distribution['MAPE_by_price_range'][:, i], [0.025, 0.975])
+        assert intervals['MAPE_by_price_range'][label] == pytest.approx(
+            {'estimate': estimates['MAPE_by_price_range'][i], 'lower': lower, 'upper': upper}, rel=1e-9)
+
+
+def test_paired_comparison_matches_a_loop_over_resamples(prices):
+    actual, predicted_old, predicted_new = prices
+    comparison = bootstrap.paired_bootstrap(actual, predicted_old, predicted_new, N_RESAMPLES, seed=SEED)
+
+    old = loop_distribution(actual, predicted_old)
+    new = loop_distribution(actual, predicted_new)
+    for name in ('RMSE', 'MAE', 'R2', 'MAPE'):
+        differences = new[name] - old[name]
+        sign = 1 if name == 'R2' else -1
+        lower, upper = np.quantile(differences, [0.025, 0.975])
+        assert comparison[name]['lower'] == pytest.approx(lower, rel=1e-9)
+        assert comparison[name]['upper'] == pytest.approx(upper, rel=1e-9)
+        assert comparison[name]['p_not_better'] == np.mean(sign * differences <= 0)
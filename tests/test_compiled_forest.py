@@ -0,0 +1,51 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+# This makes sure we can import modules from the src folder (the tests are nested 1 level inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from src.features.schema import build_feature_schema
+from src.models.compiled_forest import CompiledForest, compile_forest, save_compiled_model, load_compiled_model
+from src.models.forest_intervals import predict_with_intervals
+
+
+@pytest.fixture(scope="module")
+def forest_and_data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        'GrLivArea': rng.lognormal(7.3, 0.3, 400).round(),
+        'OverallQual': rng.integers(1, 11, 400).astype(float),
+        'LotAreaLog': rng.normal(9.0, 0.5, 400),
+        'Neighborhood_NAmes': rng.integers(0, 2, 400).astype(bool)
+    })
+    y = 50 * X['GrLivArea'] + 10_000 * X['OverallQual'] + rng.normal(0, 5_000, 400)
+    forest = RandomForestRegressor(n_estimators=15, max_depth=8, random_state=0).fit(X, y)
+    forest.feature_schema_ = build_feature_schema(forest.feature_names_in_, X)
+    # Some houses exactly at the split threshold of the first root
+    X_new = X.sample(100, random_state=1).reset_index(drop=True)
+    root = forest.estimators_[0].tree_
+    X_new.loc[:9, X.columns[root.feature[0]]] = root.threshold[0]
+    return forest, X_new
+
+
+def test_compiled_predictions_match_the_forest(forest_and_data):
+    forest, X = forest_and_data
+    compiled = CompiledForest(compile_forest(forest, "v1"))
+
+    np.testing.assert_array_equal(compiled.apply(X), forest.apply(X))
+    np.testing.assert_allclose(compiled.predict(X), forest.predict(X), rtol=1e-12)
+
+
+def test_compiled_intervals_match_the_forest(forest_and_data, tmp_path):
+    forest, X = forest_and_data
+    save_compiled_model(forest, str(tmp_path), "v1")
+    compiled = load_compiled_model(str(tmp_path))
+
+    assert compiled.model_version == "v1"
+    assert compiled.feature_schema_ == forest.feature_schema_
+    for expected, actual in zip(predict_with_intervals(forest, X, chunk_rows=30), predict_with_intervals(compiled, X, chunk_rows=30)):
+        np.testing.assert_allclose(actual, expected, rtol=1e-12)
@@ -0,0 +1,53 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+# This makes sure we can import modules from the src folder (the tests are nested 1 level inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from src.monitoring.drift import DriftMonitor, build_drift_reference
+
+
+def houses(n: int, first_id: int, seed: int) -> tuple:
+    """Raw houses and their encoded features, from the same distribution for every seed (Ids continue)."""
+    rng = np.random.default_rng(seed)
+    raw = pd.DataFrame({
+        'Id': np.arange(first_id, first_id + n),
+        'GrLivArea': rng.lognormal(7.3, 0.3, n).round(),
+        'OverallQual': rng.integers(1, 11, n),
+        'Neighborhood': rng.choice(["NAmes", "CollgCr", "OldTown", "Edwards"], n, p=[0.4, 0.3, 0.2, 0.1]),
+        'SalePrice': rng.lognormal(12, 0.4, n)
+    })
+    features = pd.get_dummies(raw.drop(columns=["SalePrice"]), columns=["Neighborhood"], dtype=int)
+    return raw, features
+
+
+def test_in_distribution_traffic_reports_no_significant_drift():
+    train_raw, train_features = houses(5000, first_id=1, seed=0)
+    monitor = DriftMonitor(build_drift_reference(train_raw, train_features))
+
+    # New houses from the same distribution, with new Ids
+    raw, features = houses(5000, first_id=100_000, seed=1)
+    monitor.update(raw, features)
+    report = monitor.report()
+
+    for group in ("raw", "features"):
+        assert "Id" not in [feature['feature'] for feature in report[group]['features']]
+        assert report[group]['status_counts']['significant'] == 0
+        assert report[group]['status_counts']['moderate'] == 0
+
+
+def test_shifted_feature_is_reported():
+    train_raw, train_features = houses(5000, first_id=1, seed=0)
+    monitor = DriftMonitor(build_drift_reference(train_raw, train_features))
+
+    raw, features = houses(5000, first_id=100_000, seed=1)
+    raw['GrLivArea'] *= 1.5
+    features['GrLivArea'] *= 1.5
+    monitor.update(raw, features)
+
+    for group_report in monitor.report().values():
+        most_drifted = group_report['features'][0]
+        assert most_drifted['feature'] == "GrLivArea"
+        assert most_drifted['status'] == "significant"
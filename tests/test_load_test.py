@@ -0,0 +1,37 @@
+import sys
+import os
+import json
+
+import pytest
+
+# This makes sure we can import modules from the src folder (the tests are nested 1 level inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from src.benchmarks.load_test import compare_reports
+
+CONFIG = {"target": "inprocess", "service_args": None, "source": "ames", "records": 1000, "concurrency": 8,
+          "rate": None, "duration_s": 10.0, "batch_size": 1, "fast_start": False}
+
+
+def write_report(path, requests_per_second: float, p99: float, **config) -> str:
+    result = {'requests_per_second': requests_per_second, 'latency_ms': {'p50': p99 / 2, 'p99': p99}, 'error_rate': 0.0}
+    with open(path, 'w') as f:
+        json.dump({'config': {**CONFIG, **config}, 'result': result}, f)
+    return str(path)
+
+
+def test_regression_of_the_same_configuration(tmp_path):
+    base = write_report(tmp_path / "base.json", 1000, 10)
+    new = write_report(tmp_path / "new.json", 800, 10, duration_s=30.0)
+
+    comparison = compare_reports(base, new)
+
+    assert comparison['throughput_ratio'] == pytest.approx(0.8)
+    assert comparison['regression']
+
+
+def test_different_configurations_are_not_compared(tmp_path):
+    base = write_report(tmp_path / "base.json", 1000, 10)
+    new = write_report(tmp_path / "new.json", 100, 50, target="http", rate=200.0)
+
+    with pytest.raises(ValueError, match="target.*rate"):
+        compare_reports(base, new)
@@ -0,0 +1,43 @@
+import sys
+import os
+import time
+
+import joblib
+import numpy as np
+
+# This makes sure we can import modules from the src folder (the tests are nested 1 level inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from src.models.parallel_forest import (
+    submit_forest_tasks, claim_task, requeue_stale_claims, run_forest_worker, collect_forest_slices
+)
+
+
+def submit(queue_dir, n_slices: int = 3) -> list:
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 4))
+    joblib.dump((X, X @ [1.0, 2.0, 0.0, -1.0]), os.path.join(queue_dir, "data.pkl"))
+    return submit_forest_tasks(str(queue_dir), {'n_estimators': 6, 'max_depth': 3}, n_slices)
+
+
+def test_claim_of_dead_worker_is_requeued_and_trained(tmp_path):
+    task_ids = submit(tmp_path)
+
+    # A worker claims a slice and dies: its lease is no longer renewed
+    dead = claim_task(str(tmp_path))
+    claimed_path = os.path.join(tmp_path, "claimed", f"{dead['task_id']}.json")
+    os.utime(claimed_path, (time.time() - 120, time.time() - 120))
+
+    assert requeue_stale_claims(str(tmp_path), lease_seconds=600) == []
+    assert run_forest_worker(str(tmp_path), lease_seconds=60) == len(task_ids)
+
+    forests = collect_forest_slices(str(tmp_path), timeout=0)
+    assert sum(forest.n_estimators for forest in forests) == 6
+    assert os.listdir(os.path.join(tmp_path, "claimed")) == []
+
+
+def test_live_claim_is_kept(tmp_path):
+    submit(tmp_path)
+    task = claim_task(str(tmp_path))
+
+    assert requeue_stale_claims(str(tmp_path), lease_seconds=60) == []
+    assert os.path.exists(os.path.join(tmp_path, "claimed", f"{task['task_id']}.json"))
@@ -0,0 +1,41 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+# This makes sure we can import modules from the src folder (the tests are nested 1 level inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from src.features.schema import build_feature_schema, encode_with_schema
+
+
+def featured_houses(n: int, seed: int, neighborhoods: list) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'GrLivArea': rng.lognormal(7.3, 0.3, n).round(),
+        'OverallQual': rng.integers(1, 11, n),
+        'Neighborhood': rng.choice(neighborhoods, n),
+        'MSZoning': rng.choice(["RL", "RM", None], n)
+    })
+
+
+def test_encoding_matches_get_dummies_and_reindex():
+    training = pd.get_dummies(featured_houses(200, 0, ["NAmes", "CollgCr", "OldTown"]))
+    schema = build_feature_schema(training.columns, training)
+
+    # New houses with a category unseen in training, missing values and a column the model lacks
+    houses = featured_houses(50, 1, ["NAmes", "OldTown", "Blueste"])
+    houses['Unused'] = 1.0
+
+    expected = pd.get_dummies(houses).reindex(columns=training.columns, fill_value=0).astype(float)
+    pd.testing.assert_frame_equal(encode_with_schema(houses, schema), expected)
+
+
+def test_missing_feature_is_zero():
+    training = pd.get_dummies(featured_houses(200, 0, ["NAmes", "CollgCr"]))
+    schema = build_feature_schema(training.columns, training)
+
+    encoded = encode_with_schema(featured_houses(5, 1, ["NAmes"]).drop(columns=["GrLivArea"]), schema)
+
+    assert list(encoded.columns) == schema['features']
+    assert (encoded['GrLivArea'] == 0).all()
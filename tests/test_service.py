@@ -0,0 +1,110 @@
+import sys
+import os
+import json
+import time
+import threading
+import http.client
+
+import pytest
+
+# This makes sure we can import modules from the src folder (the tests are nested 1 level inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+from src.serving.service import create_server
+
+
+class RecordingPredictor:
+    """Stands in for HousePricePredictor; invalid requests must not reach it and what_if fails like a bug would."""
+    model_version = "test"
+    cache = None
+    drift = None
+
+    def __init__(self):
+        self.calls = []
+
+    def what_if(self, base: dict, variations: dict):
+        self.calls.append((base, variations))
+        raise AssertionError("what_if reached")
+
+
+class VersionedPredictor(RecordingPredictor):
+    """Predicts the same price for every house with the given model version."""
+    timer = None
+
+    def __init__(self, model_version: str):
+        super().__init__()
+        self.model_version = model_version
+
+    def predict(self, records: list) -> list:
+        return [{'predicted_price': 100_000.0} for _ in records]
+
+
+@pytest.fixture
+def server():
+    server = create_server(RecordingPredictor(), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, path: str, body: dict) -> tuple:
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+    try:
+        connection.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("vary", [{"GrLivArea": 1500}, {"Neighborhood": "NAmes"}, {"GrLivArea": []}])
+def test_what_if_rejects_values_that_are_not_a_list(server, vary):
+    status, body = post(server, "/what-if", {"house": {}, "vary": vary})
+
+    assert status == 400
+    assert "non-empty list" in body['error']
+    assert server.RequestHandlerClass.predictor.calls == []
+    assert server.responses.snapshot()[("/what-if", "400")] == 1
+
+
+def test_unexpected_error_is_answered_with_500(server):
+    status, body = post(server, "/what-if", {"house": {}, "vary": {"GrLivArea": [1000, 1500]}})
+
+    assert status == 500
+    assert body['error'] == "Internal error: AssertionError"
+    assert server.responses.snapshot()[("/what-if", "500")] == 1
+
+
+@pytest.mark.parametrize("length", ["-1", "abc"])
+def test_invalid_content_length_is_rejected(server, length):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+    try:
+        connection.putrequest("POST", "/predict")
+        connection.putheader("Content-Length", length)
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == 400
+        assert "Content-Length" in json.loads(response.read())['error']
+    finally:
+        connection.close()
+
+
+def test_batched_prediction_reports_the_model_that_predicted_it():
+    server = create_server(VersionedPredictor("old"), port=0, batch_wait_ms=300)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        responses = []
+        request = threading.Thread(target=lambda: responses.append(post(server, "/predict", {"GrLivArea": 1500})))
+        request.start()
+        # The new model is swapped in while the request waits for its micro-batch
+        time.sleep(0.1)
+        server.swap_predictor(VersionedPredictor("new"))
+        request.join()
+
+        status, body = responses[0]
+        assert status == 200
+        assert body['model_version'] == "new"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,48 @@
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# This makes sure we can import modules from the src folder (the tests are nested 1 level inside the root)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+import evaluate_model
+from src.evaluation.streaming_metrics import accumulate_files
+
+
+@pytest.fixture
+def validation_files(tmp_path, monkeypatch):
+    """validation_predictions.csv and validation_actual.csv of 300 houses in evaluation/ of a temporary directory."""
+    rng = np.random.default_rng(0)
+    ids = np.arange(1, 301)
+    actual = rng.lognormal(12, 0.4, len(ids)).round()
+    predicted = (actual * rng.normal(1, 0.1, len(ids))).round()
+    # Ties in the percentage error, whose order the report must keep
+    predicted[:20] = actual[:20] * 1.05
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("evaluation")
+    pd.DataFrame({'Id': ids, 'SalePrice': predicted}).to_csv("evaluation/validation_predictions.csv", index=False)
+    pd.DataFrame({'Id': ids, 'SalePrice': actual}).to_csv("evaluation/validation_actual.csv", index=False)
+    return "evaluation/validation_predictions.csv", "evaluation/validation_actual.csv"
+
+
+def report_without_date(summary: dict, metrics: dict) -> str:
+    report = evaluate_model.write_summary_report(summary, metrics, "evaluation")
+    return "\n".join(line for line in report.splitlines() if not line.startswith("Date:"))
+
+
+@pytest.mark.parametrize("chunk_size, n_workers", [(37, 1), (50, 3), (1000, 1)])
+def test_streamed_report_matches_in_memory_report(validation_files, chunk_size, n_workers):
+    df = evaluate_model.load_validation_data()
+    metrics = evaluate_model.calculate_metrics(df)
+
+    accumulator = accumulate_files(*validation_files, chunk_size=chunk_size, n_workers=n_workers)
+    streamed_metrics = accumulator.metrics()
+    streamed_metrics.pop('Abs_Error_Percentiles')
+
+    assert streamed_metrics.keys() == metrics.keys()
+    for name, value in metrics.items():
+        assert streamed_metrics[name] == pytest.approx(value, rel=1e-9), name
+    assert report_without_date(accumulator.summary(), streamed_metrics) == report_without_date(evaluate_model.summarize_results(df), metrics)